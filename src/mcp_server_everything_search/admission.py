@@ -0,0 +1,167 @@
+"""Admission control for backend searches.
+
+Every backend (Everything, locate, mdfind) gets its own concurrency limit
+that adapts to observed latency: it grows additively while searches finish
+within the latency target and is cut multiplicatively when they do not
+(AIMD).  Requests over the limit wait in a bounded priority queue; when the
+queue is full they are rejected right away with ``ServerBusyError``.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Dict, List, Optional
+
+from .metrics import METRICS
+from .normalization import QueryKey
+
+class ServerBusyError(RuntimeError):
+    """Raised when a search is shed because the backend is saturated."""
+
+    def __init__(self) -> None:
+        super().__init__("Server busy, retry later")
+
+class Priority(IntEnum):
+    """Queue priority of a search; lower values are admitted first."""
+    CHEAP = 0
+    NORMAL = 1
+    EXPENSIVE = 2
+    # Speculative work (history prefetch) that live searches always overtake
+    BACKGROUND = 3
+
+def query_priority(key: QueryKey) -> Priority:
+    """Estimate how expensive a search is for its backend.
+
+    Regex searches defeat the backends' fast substring paths and are the most
+    expensive; small result sets keep the per-result stat work bounded.
+    """
+    if key.match_regex:
+        return Priority.EXPENSIVE
+    if key.max_results <= 10:
+        return Priority.CHEAP
+    return Priority.NORMAL
+
+class AIMDLimiter:
+    """Latency-adaptive concurrency limit with a bounded priority wait queue."""
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 32,
+        target_latency: float = 2.0,
+        backoff: float = 0.5,
+        max_queue: int = 64
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.queued = 0
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._last_backoff = 0.0
+
+    async def acquire(self, priority: int = Priority.NORMAL, timeout: Optional[float] = None) -> None:
+        """Wait for a slot.
+
+        Raises:
+            ServerBusyError: If the queue is full or no slot frees up in time.
+        """
+        if self.in_flight < int(self.limit) and not self.queued:
+            self.in_flight += 1
+            return
+        if self.queued >= self.max_queue:
+            METRICS.increment('busy')
+            raise ServerBusyError()
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [int(priority), next(self._sequence), future])
+        self.queued += 1
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted as the timeout fired (wait_for may still time out on 3.12+)
+                self._release_slot()
+            else:
+                self.queued -= 1
+            METRICS.increment('busy')
+            raise ServerBusyError()
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled: pass it on
+                self._release_slot()
+            else:
+                self.queued -= 1
+            raise
+
+    def release(self, latency: float) -> None:
+        """Return a slot and adapt the limit to the latency it took."""
+        if latency <= self.target_latency:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        else:
+            now = time.monotonic()
+            # Back off at most once per latency window for a burst of slow calls
+            if now - self._last_backoff >= self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_backoff = now
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand free slots to the highest-priority waiters."""
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue  # Waiter already gave up
+            self.queued -= 1
+            self.in_flight += 1
+            future.set_result(None)
+
+class AdmissionController:
+    """Per-backend ``AIMDLimiter`` registry."""
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_concurrency = max_concurrency or int(os.getenv('EVERYTHING_SEARCH_MAX_CONCURRENCY', '16'))
+        self.max_queue = max_queue or int(os.getenv('EVERYTHING_SEARCH_MAX_QUEUE', '64'))
+        self._limiters: Dict[str, AIMDLimiter] = {}
+
+    def limiter(self, backend: str) -> AIMDLimiter:
+        """The limiter for ``backend``, created on first use."""
+        limiter = self._limiters.get(backend)
+        if limiter is None:
+            limiter = AIMDLimiter(
+                initial_limit=min(4, self.max_concurrency),
+                max_limit=self.max_concurrency,
+                max_queue=self.max_queue
+            )
+            self._limiters[backend] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        backend: str,
+        priority: int = Priority.NORMAL,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """Hold one of ``backend``'s slots for the duration of the block."""
+        limiter = self.limiter(backend)
+        with METRICS.span('admission_wait'):
+            await limiter.acquire(priority, timeout)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            limiter.release(time.monotonic() - started)
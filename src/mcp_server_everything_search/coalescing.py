@@ -0,0 +1,56 @@
+"""In-flight request coalescing.
+
+Identical searches that arrive while one is already running share that
+execution instead of starting their own backend round-trip.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class SingleFlight:
+    """Share one in-flight execution between concurrent calls with the same key.
+
+    The shared execution is shielded from its waiters: a waiter that times out
+    or is cancelled stops waiting without affecting the others.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def run(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Await the result of ``func()``, joining an identical call if one is running.
+
+        Args:
+            key: Hashable identity of the call, e.g. a ``QueryKey``.
+            func: Coroutine factory; only invoked when no call for ``key`` is in flight.
+            timeout: Seconds this waiter is willing to wait, or None to wait forever.
+
+        Raises:
+            asyncio.TimeoutError: If ``timeout`` elapses first; the shared
+                execution keeps running for the other waiters.
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    def _finished(self, key: Hashable, future: "asyncio.Future[Any]") -> None:
+        """Drop the finished call so the next request starts a fresh one."""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter already left
+        if not future.cancelled():
+            future.exception()
@@ -0,0 +1,218 @@
+"""Content search: which of the files found by a filename query contain a pattern.
+
+Candidate files are scanned in batches on a process pool, so the scan is not
+serialized on the GIL and a slow file only holds up its own worker.  Each
+file is memory-mapped rather than read, and:
+
+* non-regular files, empty files and files over
+  ``EVERYTHING_SEARCH_CONTENT_MAX_BYTES`` are skipped without opening them
+* files with a NUL byte in their first ``BINARY_SNIFF_BYTES`` count as binary
+  and are skipped
+* a case-sensitive literal pattern is first looked up with a plain byte
+  search, so files without it never reach the regex engine
+
+Patterns are matched against the raw bytes as UTF-8; case folding is ASCII
+only.  Only the first ``max_hits_per_file`` matching lines of a file are
+collected.
+"""
+
+import mmap
+import multiprocessing
+import os
+import re
+import stat as stat_module
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import Any, Callable, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+from .platform_search import ContentQuery
+
+# (line number, line text) of one matching line
+LineHit = Tuple[int, str]
+
+MAX_FILE_BYTES = int(os.getenv("EVERYTHING_SEARCH_CONTENT_MAX_BYTES", str(16 * 1024 * 1024)))
+# Filename matches examined per content search
+CANDIDATE_LIMIT = int(os.getenv("EVERYTHING_SEARCH_CONTENT_CANDIDATES", "5000"))
+BINARY_SNIFF_BYTES = 8192
+MAX_LINE_CHARS = 240
+# Files per task sent to a worker
+BATCH_SIZE = 16
+# Up to this many files are processed in-process; the pool isn't worth it
+INLINE_LIMIT = 32
+
+@lru_cache(maxsize=64)
+def compile_pattern(pattern: str, regex: bool, match_case: bool) -> Tuple[Optional[bytes], Pattern[bytes]]:
+    """The byte-level prefilter literal (if any) and the compiled matcher."""
+    raw = pattern.encode("utf-8")
+    # ^ and $ anchor at line boundaries, as in grep
+    flags = re.MULTILINE if match_case else re.MULTILINE | re.IGNORECASE
+    matcher = re.compile(raw if regex else re.escape(raw), flags)
+    literal = raw if match_case and not regex else None
+    return literal, matcher
+
+def _line_hits(data: mmap.mmap, matcher: Pattern[bytes], max_hits: int) -> List[LineHit]:
+    hits: List[LineHit] = []
+    line_no = 1
+    counted = 0
+    pos = 0
+    while len(hits) < max_hits and pos <= len(data):
+        match = matcher.search(data, pos)
+        if match is None:
+            break
+        start = data.rfind(b"\n", 0, match.start()) + 1
+        end = data.find(b"\n", match.end())
+        if end < 0:
+            end = len(data)
+        line_no += data[counted:start].count(b"\n")
+        counted = start
+        text = data[start:end].decode("utf-8", "replace").rstrip("\r")
+        hits.append((line_no, text[:MAX_LINE_CHARS]))
+        # One hit per line: continue on the next one
+        pos = end + 1
+    return hits
+
+def scan_file(
+    path: str,
+    pattern: str,
+    regex: bool = False,
+    match_case: bool = False,
+    max_hits: int = 3,
+    max_bytes: int = MAX_FILE_BYTES
+) -> Optional[List[LineHit]]:
+    """Matching lines of one file, or None when it doesn't match or is skipped."""
+    try:
+        info = os.stat(path)
+        if not stat_module.S_ISREG(info.st_mode) or not 0 < info.st_size <= max_bytes:
+            return None
+        literal, matcher = compile_pattern(pattern, regex, match_case)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if b"\0" in data[:BINARY_SNIFF_BYTES]:
+                return None
+            if literal is not None and data.find(literal) < 0:
+                return None
+            return _line_hits(data, matcher, max_hits) or None
+    except (OSError, ValueError):
+        return None  # Vanished, unreadable or truncated while mapped
+
+def scan_batch(
+    paths: Sequence[str],
+    pattern: str,
+    regex: bool,
+    match_case: bool,
+    max_hits: int,
+    max_bytes: int
+) -> List[Optional[List[LineHit]]]:
+    """``scan_file`` over a batch of paths; runs in the pool workers."""
+    return [scan_file(path, pattern, regex, match_case, max_hits, max_bytes) for path in paths]
+
+class ContentScanner:
+    """Scans candidate files for a pattern on a shared process pool.
+
+    The pool is started on first use and reused by later searches; other
+    file-reading stages (duplicate hashing) submit their work to it too.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_bytes: int = MAX_FILE_BYTES):
+        default_workers = min(os.cpu_count() or 1, 8)
+        self.workers = workers or int(os.getenv("EVERYTHING_SEARCH_CONTENT_WORKERS", str(default_workers)))
+        self.max_bytes = max_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def pool(self) -> ProcessPoolExecutor:
+        """The worker pool, started on first use."""
+        with self._lock:
+            if self._executor is None:
+                # Forking a process with running threads can deadlock the child
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def scan(
+        self,
+        paths: Iterable[str],
+        content: ContentQuery,
+        max_matches: int,
+        deadline
+    ) -> Tuple[List[Tuple[str, List[LineHit]]], bool]:
+        """The first ``max_matches`` matching paths, in candidate order, with their hits.
+
+        Returns the matches and whether the deadline cut the scan short.
+        ``deadline`` is a ``search_interface.Deadline``.
+        """
+        paths = list(paths)
+        options = (content.pattern, content.regex, content.match_case,
+                   content.max_hits_per_file, self.max_bytes)
+        matches: List[Tuple[str, List[LineHit]]] = []
+        timed_out = self.run_batches(
+            scan_batch, paths, options, BATCH_SIZE, deadline,
+            lambda batch, found: self._collect(matches, batch, found, max_matches)
+        )
+        return matches, timed_out
+
+    def run_batches(
+        self,
+        worker: Callable[..., Any],
+        items: Sequence[Any],
+        args: Tuple[Any, ...],
+        batch_size: int,
+        deadline,
+        consume: Callable[[Sequence[Any], Any], Optional[bool]]
+    ) -> bool:
+        """Run ``worker(batch, *args)`` over ``items`` in batches, in order.
+
+        ``worker`` must be picklable (a module-level function): with more
+        than ``INLINE_LIMIT`` items it runs on the pool.  ``consume(batch,
+        result)`` gets each batch's result in order and returns True to stop
+        early.  Returns whether the deadline cut the run short; batches not
+        started by then are cancelled.
+        """
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+        if len(items) <= INLINE_LIMIT or self.workers <= 1:
+            for batch in batches:
+                if deadline.expired():
+                    return True
+                if consume(batch, worker(batch, *args)):
+                    break
+            return False
+
+        futures: List[Future] = [self.pool().submit(worker, batch, *args) for batch in batches]
+        try:
+            for batch, future in zip(batches, futures):
+                try:
+                    result = future.result(timeout=deadline.remaining())
+                except FutureTimeoutError:
+                    return True
+                if consume(batch, result):
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+        return False
+
+    @staticmethod
+    def _collect(
+        matches: List[Tuple[str, List[LineHit]]],
+        batch: Sequence[str],
+        found: Sequence[Optional[List[LineHit]]],
+        max_matches: int
+    ) -> bool:
+        """Add a batch's matches; True once ``max_matches`` are reached."""
+        for path, hits in zip(batch, found):
+            if hits:
+                matches.append((path, hits))
+                if len(matches) >= max_matches:
+                    return True
+        return False
+
+# Process-wide scanner used by the search provider
+CONTENT_SCANNER = ContentScanner()
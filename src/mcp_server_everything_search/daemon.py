@@ -0,0 +1,206 @@
+"""Shared search daemon.
+
+``--daemon`` serves the MCP server over streamable HTTP on localhost, so a
+single process owns the backends, caches, indexes and admission control for
+every client on the host.  With ``EVERYTHING_SEARCH_DAEMON=1`` the stdio
+entry point becomes a proxy that relays its client's messages to the daemon,
+starting one first when nothing is listening.
+
+The daemon writes a random bearer token, readable only by its user, to the
+cache directory and rejects requests without it, so other local users can't
+search through it.  It binds its port before writing the token: when two
+proxies start a daemon at once, the loser exits without replacing the
+winner's token.
+"""
+
+import hmac
+import logging
+import os
+import platform
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import NamedTuple, Optional
+
+import anyio
+import httpx
+import uvicorn
+from mcp.client.streamable_http import streamable_http_client
+from mcp.server.stdio import stdio_server
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from mcp.server.transport_security import TransportSecuritySettings
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from .server import background_work, serve_stdio, server
+from .storage import cache_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47391
+MCP_PATH = "/mcp"
+TOKEN_FILE = "daemon.token"
+LOG_FILE = "daemon.log"
+# How long a proxy waits for a daemon it started to accept connections
+STARTUP_TIMEOUT = 15.0
+
+class DaemonAddress(NamedTuple):
+    """Where the daemon listens."""
+    host: str
+    port: int
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{MCP_PATH}"
+
+def daemon_address() -> DaemonAddress:
+    """Address from ``EVERYTHING_SEARCH_DAEMON_HOST`` and ``_PORT``."""
+    return DaemonAddress(
+        os.getenv("EVERYTHING_SEARCH_DAEMON_HOST", DEFAULT_HOST),
+        int(os.getenv("EVERYTHING_SEARCH_DAEMON_PORT", DEFAULT_PORT))
+    )
+
+def _token_path() -> str:
+    return os.path.join(cache_dir(), TOKEN_FILE)
+
+def read_token() -> Optional[str]:
+    """The running daemon's token, or None when none was written."""
+    try:
+        with open(_token_path(), encoding="ascii") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _write_token(token: str) -> None:
+    path = _token_path()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(token)
+    os.replace(tmp_path, path)
+
+class _TokenGate:
+    """ASGI app passing requests that bear the token on to the MCP sessions."""
+
+    def __init__(self, manager: StreamableHTTPSessionManager, token: str):
+        self.manager = manager
+        self.expected = f"Bearer {token}".encode()
+
+    async def __call__(self, scope, receive, send) -> None:
+        authorization = dict(scope["headers"]).get(b"authorization", b"")
+        if not hmac.compare_digest(authorization, self.expected):
+            await PlainTextResponse("Unauthorized", status_code=401)(scope, receive, send)
+            return
+        await self.manager.handle_request(scope, receive, send)
+
+def create_app(token: str, address: DaemonAddress) -> Starlette:
+    """ASGI app serving ``server`` to clients presenting ``token``."""
+    manager = StreamableHTTPSessionManager(
+        app=server,
+        security_settings=TransportSecuritySettings(
+            allowed_hosts=[f"{address.host}:{address.port}", f"localhost:{address.port}"]
+        )
+    )
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with manager.run(), background_work():
+            yield
+
+    return Starlette(routes=[Route(MCP_PATH, endpoint=_TokenGate(manager, token))], lifespan=lifespan)
+
+def _bind(address: DaemonAddress) -> socket.socket:
+    family = socket.AF_INET6 if ":" in address.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    if platform.system() != "Windows":
+        # Lets a restarted daemon reuse a port in TIME_WAIT; on Windows it
+        # would let two daemons bind the same port
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((address.host, address.port))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+async def serve_daemon(address: Optional[DaemonAddress] = None) -> None:
+    """Run the shared daemon until interrupted."""
+    address = address or daemon_address()
+    try:
+        sock = _bind(address)
+    except OSError as e:
+        raise RuntimeError(f"Search daemon address {address.host}:{address.port} unavailable: {e}")
+    token = secrets.token_urlsafe(32)
+    _write_token(token)
+    config = uvicorn.Config(create_app(token, address), log_level="warning", lifespan="on")
+    logger.info("Search daemon listening on %s", address.url)
+    await uvicorn.Server(config).serve(sockets=[sock])
+
+def _listening(address: DaemonAddress) -> bool:
+    try:
+        with socket.create_connection((address.host, address.port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+def _spawn_daemon() -> None:
+    """Start a detached daemon process that outlives this one."""
+    kwargs = {}
+    if platform.system() == "Windows":
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    with open(os.path.join(cache_dir(), LOG_FILE), "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "mcp_server_everything_search", "--daemon"],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=log, **kwargs
+        )
+
+def ensure_daemon(address: DaemonAddress, timeout: float = STARTUP_TIMEOUT) -> str:
+    """Token of the daemon at ``address``, starting one if none is running."""
+    if not _listening(address):
+        _spawn_daemon()
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        token = read_token()
+        if token and _listening(address):
+            return token
+        time.sleep(0.1)
+    raise RuntimeError(f"Search daemon did not start on {address.host}:{address.port}")
+
+async def _relay(source, sink, done: anyio.CancelScope) -> None:
+    async for message in source:
+        if isinstance(message, Exception):
+            logger.warning("Search daemon transport error: %s", message)
+            continue
+        await sink.send(message)
+    done.cancel()
+
+async def proxy_stdio(address: Optional[DaemonAddress] = None) -> None:
+    """Relay one stdio client's messages to the shared daemon.
+
+    Falls back to serving the client in this process when no daemon can be
+    reached.
+    """
+    address = address or daemon_address()
+    try:
+        token = await anyio.to_thread.run_sync(ensure_daemon, address)
+    except (OSError, RuntimeError) as e:
+        logger.warning("%s; serving in process", e)
+        await serve_stdio()
+        return
+    # Responses stream for as long as a search runs: long read timeout
+    http_client = httpx.AsyncClient(
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=httpx.Timeout(30, read=300)
+    )
+    async with http_client, stdio_server() as (client_read, client_write):
+        async with streamable_http_client(address.url, http_client=http_client) as (daemon_read, daemon_write, _):
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(_relay, client_read, daemon_write, tg.cancel_scope)
+                tg.start_soon(_relay, daemon_read, client_write, tg.cancel_scope)
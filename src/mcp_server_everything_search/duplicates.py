@@ -0,0 +1,192 @@
+"""Duplicate files among the results of a search.
+
+Candidates are grouped by size first.  On Windows the size comes from the
+Everything index and elsewhere from the stat() the metadata filters already
+made, so a file whose size is unique is never opened.  Files whose sizes
+collide are hashed in two stages on the content scanner's process pool:
+
+1. the first and last ``EDGE_BYTES`` of each file, which tells most
+   same-size files apart cheaply (files up to twice that size are hashed
+   whole here and need no second stage);
+2. the full content, for the files whose edge hashes still collide.
+
+Files are memory-mapped and hashed with BLAKE2b.  Several paths of the same
+file (hard links) count once, as they take no extra space.
+"""
+
+import hashlib
+import mmap
+import os
+import stat as stat_module
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from pydantic import Field
+
+from .content import CONTENT_SCANNER, ContentScanner
+from .metrics import METRICS
+from .normalization import QueryKey
+from .platform_search import MetadataFilters, SearchToolArguments
+
+# Bytes hashed from each end of a file in the first stage
+EDGE_BYTES = 64 * 1024
+# Bytes of the mapping hashed per update() in the full stage
+HASH_CHUNK = 1024 * 1024
+# Files per task sent to a worker when hashing
+HASH_BATCH_SIZE = 64
+
+# (st_dev, st_ino) of a file and the digest of its hashed bytes
+FileDigest = Tuple[Tuple[int, int], bytes]
+
+class DuplicatesArguments(SearchToolArguments):
+    """Arguments accepted by the ``find_duplicates`` tool."""
+    max_candidates: int = Field(
+        default=100_000,
+        ge=1,
+        le=1_000_000,
+        description="Maximum number of search results examined (base.max_results is ignored)"
+    )
+    min_size: int = Field(
+        default=1,
+        ge=1,
+        description="Ignore files smaller than this many bytes"
+    )
+    max_groups: int = Field(
+        default=50,
+        ge=1,
+        le=1000,
+        description="Maximum number of duplicate groups listed, most reclaimable space first"
+    )
+
+def candidate_key(key: QueryKey, args: DuplicatesArguments) -> QueryKey:
+    """The search whose results are checked: files of at least ``min_size`` bytes."""
+    filters = key.filters or MetadataFilters()
+    filters = filters.model_copy(update={
+        "file_type": "file",
+        "min_size": max(filters.min_size or 0, args.min_size),
+    })
+    return key._replace(max_results=args.max_candidates, filters=filters, rank_by_relevance=False)
+
+def hash_file(path: str, size: int, edges_only: bool) -> Optional[FileDigest]:
+    """Identity and digest of a file, or None when it is gone or no longer ``size`` bytes."""
+    try:
+        with open(path, "rb") as f:
+            info = os.fstat(f.fileno())
+            if not stat_module.S_ISREG(info.st_mode) or info.st_size != size:
+                return None  # Changed since it was indexed
+            digest = hashlib.blake2b(digest_size=20)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if edges_only and size > 2 * EDGE_BYTES:
+                    digest.update(data[:EDGE_BYTES])
+                    digest.update(data[-EDGE_BYTES:])
+                else:
+                    for start in range(0, size, HASH_CHUNK):
+                        digest.update(data[start:start + HASH_CHUNK])
+            return (info.st_dev, info.st_ino), digest.digest()
+    except (OSError, ValueError):
+        return None  # Vanished, unreadable or truncated while mapped
+
+def hash_batch(files: Sequence[Tuple[str, int]], edges_only: bool) -> List[Optional[FileDigest]]:
+    """``hash_file`` over a batch of ``(path, size)``; runs in the pool workers."""
+    return [hash_file(path, size, edges_only) for path, size in files]
+
+class DuplicateGroup(NamedTuple):
+    """Paths of distinct files with the same content."""
+    size: int
+    paths: List[str]
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        """Space freed by keeping only one of the files."""
+        return self.size * (len(self.paths) - 1)
+
+@dataclass
+class DuplicateReport:
+    """Outcome of a duplicate search."""
+    candidates: int
+    groups: List[DuplicateGroup] = field(default_factory=list)
+    hashed_files: int = 0
+    truncated: bool = False
+
+    def to_dict(self, max_groups: int) -> Dict[str, Any]:
+        groups = sorted(self.groups, key=lambda g: (-g.reclaimable_bytes, g.paths[0]))
+        return {
+            "candidates": self.candidates,
+            "hashed_files": self.hashed_files,
+            "duplicate_groups": len(groups),
+            "duplicate_files": sum(len(g.paths) - 1 for g in groups),
+            "reclaimable_bytes": sum(g.reclaimable_bytes for g in groups),
+            "groups": [
+                {"size": g.size, "reclaimable_bytes": g.reclaimable_bytes, "paths": g.paths}
+                for g in groups[:max_groups]
+            ],
+            "truncated": self.truncated,
+        }
+
+def _group(
+    files: Sequence[Tuple[str, int]],
+    digests: Sequence[Optional[FileDigest]]
+) -> Dict[Tuple[int, bytes], List[str]]:
+    """Paths by (size, digest), keeping groups of two or more distinct files."""
+    groups: Dict[Tuple[int, bytes], Dict[Tuple[int, int], str]] = defaultdict(dict)
+    for (path, size), found in zip(files, digests):
+        if found is not None:
+            identity, digest = found
+            groups[size, digest].setdefault(identity, path)
+    return {key: sorted(members.values()) for key, members in groups.items() if len(members) > 1}
+
+class DuplicateFinder:
+    """Finds duplicate files with size bucketing and staged hashing."""
+
+    def __init__(self, scanner: ContentScanner = CONTENT_SCANNER):
+        self.scanner = scanner
+
+    def find(self, results: Iterable[Any], min_size: int, deadline) -> DuplicateReport:
+        """Duplicate groups among ``results`` (anything with ``path`` and ``size``).
+
+        ``deadline`` is a ``search_interface.Deadline``; when it passes, the
+        groups confirmed so far are returned with ``truncated`` set.
+        """
+        by_size: Dict[int, List[str]] = defaultdict(list)
+        candidates = 0
+        for result in results:
+            candidates += 1
+            if result.size is not None and result.size >= min_size:
+                by_size[result.size].append(result.path)
+        report = DuplicateReport(candidates=candidates)
+
+        colliding = [(path, size) for size, paths in by_size.items() if len(paths) > 1 for path in paths]
+        with METRICS.span('hash_edges'):
+            digests, report.truncated = self._hash(colliding, True, deadline)
+        report.hashed_files = len(digests)
+
+        needs_full: List[Tuple[str, int]] = []
+        for (size, _), paths in _group(colliding, digests).items():
+            if size <= 2 * EDGE_BYTES:
+                report.groups.append(DuplicateGroup(size, paths))
+            else:
+                needs_full.extend((path, size) for path in paths)
+        if needs_full and not report.truncated:
+            with METRICS.span('hash_full'):
+                digests, report.truncated = self._hash(needs_full, False, deadline)
+            report.groups.extend(DuplicateGroup(size, paths) for (size, _), paths in _group(needs_full, digests).items())
+        METRICS.increment('duplicate_groups', len(report.groups))
+        return report
+
+    def _hash(
+        self,
+        files: List[Tuple[str, int]],
+        edges_only: bool,
+        deadline
+    ) -> Tuple[List[Optional[FileDigest]], bool]:
+        """Digests of a prefix of ``files`` (all of them unless the deadline passed)."""
+        digests: List[Optional[FileDigest]] = []
+        timed_out = self.scanner.run_batches(
+            hash_batch, files, (edges_only,), HASH_BATCH_SIZE, deadline,
+            lambda batch, found: digests.extend(found)
+        )
+        return digests, timed_out
+
+# Process-wide finder used by the find_duplicates tool
+DUPLICATE_FINDER = DuplicateFinder()
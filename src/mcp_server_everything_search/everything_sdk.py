@@ -2,11 +2,17 @@
 
 import ctypes
 import datetime
-import struct
-import sys
+import logging
+import threading
+import time
 from typing import Any, List
 from pydantic import BaseModel
 
+from .metrics import METRICS
+from .search_interface import Deadline, SearchResults
+
+logger = logging.getLogger(__name__)
+
 # Everything SDK constants
 EVERYTHING_OK = 0
 EVERYTHING_ERROR_MEMORY = 1
@@ -35,6 +41,15 @@ EVERYTHING_REQUEST_HIGHLIGHTED_FILE_NAME = 0x00002000
 EVERYTHING_REQUEST_HIGHLIGHTED_PATH = 0x00004000
 EVERYTHING_REQUEST_HIGHLIGHTED_FULL_PATH_AND_FILE_NAME = 0x00008000
 
+# Cheap fields used to rank a large candidate pool by relevance
+RANKING_REQUEST_FLAGS = (
+    EVERYTHING_REQUEST_FILE_NAME |
+    EVERYTHING_REQUEST_PATH |
+    EVERYTHING_REQUEST_DATE_MODIFIED |
+    EVERYTHING_REQUEST_RUN_COUNT |
+    EVERYTHING_REQUEST_HIGHLIGHTED_FILE_NAME
+)
+
 # Sort options
 EVERYTHING_SORT_NAME_ASCENDING = 1
 EVERYTHING_SORT_NAME_DESCENDING = 2
@@ -70,12 +85,16 @@ POSIX_EPOCH = datetime.datetime.strptime('1970-01-01 00:00:00', '%Y-%m-%d %H:%M:
 EPOCH_DIFF = (POSIX_EPOCH - WINDOWS_EPOCH).total_seconds()
 WINDOWS_TICKS_TO_POSIX_EPOCH = EPOCH_DIFF * WINDOWS_TICKS
 
+# The SDK keeps one global query state per process, so searches issued from
+# worker threads must not interleave their Set*/Query/GetResult calls.
+_QUERY_LOCK = threading.Lock()
+
 class SearchResult(BaseModel):
     """Model for search results."""
     path: str
     filename: str
     extension: str | None = None
-    size: int
+    size: int | None = None
     created: str | None = None
     modified: str | None = None
     accessed: str | None = None
@@ -105,13 +124,17 @@ class EverythingError(Exception):
 class EverythingSDK:
     """Wrapper for Everything SDK functionality."""
     
-    def __init__(self, dll_path: str):
-        """Initialize Everything SDK with the specified DLL path."""
+    def __init__(self, dll_path: str, dll: Any = None):
+        """Initialize Everything SDK with the specified DLL path.
+
+        An already loaded ``dll`` (or a stand-in exposing the same
+        ``Everything_*`` functions) may be passed instead of loading one.
+        """
         try:
-            self.dll = ctypes.WinDLL(dll_path)
+            self.dll = dll if dll is not None else ctypes.WinDLL(dll_path)
             self._configure_dll()
         except Exception as e:
-            print(f"Failed to load Everything SDK DLL: {e}", file=sys.stderr)
+            logger.error("Failed to load Everything SDK DLL: %s", e)
             raise
 
     def _configure_dll(self):
@@ -191,10 +214,70 @@ class EverythingSDK:
         match_whole_word: bool = False,
         match_regex: bool = False,
         sort_by: int = EVERYTHING_SORT_NAME_ASCENDING,
-        request_flags: int | None = None
+        request_flags: int | None = None,
+        deadline: Any = None
     ) -> List[SearchResult]:
-        """Perform file search using Everything SDK."""
-        print(f"Debug: Setting up search with query: {query}", file=sys.stderr)
+        """Perform file search using Everything SDK.
+
+        ``deadline`` (a ``search_interface.Deadline``) bounds the wait for the
+        query lock and the result extraction loop; when it passes, the results
+        read so far are returned with ``truncated`` set.
+        """
+        deadline = deadline or Deadline()
+        remaining = deadline.remaining()
+        if not _QUERY_LOCK.acquire(timeout=-1 if remaining is None else remaining):
+            results = SearchResults()
+            results.truncated = True
+            return results
+        try:
+            return self._search_files_locked(
+                query, max_results, match_path, match_case,
+                match_whole_word, match_regex, sort_by, request_flags, deadline
+            )
+        finally:
+            _QUERY_LOCK.release()
+
+    def full_paths(self, query: str = "") -> List[str]:
+        """Full path of every match, without any other result data.
+
+        An empty query lists the whole index; used for bulk enumeration.
+        """
+        with _QUERY_LOCK:
+            self.dll.Everything_SetSearchW(query)
+            self.dll.Everything_SetMatchPath(False)
+            self.dll.Everything_SetMatchCase(False)
+            self.dll.Everything_SetMatchWholeWord(False)
+            self.dll.Everything_SetRegex(False)
+            self.dll.Everything_SetMax(0xFFFFFFFF)
+            self.dll.Everything_SetSort(EVERYTHING_SORT_NAME_ASCENDING)
+            self.dll.Everything_SetRequestFlags(EVERYTHING_REQUEST_FILE_NAME | EVERYTHING_REQUEST_PATH)
+            with METRICS.span('ipc'):
+                succeeded = self.dll.Everything_QueryW(True)
+            if not succeeded:
+                self._check_error()
+                raise RuntimeError("Search query failed")
+            buffer = ctypes.create_unicode_buffer(260)
+            paths = []
+            for i in range(self.dll.Everything_GetNumResults()):
+                self.dll.Everything_GetResultFullPathNameW(i, buffer, 260)
+                paths.append(buffer.value)
+            self.dll.Everything_Reset()
+            return paths
+
+    def _search_files_locked(
+        self,
+        query: str,
+        max_results: int,
+        match_path: bool,
+        match_case: bool,
+        match_whole_word: bool,
+        match_regex: bool,
+        sort_by: int,
+        request_flags: int | None,
+        deadline: Any
+    ) -> List[SearchResult]:
+        """Run one query; the caller must hold ``_QUERY_LOCK``."""
+        logger.debug("Setting up search with query: %s", query)
         
         # Set up search parameters
         self.dll.Everything_SetSearchW(query)
@@ -223,15 +306,18 @@ class EverythingSDK:
         self.dll.Everything_SetRequestFlags(request_flags)
 
         # Execute search
-        print("Debug: Executing search query", file=sys.stderr)
-        if not self.dll.Everything_QueryW(True):
+        logger.debug("Executing search query")
+        with METRICS.span('ipc'):
+            succeeded = self.dll.Everything_QueryW(True)
+        if not succeeded:
             self._check_error()
             raise RuntimeError("Search query failed")
         
         # Get results
-        print("Debug: Getting search results", file=sys.stderr)
+        logger.debug("Getting search results")
+        extract_started = time.perf_counter()
         num_results = min(self.dll.Everything_GetNumResults(), max_results)
-        results = []
+        results = SearchResults()
 
         filename_buffer = ctypes.create_unicode_buffer(260)
         date_created = ctypes.c_ulonglong()
@@ -239,29 +325,49 @@ class EverythingSDK:
         date_accessed = ctypes.c_ulonglong()
         file_size = ctypes.c_ulonglong()
 
+        # Only read back the fields that were requested
+        want_size = bool(request_flags & EVERYTHING_REQUEST_SIZE)
+        want_created = bool(request_flags & EVERYTHING_REQUEST_DATE_CREATED)
+        want_modified = bool(request_flags & EVERYTHING_REQUEST_DATE_MODIFIED)
+        want_accessed = bool(request_flags & EVERYTHING_REQUEST_DATE_ACCESSED)
+        want_extension = bool(request_flags & EVERYTHING_REQUEST_EXTENSION)
+        want_attributes = bool(request_flags & EVERYTHING_REQUEST_ATTRIBUTES)
+        want_run_count = bool(request_flags & EVERYTHING_REQUEST_RUN_COUNT)
+        want_highlighted_filename = bool(request_flags & EVERYTHING_REQUEST_HIGHLIGHTED_FILE_NAME)
+        want_highlighted_path = bool(request_flags & EVERYTHING_REQUEST_HIGHLIGHTED_PATH)
+
         for i in range(num_results):
+            if deadline.expired():
+                results.truncated = True
+                break
             try:
                 self.dll.Everything_GetResultFullPathNameW(i, filename_buffer, 260)
                 
                 # Get timestamps
-                self.dll.Everything_GetResultDateCreated(i, date_created)
-                self.dll.Everything_GetResultDateModified(i, date_modified)
-                self.dll.Everything_GetResultDateAccessed(i, date_accessed)
-                self.dll.Everything_GetResultSize(i, file_size)
+                if want_created:
+                    self.dll.Everything_GetResultDateCreated(i, date_created)
+                if want_modified:
+                    self.dll.Everything_GetResultDateModified(i, date_modified)
+                if want_accessed:
+                    self.dll.Everything_GetResultDateAccessed(i, date_accessed)
+                if want_size:
+                    self.dll.Everything_GetResultSize(i, file_size)
 
                 # Get other attributes
                 filename = self.dll.Everything_GetResultFileNameW(i)
-                extension = self.dll.Everything_GetResultExtensionW(i)
-                attributes = self.dll.Everything_GetResultAttributes(i)
-                run_count = self.dll.Everything_GetResultRunCount(i)
-                highlighted_filename = self.dll.Everything_GetResultHighlightedFileNameW(i)
-                highlighted_path = self.dll.Everything_GetResultHighlightedPathW(i)
+                extension = self.dll.Everything_GetResultExtensionW(i) if want_extension else None
+                attributes = self.dll.Everything_GetResultAttributes(i) if want_attributes else None
+                run_count = self.dll.Everything_GetResultRunCount(i) if want_run_count else None
+                highlighted_filename = (
+                    self.dll.Everything_GetResultHighlightedFileNameW(i) if want_highlighted_filename else None
+                )
+                highlighted_path = self.dll.Everything_GetResultHighlightedPathW(i) if want_highlighted_path else None
 
                 results.append(SearchResult(
                     path=filename_buffer.value,
                     filename=filename,
                     extension=extension,
-                    size=file_size.value,
+                    size=file_size.value if want_size else None,
                     created=self._get_time(date_created.value).isoformat() if date_created.value else None,
                     modified=self._get_time(date_modified.value).isoformat() if date_modified.value else None,
                     accessed=self._get_time(date_accessed.value).isoformat() if date_accessed.value else None,
@@ -271,10 +377,11 @@ class EverythingSDK:
                     highlighted_path=highlighted_path
                 ))
             except Exception as e:
-                print(f"Debug: Error processing result {i}: {e}", file=sys.stderr)
+                logger.debug("Error processing result %d: %s", i, e)
                 continue
+        METRICS.observe('extract', time.perf_counter() - extract_started)
 
-        print("Debug: Resetting Everything SDK", file=sys.stderr)
+        logger.debug("Resetting Everything SDK")
         self.dll.Everything_Reset()
 
         return results
\ No newline at end of file
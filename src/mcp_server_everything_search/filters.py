@@ -0,0 +1,115 @@
+"""Evaluation of ``MetadataFilters`` by the search backends.
+
+On Windows the filters compile into Everything search functions (``size:``,
+``dm:``, ``dc:``, ``rc:``, ``ext:``, ``file:``/``folder:``) so the index does
+the work.  The command-line backends have no such syntax; there the filters run
+as a predicate over the streamed candidates, before the result limit, with
+the name-only conditions checked ahead of any stat() call.
+"""
+
+import os
+import re
+import stat as stat_module
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from .platform_search import MetadataFilters
+
+def _everything_date(value: datetime) -> str:
+    """Everything compares dates in local time, to the second."""
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S")
+
+def everything_terms(filters: MetadataFilters) -> List[str]:
+    """Everything search functions equivalent to ``filters``."""
+    terms = []
+    if filters.min_size is not None:
+        terms.append(f"size:>={filters.min_size}")
+    if filters.max_size is not None:
+        terms.append(f"size:<={filters.max_size}")
+    for function, after, before in (
+        ("dm", filters.modified_after, filters.modified_before),
+        ("dc", filters.created_after, filters.created_before),
+    ):
+        if after is not None:
+            terms.append(f"{function}:>={_everything_date(after)}")
+        if before is not None:
+            terms.append(f"{function}:<={_everything_date(before)}")
+    if filters.changed_after is not None:
+        terms.append(f"rc:>={_everything_date(filters.changed_after)}")
+    if filters.extensions:
+        terms.append("ext:" + ";".join(filters.extensions))
+    if filters.file_type:
+        terms.append(f"{filters.file_type}:")
+    return terms
+
+def _unquoted_regex(pattern: str) -> str:
+    """``pattern`` with each ``"`` written as ``\\x22``, which can't end a quoted term.
+
+    Everything has no escape for a quote inside quotes; its regexes are PCRE,
+    where ``\\x22`` matches the same character, in or out of brackets.
+    """
+    def replace(match: "re.Match[str]") -> str:
+        backslashes = match.group(1)
+        # An odd count escaped the quote; the escape is now \x22 itself
+        return backslashes[:len(backslashes) - len(backslashes) % 2] + r"\x22"
+    return re.sub(r'(\\*)"', replace, pattern)
+
+def everything_query(query: str, match_regex: bool, filters: Optional[MetadataFilters]) -> Tuple[str, bool]:
+    """Add the filter functions to an Everything search.
+
+    With the regex flag set Everything treats the whole search as one
+    pattern, so a regex query moves into a ``regex:`` function instead.
+
+    Returns:
+        ``(search, match_regex)`` to pass to the SDK.
+    """
+    if filters is None or filters.is_empty():
+        return query, match_regex
+    if match_regex:
+        query = f'regex:"{_unquoted_regex(query)}"'
+    # Everything's space (AND) binds looser than "|", so the terms apply to the whole query
+    return " ".join([query] + everything_terms(filters)), False
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return None if value is None else value.timestamp()
+
+def _within(value: float, low: Optional[float], high: Optional[float]) -> bool:
+    return (low is None or value >= low) and (high is None or value <= high)
+
+class MetadataPredicate:
+    """``MetadataFilters`` as checks against a path and its stat result."""
+
+    def __init__(self, filters: MetadataFilters):
+        self.extensions = frozenset(filters.extensions) if filters.extensions else None
+        self.file_type = filters.file_type
+        self.size = (filters.min_size, filters.max_size)
+        self.modified = (_timestamp(filters.modified_after), _timestamp(filters.modified_before))
+        self.created = (_timestamp(filters.created_after), _timestamp(filters.created_before))
+        self.changed_after = _timestamp(filters.changed_after)
+        self.needs_stat = bool(
+            self.file_type
+            or self.changed_after is not None
+            or any(bound is not None for bound in self.size + self.modified + self.created)
+        )
+
+    def match_name(self, path: str) -> bool:
+        """Checks that need no file system access."""
+        if self.extensions is None:
+            return True
+        extension = os.path.splitext(os.path.basename(path))[1][1:].lower()
+        return extension in self.extensions
+
+    def match_stat(self, stat: os.stat_result) -> bool:
+        """Checks against the file's metadata; ``created`` is ``st_ctime`` as in the results."""
+        if self.file_type == "file" and not stat_module.S_ISREG(stat.st_mode):
+            return False
+        if self.file_type == "folder" and not stat_module.S_ISDIR(stat.st_mode):
+            return False
+        return (
+            _within(stat.st_size, *self.size)
+            and _within(stat.st_mtime, *self.modified)
+            and _within(stat.st_ctime, *self.created)
+            and _within(stat.st_ctime, self.changed_after, None)
+        )
@@ -0,0 +1,361 @@
+"""Typo-tolerant filename search over a trigram index of basenames.
+
+The index holds every distinct basename known to the platform's search
+backend (read once from locate, mdfind or Everything), the directories each
+one occurs in, and a trigram posting list per name.  A lookup gathers the
+names sharing enough trigrams with the query, verifies them with a bounded
+edit distance (adjacent transpositions count as one edit) and returns them
+closest first; no backend round-trip is needed.
+
+The index is saved under ``storage.cache_dir()``.  It is rebuilt in the
+background when the locate database changes, or after
+``EVERYTHING_SEARCH_FUZZY_TTL`` seconds for the live indexes (Everything,
+Spotlight); lookups keep using the previous index meanwhile.  The first
+index is built in the background as well, so the caller decides how long
+to wait for it.
+"""
+
+import array
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .metrics import METRICS
+from .storage import atomic_write, cache_dir
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+INDEX_FILE = f"fuzzy-index-v{FORMAT_VERSION}.bin"
+_TYPECODE = "I"
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of ``text`` with a start marker, so prefixes weigh in."""
+    padded = "^" + text
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def default_max_distance(query: str) -> int:
+    """Edits tolerated for a query of this length."""
+    if len(query) <= 4:
+        return 1
+    return 2 if len(query) <= 9 else 3
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance between ``a`` and ``b``.
+
+    Stops early and returns ``limit + 1`` once the distance exceeds ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        char = a[i - 1]
+        row_min = i
+        for j in range(1, len(b) + 1):
+            value = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != b[j - 1])
+            )
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return limit + 1
+        before, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+def _stem(name: str) -> str:
+    return name.rsplit(".", 1)[0] if "." in name[1:] else name
+
+def _zeros(length: int) -> array.array:
+    return array.array(_TYPECODE, bytes(length * array.array(_TYPECODE).itemsize))
+
+class FuzzyIndex:
+    """Distinct basenames, where they occur, and a trigram index over them."""
+
+    def __init__(
+        self,
+        names: List[str],
+        dirs: List[str],
+        name_start: array.array,
+        entry_dirs: array.array,
+        grams: Dict[str, Tuple[int, int]],
+        postings: array.array,
+        sep: str,
+        fingerprint: Any = None,
+        built_at: Optional[float] = None
+    ):
+        self.names = names
+        self.dirs = dirs
+        # Entries of name i are entry_dirs[name_start[i]:name_start[i + 1]]
+        self.name_start = name_start
+        self.entry_dirs = entry_dirs
+        # Name ids containing gram g are postings[start:end] for grams[g] == (start, end)
+        self.grams = grams
+        self.postings = postings
+        self.sep = sep
+        self.fingerprint = fingerprint
+        self.built_at = time.time() if built_at is None else built_at
+
+    @classmethod
+    def build(cls, paths: Iterable[str], sep: str = os.sep, fingerprint: Any = None) -> "FuzzyIndex":
+        """Index an iterable of full paths."""
+        built_at = time.time()
+        name_ids: Dict[str, int] = {}
+        dir_ids: Dict[str, int] = {}
+        entry_names = array.array(_TYPECODE)
+        entry_dir_ids = array.array(_TYPECODE)
+        for path in paths:
+            directory, _, name = path.rstrip(sep).rpartition(sep)
+            if not name:
+                continue
+            entry_names.append(name_ids.setdefault(name, len(name_ids)))
+            entry_dir_ids.append(dir_ids.setdefault(directory, len(dir_ids)))
+
+        # Group the entries by name (counting sort)
+        name_start = _zeros(len(name_ids) + 1)
+        for name_id in entry_names:
+            name_start[name_id + 1] += 1
+        for i in range(len(name_ids)):
+            name_start[i + 1] += name_start[i]
+        fill = array.array(_TYPECODE, name_start)
+        entry_dirs = _zeros(len(entry_names))
+        for name_id, dir_id in zip(entry_names, entry_dir_ids):
+            entry_dirs[fill[name_id]] = dir_id
+            fill[name_id] += 1
+
+        lists: Dict[str, array.array] = {}
+        names = list(name_ids)
+        for name_id, name in enumerate(names):
+            for gram in trigrams(name.lower()):
+                posting = lists.get(gram)
+                if posting is None:
+                    posting = lists[gram] = array.array(_TYPECODE)
+                posting.append(name_id)
+        grams: Dict[str, Tuple[int, int]] = {}
+        postings = array.array(_TYPECODE)
+        for gram, posting in lists.items():
+            grams[gram] = (len(postings), len(postings) + len(posting))
+            postings.extend(posting)
+        return cls(names, list(dir_ids), name_start, entry_dirs, grams, postings, sep, fingerprint, built_at)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, query: str, max_distance: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Names within ``max_distance`` edits of ``query``, closest first.
+
+        Queries without an extension are also compared against each name's
+        stem.  Candidates have to share a third of the query's trigrams
+        (more for long queries: an edit destroys at most four), which keeps
+        the verified set small at the cost of missing names whose edits are
+        spread over the whole query.
+
+        Returns:
+            ``(distance, name_id)`` pairs.
+        """
+        query = query.lower()
+        limit = default_max_distance(query) if max_distance is None else max_distance
+        compare_stem = "." not in query
+        query_grams = trigrams(query)
+        required = max(len(query_grams) - 4 * limit, math.ceil(len(query_grams) / 3), 1)
+
+        # Count shared grams per name over the posting lists (counted in C)
+        shared: Counter = Counter()
+        for gram in query_grams:
+            span = self.grams.get(gram)
+            if span is not None:
+                shared.update(self.postings[span[0]:span[1]])
+
+        matches = []
+        for name_id, count in shared.items():
+            if count < required:
+                continue
+            name = self.names[name_id].lower()
+            stem = _stem(name) if compare_stem else name
+            if abs(len(stem) - len(query)) > limit and abs(len(name) - len(query)) > limit:
+                continue
+            distance = edit_distance(query, name, limit)
+            if distance and stem is not name:
+                distance = min(distance, edit_distance(query, stem, limit))
+            if distance <= limit:
+                matches.append((distance, abs(len(stem) - len(query)), name, name_id))
+        matches.sort()
+        return [(distance, name_id) for distance, _, _, name_id in matches]
+
+    def paths(self, name_id: int) -> Iterator[str]:
+        """Full paths of every entry named ``self.names[name_id]``."""
+        name = self.names[name_id]
+        for i in range(self.name_start[name_id], self.name_start[name_id + 1]):
+            yield self.dirs[self.entry_dirs[i]] + self.sep + name
+
+    def search(self, query: str, max_distance: Optional[int] = None) -> Iterator[str]:
+        """Paths whose basename is close to ``query``, closest names first."""
+        for _, name_id in self.lookup(query, max_distance):
+            yield from self.paths(name_id)
+
+    def to_bytes(self) -> bytes:
+        gram_list = list(self.grams)
+        bounds = array.array(_TYPECODE, [self.grams[gram][0] for gram in gram_list] + [len(self.postings)])
+        sections = [
+            "\n".join(self.names).encode("utf-8", "surrogateescape"),
+            "\n".join(self.dirs).encode("utf-8", "surrogateescape"),
+            self.name_start.tobytes(),
+            self.entry_dirs.tobytes(),
+            "\n".join(gram_list).encode("utf-8", "surrogateescape"),
+            bounds.tobytes(),
+            self.postings.tobytes(),
+        ]
+        header = {
+            "version": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "itemsize": array.array(_TYPECODE).itemsize,
+            "sep": self.sep,
+            "fingerprint": self.fingerprint,
+            "built_at": self.built_at,
+            "counts": [len(self.names), len(self.dirs), len(gram_list)],
+            "sections": [len(section) for section in sections],
+        }
+        return json.dumps(header).encode() + b"\n" + b"".join(sections)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FuzzyIndex":
+        """Load an index written by ``to_bytes``.
+
+        Raises:
+            ValueError: If the data was written in another format or on an
+                incompatible platform.
+        """
+        newline = data.index(b"\n")
+        header = json.loads(data[:newline])
+        if (header.get("version") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder
+                or header.get("itemsize") != array.array(_TYPECODE).itemsize):
+            raise ValueError("Incompatible fuzzy index format")
+        sections = []
+        position = newline + 1
+        for length in header["sections"]:
+            sections.append(data[position:position + length])
+            position += length
+
+        def strings(blob: bytes, count: int) -> List[str]:
+            return blob.decode("utf-8", "surrogateescape").split("\n") if count else []
+
+        def numbers(blob: bytes) -> array.array:
+            values = array.array(_TYPECODE)
+            values.frombytes(blob)
+            return values
+
+        name_count, dir_count, gram_count = header["counts"]
+        names, dirs = strings(sections[0], name_count), strings(sections[1], dir_count)
+        gram_list, bounds = strings(sections[4], gram_count), numbers(sections[5])
+        grams = {gram: (bounds[i], bounds[i + 1]) for i, gram in enumerate(gram_list)}
+        return cls(
+            names, dirs, numbers(sections[2]), numbers(sections[3]), grams, numbers(sections[6]),
+            header["sep"], header["fingerprint"], header["built_at"]
+        )
+
+def _comparable(fingerprint: Any) -> Any:
+    """Fingerprint as it reads back from the JSON header (tuples become lists)."""
+    return json.loads(json.dumps(fingerprint))
+
+class FuzzyIndexManager:
+    """Keeps the process's fuzzy index loaded, persisted and reasonably fresh."""
+
+    def __init__(self, ttl: Optional[float] = None, path: Optional[str] = None):
+        self.ttl = float(os.getenv("EVERYTHING_SEARCH_FUZZY_TTL", "3600")) if ttl is None else ttl
+        self._path = path
+        self._index: Optional[FuzzyIndex] = None
+        self._lock = threading.Lock()
+        # Set when the build in progress (if any) finishes
+        self._build_done: Optional[threading.Event] = None
+
+    @property
+    def path(self) -> str:
+        return self._path or os.path.join(cache_dir(), INDEX_FILE)
+
+    def is_fresh(self, index: FuzzyIndex, fingerprint: Any) -> bool:
+        if fingerprint is not None:
+            return index.fingerprint == _comparable(fingerprint)
+        return time.time() - index.built_at < self.ttl
+
+    def index(
+        self,
+        source: Callable[[], Iterable[str]],
+        fingerprint: Any = None,
+        timeout: Optional[float] = None
+    ) -> Optional[FuzzyIndex]:
+        """A usable index, or None when there is none yet.
+
+        Indexes are always built in the background.  When none exists the
+        caller waits for the first one up to ``timeout`` seconds (None waits
+        until it is built).
+
+        Args:
+            source: Returns every path the backend knows about.
+            fingerprint: ``SearchProvider.index_fingerprint()``, if any.
+            timeout: Longest wait for a first index.
+        """
+        with self._lock:
+            if self._index is None:
+                self._index = self._load()
+            index = self._index
+        if index is None:
+            self._rebuild_in_background(source, fingerprint).wait(timeout)
+            with self._lock:
+                return self._index
+        if not self.is_fresh(index, fingerprint):
+            self._rebuild_in_background(source, fingerprint)
+        return index
+
+    def _load(self) -> Optional[FuzzyIndex]:
+        try:
+            with open(self.path, "rb") as f:
+                return FuzzyIndex.from_bytes(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            logger.warning("Ignoring unreadable fuzzy index %s: %s", self.path, e)
+            return None
+
+    def _build(self, source: Callable[[], Iterable[str]], fingerprint: Any) -> FuzzyIndex:
+        with METRICS.span('fuzzy_build'):
+            index = FuzzyIndex.build(source(), fingerprint=_comparable(fingerprint))
+        try:
+            atomic_write(self.path, index.to_bytes())
+        except OSError as e:
+            logger.warning("Could not save fuzzy index to %s: %s", self.path, e)
+        return index
+
+    def _rebuild_in_background(self, source: Callable[[], Iterable[str]], fingerprint: Any) -> threading.Event:
+        """Start a build unless one is running; returns the running build's event."""
+        with self._lock:
+            if self._build_done is not None and not self._build_done.is_set():
+                return self._build_done
+            done = self._build_done = threading.Event()
+
+        def rebuild() -> None:
+            try:
+                index = self._build(source, fingerprint)
+                with self._lock:
+                    self._index = index
+            except Exception as e:
+                logger.warning("Fuzzy index rebuild failed: %s", e)
+            finally:
+                done.set()
+
+        threading.Thread(target=rebuild, name="fuzzy-index-rebuild", daemon=True).start()
+        return done
+
+# Process-wide fuzzy index used by the search provider
+FUZZY_INDEX = FuzzyIndexManager()
@@ -0,0 +1,221 @@
+"""Query history and predictive prefetch.
+
+Agent sessions repeat themselves: the same project's ``*.py``,
+``package.json`` or test directories are searched first in nearly every
+session.  Each search's ``QueryKey`` is recorded with how often and how
+recently it was used, in a SQLite database under ``storage.cache_dir()``
+shared by all server processes.  On startup, and again whenever the server
+has been idle for ``EVERYTHING_SEARCH_PREFETCH_IDLE`` seconds, the
+``EVERYTHING_SEARCH_PREFETCH`` most used keys are searched into the result
+cache, so the first query of a new session is a cache hit.
+
+Popularity decays with a half-life of ``HALF_LIFE`` seconds.  Instead of
+decaying every row, each use adds ``2 ** ((now - epoch) / HALF_LIFE)`` to the
+key's weight: newer uses weigh more by exactly the decay factor, and
+ordering by weight is ordering by decayed popularity at any point in time.
+Before the weights could outgrow a float, the epoch stored in the database
+moves forward and every weight is scaled down by the same factor.
+
+Prefetching yields to live traffic: keys are searched one at a time with
+``Priority.BACKGROUND``, only while no live search has arrived since the
+round started, so a request never waits behind more than one prefetch.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .metrics import METRICS
+from .normalization import QueryKey, check_content_pattern, check_query_string
+from .result_cache import RESULT_CACHE, cache_key
+from .storage import cache_dir
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = "history-v1.sqlite"
+# Uses a week old count half as much as today's
+HALF_LIFE = 7 * 24 * 3600.0
+# Half-lives after which the epoch moves forward; weights stay below 2 ** 256
+MAX_HALVINGS = 256
+# How often the recorded uses are written out and idleness is checked
+FLUSH_INTERVAL = 30.0
+# Deadline of one prefetched search
+PREFETCH_TIMEOUT = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    key TEXT PRIMARY KEY,
+    weight REAL NOT NULL,
+    uses INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_weight ON history (weight);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+def _epoch(connection: sqlite3.Connection, now: float) -> float:
+    """The weights' epoch, moved to ``now`` (rescaling them) when too far behind."""
+    row = connection.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()
+    if row is not None and (now - row[0]) / HALF_LIFE <= MAX_HALVINGS:
+        return row[0]
+    if row is not None:
+        connection.execute("UPDATE history SET weight = weight * ?", (2.0 ** ((row[0] - now) / HALF_LIFE),))
+    connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('epoch', ?)", (now,))
+    return now
+
+class QueryHistory:
+    """Decayed use counts of search keys, buffered in memory and flushed in batches."""
+
+    def __init__(self, max_entries: Optional[int] = None, path: Optional[str] = None):
+        self.max_entries = int(os.getenv("EVERYTHING_SEARCH_HISTORY_SIZE", "200")) if max_entries is None else max_entries
+        self._path = path
+        # Times of the uses not yet written out, by stored key
+        self._pending: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def path(self) -> str:
+        return self._path or os.path.join(cache_dir(), HISTORY_FILE)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def record(self, key: QueryKey, now: Optional[float] = None) -> None:
+        """Count one use of ``key``; written out by the next ``flush``."""
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        stored_key = cache_key(key)
+        with self._lock:
+            self._pending.setdefault(stored_key, []).append(now)
+
+    def flush(self) -> None:
+        """Add the buffered uses to the database and drop its least popular keys."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            connection = self._connect()
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                epoch = _epoch(connection, max(max(uses) for uses in pending.values()))
+                connection.executemany(
+                    "INSERT INTO history (key, weight, uses, last_used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET weight = weight + excluded.weight, "
+                    "uses = uses + excluded.uses, last_used = MAX(last_used, excluded.last_used)",
+                    [
+                        (stored_key, sum(2.0 ** ((t - epoch) / HALF_LIFE) for t in uses), len(uses), max(uses))
+                        for stored_key, uses in pending.items()
+                    ]
+                )
+                connection.execute(
+                    "DELETE FROM history WHERE key NOT IN "
+                    "(SELECT key FROM history ORDER BY weight DESC LIMIT ?)", (self.max_entries,)
+                )
+                connection.execute("COMMIT")
+            finally:
+                connection.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Query history update failed: %s", e)
+
+    def top(self, limit: int) -> List[QueryKey]:
+        """The ``limit`` most popular keys, most popular first."""
+        if not self.enabled or limit <= 0:
+            return []
+        try:
+            connection = self._connect()
+            try:
+                rows = connection.execute(
+                    "SELECT key FROM history ORDER BY weight DESC LIMIT ?", (limit,)
+                ).fetchall()
+            finally:
+                connection.close()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Query history lookup failed: %s", e)
+            return []
+        keys = []
+        for (stored_key,) in rows:
+            try:
+                key = QueryKey.from_json(json.loads(stored_key))
+                check_query_string(key.query)
+                check_content_pattern(key.content)
+            except (ValueError, TypeError):
+                continue  # Written by an incompatible version or under a laxer query policy
+            keys.append(key)
+        return keys
+
+class Prefetcher:
+    """Searches the most used keys into the result cache while the server is idle."""
+
+    def __init__(
+        self,
+        history: QueryHistory,
+        search: Callable[[QueryKey], Awaitable[object]],
+        limit: Optional[int] = None,
+        idle_after: Optional[float] = None
+    ):
+        self.history = history
+        self.search = search
+        self.limit = int(os.getenv("EVERYTHING_SEARCH_PREFETCH", "10")) if limit is None else limit
+        self.idle_after = float(os.getenv("EVERYTHING_SEARCH_PREFETCH_IDLE", "300")) if idle_after is None else idle_after
+        self.requests = 0
+        self._last_request = time.monotonic()
+        self._prefetched_at = -1
+
+    @property
+    def enabled(self) -> bool:
+        """Prefetched results have to land somewhere."""
+        return self.limit > 0 and self.history.enabled and RESULT_CACHE.enabled
+
+    def note_request(self) -> None:
+        """Called for every live search; stops a prefetch round in progress."""
+        self.requests += 1
+        self._last_request = time.monotonic()
+
+    async def prefetch(self) -> int:
+        """Search the most used keys until live traffic arrives; returns how many ran."""
+        loop = asyncio.get_running_loop()
+        keys = await loop.run_in_executor(None, self.history.top, self.limit)
+        started_at = self.requests
+        self._prefetched_at = started_at
+        done = 0
+        for key in keys:
+            if self.requests != started_at:
+                break
+            try:
+                await self.search(key)
+            except Exception as e:
+                logger.debug("Prefetch of %r failed: %s", key.query, e)
+                continue
+            done += 1
+        METRICS.increment('prefetched', done)
+        return done
+
+    async def run(self, interval: float = FLUSH_INTERVAL) -> None:
+        """Prefetch now and after each idle period, flushing the history as it goes."""
+        loop = asyncio.get_running_loop()
+        if self.enabled:
+            await self.prefetch()
+        while True:
+            await asyncio.sleep(interval)
+            await loop.run_in_executor(None, self.history.flush)
+            idle = time.monotonic() - self._last_request >= self.idle_after
+            # Once per idle period: a round without new requests changes nothing
+            if self.enabled and idle and self._prefetched_at != self.requests:
+                await self.prefetch()
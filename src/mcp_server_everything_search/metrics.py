@@ -0,0 +1,143 @@
+"""Low-overhead timing spans and counters for the search pipeline.
+
+Stage timings are collected into fixed-bucket histograms and exposed as JSON
+(the ``metrics://search`` resource) or in the Prometheus text format, which
+can also be written to the file named by ``EVERYTHING_SEARCH_METRICS_FILE``.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds; the last bucket catches everything slower
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Cumulative-bucket latency histogram."""
+
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket holding it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.maximum)
+        return self.maximum
+
+class MetricsRegistry:
+    """Thread-safe registry of stage histograms and event counters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._last_export = 0.0
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of ``stage``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Summaries of all stages and counters, in milliseconds."""
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": h.count,
+                    "total_ms": round(h.total * 1000, 3),
+                    "mean_ms": round(h.total / h.count * 1000, 3) if h.count else 0.0,
+                    "p50_ms": round(h.quantile(0.5) * 1000, 3),
+                    "p99_ms": round(h.quantile(0.99) * 1000, 3),
+                    "max_ms": round(h.maximum * 1000, 3),
+                }
+                for stage, h in sorted(self._histograms.items())
+            }
+            return {"stages": stages, "counters": dict(sorted(self._counters.items()))}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines: List[str] = [
+            "# HELP everything_search_stage_seconds Time spent per search stage.",
+            "# TYPE everything_search_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h.counts):
+                    cumulative += count
+                    lines.append(f'everything_search_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'everything_search_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'everything_search_stage_seconds_sum{{stage="{stage}"}} {h.total:.6f}')
+                lines.append(f'everything_search_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE everything_search_{name}_total counter")
+                lines.append(f"everything_search_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Optional[str] = None, min_interval: float = 1.0) -> None:
+        """Write the Prometheus text to ``path``, at most once per ``min_interval``."""
+        path = path or os.getenv("EVERYTHING_SEARCH_METRICS_FILE")
+        if not path:
+            return
+        now = time.monotonic()
+        if now - self._last_export < min_interval:
+            return
+        self._last_export = now
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write metrics file %s: %s", path, e)
+
+# Process-wide registry used by the server and the search backends
+METRICS = MetricsRegistry()
@@ -0,0 +1,169 @@
+"""Request normalization for the search tool.
+
+Tool arguments are checked, validated and reduced to a canonical, hashable
+``QueryKey`` in a single pass.  The key is what the rest of the server works
+with: it is passed to the search provider and used to identify equivalent
+requests for caching, de-duplication and metrics.
+"""
+
+import os
+import platform
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+from .platform_search import ContentQuery, MetadataFilters, SearchToolArguments, WindowsSortOption
+from .query_syntax import canonical_query
+from .security import SensitiveFileFilter
+
+class QueryKey(NamedTuple):
+    """Canonical form of a search request."""
+    query: str
+    max_results: int
+    match_path: bool = False
+    match_case: bool = False
+    match_whole_word: bool = False
+    match_regex: bool = False
+    sort_by: Optional[int] = None
+    filters: Optional[MetadataFilters] = None
+    rank_by_relevance: bool = False
+    fuzzy: bool = False
+    content: Optional[ContentQuery] = None
+
+    def search_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for ``SearchProvider.search_files``."""
+        return self._asdict()
+
+    def to_json(self) -> Dict[str, Any]:
+        """JSON-serializable form of the key, for traces and logs."""
+        data = self._asdict()
+        if self.filters is not None:
+            data['filters'] = self.filters.model_dump(mode='json', exclude_none=True)
+        if self.content is not None:
+            data['content'] = self.content.model_dump(mode='json')
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "QueryKey":
+        """Rebuild a key from its ``to_json`` form."""
+        data = dict(data)
+        if data.get('filters') is not None:
+            data['filters'] = MetadataFilters.model_validate(data['filters'])
+        if data.get('content') is not None:
+            data['content'] = ContentQuery.model_validate(data['content'])
+        return cls(**data)
+
+class NormalizedRequest(NamedTuple):
+    """A validated request: the query identity plus per-call options."""
+    key: QueryKey
+    timeout: float
+    max_response_bytes: Optional[int] = None
+
+# Default search deadline in seconds when the request does not set one
+DEFAULT_TIMEOUT = float(os.getenv('EVERYTHING_SEARCH_TIMEOUT', '30'))
+# Default response budget in bytes when the request does not set one; 0 is unlimited
+DEFAULT_MAX_RESPONSE_BYTES = int(os.getenv('EVERYTHING_SEARCH_MAX_RESPONSE_BYTES', '0'))
+
+@lru_cache(maxsize=None)
+def _arguments_adapter() -> TypeAdapter:
+    """Validator for the search tool arguments, built once per process."""
+    return TypeAdapter(SearchToolArguments)
+
+@lru_cache(maxsize=None)
+def _default_sort(system: str) -> Optional[int]:
+    """Everything always sorts; command-line backends keep their own order."""
+    return int(WindowsSortOption.NAME_ASC) if system == "windows" else None
+
+def format_validation_error(error: ValidationError) -> str:
+    """Collapse a pydantic error into one concise line."""
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    message = first["msg"]
+    if message.startswith("Value error, "):
+        message = message[len("Value error, "):]
+    return f"Invalid '{location}': {message}" if location else message
+
+def check_query_string(query: str) -> str:
+    """Apply the query policy checks and return the canonical query text."""
+    query = query.strip()
+    if not query:
+        raise ValueError("Empty query not allowed")
+
+    # Check for sensitive queries
+    if SensitiveFileFilter.is_sensitive_query(query):
+        raise ValueError("Query contains restricted keywords")
+
+    return query
+
+def check_content_pattern(content: Optional[ContentQuery]) -> None:
+    """Apply the query policy to a content pattern, whose matching lines are returned verbatim."""
+    if content is not None and SensitiveFileFilter.is_sensitive_query(content.pattern):
+        raise ValueError("Content pattern contains restricted keywords")
+
+def normalize_arguments(arguments: Dict[str, Any]) -> NormalizedRequest:
+    """Validate raw ``search`` tool arguments and return the normalized request.
+
+    The query policy checks run on the raw string first, so restricted or
+    empty queries are rejected before any model is constructed.
+
+    Raises:
+        ValueError: If the arguments are invalid or the query is rejected.
+    """
+    base = arguments.get('base') if isinstance(arguments, dict) else None
+    if isinstance(base, dict) and isinstance(base.get('query'), str):
+        query = check_query_string(base['query'])
+    else:
+        query = None
+
+    try:
+        args = _arguments_adapter().validate_python(arguments)
+    except ValidationError as e:
+        raise ValueError(format_validation_error(e))
+
+    if query is None:
+        query = check_query_string(args.base.query)
+    check_content_pattern(args.base.content)
+
+    # Filters without any condition are the same search as no filters
+    filters = args.base.filters
+    if filters is not None and filters.is_empty():
+        filters = None
+
+    params = args.windows_params
+    # Regexes and fuzzy filenames aren't Everything syntax
+    if not (params is not None and params.match_regex) and not args.base.fuzzy:
+        # Checked again once parsed: quotes can split a keyword in the raw text
+        query = check_query_string(canonical_query(query))
+
+    if params is None:
+        key = QueryKey(
+            query=query,
+            max_results=args.base.max_results,
+            sort_by=_default_sort(platform.system().lower()),
+            filters=filters,
+            rank_by_relevance=args.base.rank_by_relevance,
+            fuzzy=args.base.fuzzy,
+            content=args.base.content
+        )
+    else:
+        key = QueryKey(
+            query=query,
+            max_results=args.base.max_results,
+            match_path=params.match_path,
+            match_case=params.match_case,
+            match_whole_word=params.match_whole_word,
+            match_regex=params.match_regex,
+            # Without an explicit sort, the backend keeps its own order
+            sort_by=(
+                int(params.sort_by) if 'sort_by' in params.model_fields_set
+                else _default_sort(platform.system().lower())
+            ),
+            filters=filters,
+            rank_by_relevance=args.base.rank_by_relevance,
+            fuzzy=args.base.fuzzy,
+            content=args.base.content
+        )
+    timeout = args.base.timeout if args.base.timeout is not None else DEFAULT_TIMEOUT
+    max_response_bytes = args.base.max_response_bytes or DEFAULT_MAX_RESPONSE_BYTES or None
+    return NormalizedRequest(key, timeout, max_response_bytes)
@@ -1,9 +1,122 @@
 """Platform-specific search implementations with dedicated parameter models."""
 
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field
+from datetime import datetime
+from functools import lru_cache
+from typing import Literal, Optional, List, Dict, Any, Tuple
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 from enum import Enum
+import json
 import platform
+import re
+
+class MetadataFilters(BaseModel):
+    """File metadata conditions a result has to satisfy.
+
+    Immutable (and hashable) so it can be part of a ``QueryKey``.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    min_size: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Minimum file size in bytes"
+    )
+    max_size: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Maximum file size in bytes"
+    )
+    modified_after: Optional[datetime] = Field(
+        default=None,
+        description="Only items modified at or after this time (ISO 8601)"
+    )
+    modified_before: Optional[datetime] = Field(
+        default=None,
+        description="Only items modified at or before this time (ISO 8601)"
+    )
+    created_after: Optional[datetime] = Field(
+        default=None,
+        description="Only items created at or after this time (ISO 8601)"
+    )
+    created_before: Optional[datetime] = Field(
+        default=None,
+        description="Only items created at or before this time (ISO 8601)"
+    )
+    changed_after: Optional[datetime] = Field(
+        default=None,
+        description="Only items added or changed at or after this time (Everything's recently-changed date, the inode change time elsewhere)"
+    )
+    extensions: Optional[Tuple[str, ...]] = Field(
+        default=None,
+        description="Allowed file extensions, e.g. [\"log\", \"txt\"]"
+    )
+    file_type: Optional[Literal["file", "folder"]] = Field(
+        default=None,
+        description="Only return files or only return folders"
+    )
+
+    @field_validator("extensions")
+    @classmethod
+    def _normalize_extensions(cls, value: Optional[Tuple[str, ...]]) -> Optional[Tuple[str, ...]]:
+        """Lowercase, drop leading dots and duplicates, keep a stable order."""
+        if value is None:
+            return None
+        extensions = tuple(sorted({ext.strip().lstrip(".").lower() for ext in value} - {""}))
+        if not extensions:
+            raise ValueError("At least one non-empty extension is required")
+        return extensions
+
+    @model_validator(mode="after")
+    def _check_ranges(self) -> "MetadataFilters":
+        for low, high in (("min_size", "max_size"), ("modified_after", "modified_before"),
+                          ("created_after", "created_before")):
+            lower, upper = getattr(self, low), getattr(self, high)
+            if lower is None or upper is None:
+                continue
+            if isinstance(lower, datetime):
+                # Naive and timezone-aware times only compare as timestamps
+                lower, upper = lower.timestamp(), upper.timestamp()
+            if lower > upper:
+                raise ValueError(f"{low} must not be greater than {high}")
+        return self
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in self.__dict__.values())
+
+class ContentQuery(BaseModel):
+    """Text the files found by the filename query have to contain.
+
+    Immutable (and hashable) so it can be part of a ``QueryKey``.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    pattern: str = Field(
+        min_length=1,
+        description="Text to look for inside the matched files"
+    )
+    regex: bool = Field(
+        default=False,
+        description="Treat pattern as a regular expression (matched against UTF-8 bytes)"
+    )
+    match_case: bool = Field(
+        default=False,
+        description="Case-sensitive content match (case folding is ASCII only)"
+    )
+    max_hits_per_file: int = Field(
+        default=3,
+        ge=1,
+        le=50,
+        description="Matching lines reported per file"
+    )
+
+    @model_validator(mode="after")
+    def _check_regex(self) -> "ContentQuery":
+        if self.regex:
+            try:
+                re.compile(self.pattern.encode("utf-8"))
+            except re.error as e:
+                raise ValueError(f"Invalid content regex: {e}")
+        return self
 
 class BaseSearchQuery(BaseModel):
     """Base search parameters common to all platforms."""
@@ -16,6 +129,34 @@ class BaseSearchQuery(BaseModel):
         le=1000,
         description="Maximum number of results to return (1-1000)"
     )
+    timeout: Optional[float] = Field(
+        default=None,
+        gt=0,
+        le=300,
+        description="Seconds before the search stops and returns partial results (default 30)"
+    )
+    max_response_bytes: Optional[int] = Field(
+        default=None,
+        ge=1024,
+        le=10_000_000,
+        description="Size budget of the response in UTF-8 bytes (about 4 per token); rows past it are summarized by directory and extension"
+    )
+    filters: Optional[MetadataFilters] = Field(
+        default=None,
+        description="Size, date, extension and file/folder conditions applied by the search backend"
+    )
+    rank_by_relevance: bool = Field(
+        default=False,
+        description="Order results by relevance (filename match, path depth, recency, run count) instead of sort_by"
+    )
+    fuzzy: bool = Field(
+        default=False,
+        description="Typo-tolerant filename search: the query is a (possibly misspelled) filename and matches are ranked by edit distance"
+    )
+    content: Optional[ContentQuery] = Field(
+        default=None,
+        description="Only return files containing this text; each result lists its matching lines"
+    )
 
 class MacSpecificParams(BaseModel):
     """macOS-specific search parameters for mdfind."""
@@ -90,7 +231,7 @@ class WindowsSpecificParams(BaseModel):
     )
     sort_by: WindowsSortOption = Field(
         default=WindowsSortOption.NAME_ASC,
-        description="Sort order for results"
+        description="Sort order for results (applied server-side for locate/mdfind)"
     )
 
 class UnifiedSearchQuery(BaseSearchQuery):
@@ -102,34 +243,7 @@ class UnifiedSearchQuery(BaseSearchQuery):
     @classmethod
     def get_schema_for_platform(cls) -> Dict[str, Any]:
         """Get the appropriate schema based on the current platform."""
-        system = platform.system().lower()
-
-        schema = {
-            "type": "object",
-            "properties": {
-                "base": BaseSearchQuery.model_json_schema()
-            },
-            "required": ["base"]
-        }
-
-        # Add platform-specific parameters
-        if system == "darwin":
-            schema["properties"]["mac_params"] = MacSpecificParams.model_json_schema()
-        elif system == "linux":
-            schema["properties"]["linux_params"] = LinuxSpecificParams.model_json_schema()
-        elif system == "windows":
-            windows_schema = WindowsSpecificParams.model_json_schema()
-            schema["properties"]["windows_params"] = windows_schema
-
-            # Add $defs for WindowsSortOption to fix schema validation
-            if "$defs" not in schema:
-                schema["$defs"] = {}
-
-            # Extract WindowsSortOption definition from the windows_params schema
-            if "$defs" in windows_schema and "WindowsSortOption" in windows_schema["$defs"]:
-                schema["$defs"]["WindowsSortOption"] = windows_schema["$defs"]["WindowsSortOption"]
-
-        return schema
+        return _platform_schema(platform.system().lower())
 
     def get_platform_params(self) -> Optional[BaseModel]:
         """Get the parameters specific to the current platform."""
@@ -142,6 +256,62 @@ class UnifiedSearchQuery(BaseSearchQuery):
             return self.windows_params
         return None
 
+class SearchToolArguments(BaseModel):
+    """Arguments accepted by the ``search`` tool."""
+    base: BaseSearchQuery = Field(
+        description="Search parameters common to all platforms"
+    )
+    windows_params: Optional[WindowsSpecificParams] = Field(
+        default=None,
+        description="Everything SDK options (also honored where the platform supports them)"
+    )
+
+    @field_validator("windows_params", mode="before")
+    @classmethod
+    def _parse_json_params(cls, value: Any) -> Any:
+        """Accept ``windows_params`` sent as a JSON-encoded string."""
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                raise ValueError("Invalid JSON")
+        return value
+
+@lru_cache(maxsize=None)
+def get_search_tool_schema() -> Dict[str, Any]:
+    """Input schema of the ``search`` tool, generated once from the models."""
+    return SearchToolArguments.model_json_schema()
+
+@lru_cache(maxsize=None)
+def _platform_schema(system: str) -> Dict[str, Any]:
+    """Build the platform-specific schema once per platform name."""
+    schema = {
+        "type": "object",
+        "properties": {
+            "base": BaseSearchQuery.model_json_schema()
+        },
+        "required": ["base"]
+    }
+
+    # Add platform-specific parameters
+    if system == "darwin":
+        schema["properties"]["mac_params"] = MacSpecificParams.model_json_schema()
+    elif system == "linux":
+        schema["properties"]["linux_params"] = LinuxSpecificParams.model_json_schema()
+    elif system == "windows":
+        windows_schema = WindowsSpecificParams.model_json_schema()
+        schema["properties"]["windows_params"] = windows_schema
+
+        # Add $defs for WindowsSortOption to fix schema validation
+        if "$defs" not in schema:
+            schema["$defs"] = {}
+
+        # Extract WindowsSortOption definition from the windows_params schema
+        if "$defs" in windows_schema and "WindowsSortOption" in windows_schema["$defs"]:
+            schema["$defs"]["WindowsSortOption"] = windows_schema["$defs"]["WindowsSortOption"]
+
+    return schema
+
 def build_search_command(query: UnifiedSearchQuery) -> List[str]:
     """Build the appropriate search command based on platform and parameters."""
     system = platform.system().lower()
@@ -0,0 +1,239 @@
+"""Opt-in sampled profiling of search requests.
+
+When enabled (``EVERYTHING_SEARCH_PROFILE_RATE`` > 0 or the
+``configure_profiling`` tool), a sampled fraction of tool calls runs under
+cProfile and tracemalloc.  The slowest traces are kept, together with their
+normalized query, and exposed through the ``profiles://search`` resource.
+
+Only one request is profiled at a time so concurrent requests never fight
+over the interpreter's profiling hooks.
+"""
+
+import contextvars
+import cProfile
+import heapq
+import io
+import itertools
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel, Field
+
+# Profile session of the request being handled in the current context
+_current_session: contextvars.ContextVar = contextvars.ContextVar("profile_session", default=None)
+
+class ProfilingArguments(BaseModel):
+    """Arguments accepted by the ``configure_profiling`` tool."""
+    enabled: Optional[bool] = Field(
+        default=None,
+        description="Turn sampled profiling on or off"
+    )
+    sample_rate: Optional[float] = Field(
+        default=None,
+        ge=0,
+        le=1,
+        description="Fraction of search calls to profile (0-1)"
+    )
+    keep: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=1000,
+        description="Number of slowest traces to keep"
+    )
+    trace_memory: Optional[bool] = Field(
+        default=None,
+        description="Also record allocations with tracemalloc"
+    )
+    clear: bool = Field(
+        default=False,
+        description="Discard the traces collected so far"
+    )
+
+class ProfileSession:
+    """Profiling data gathered for one sampled request."""
+
+    def __init__(self, trace_memory: bool):
+        self.query: Optional[Dict[str, Any]] = None
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.trace_memory = trace_memory
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add_profile(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            self.profiles.append(profile)
+
+    def cpu_report(self, limit: int) -> str:
+        """Top functions by cumulative time across all threads of the request."""
+        stream = io.StringIO()
+        with self._lock:
+            if not self.profiles:
+                return ""
+            stats = pstats.Stats(self.profiles[0], stream=stream)
+            for profile in self.profiles[1:]:
+                stats.add(profile)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+class QueryProfiler:
+    """Samples requests into cProfile/tracemalloc traces and keeps the slowest."""
+
+    def __init__(self, sample_rate: Optional[float] = None, keep: Optional[int] = None, trace_memory: bool = True):
+        self.sample_rate = float(os.getenv("EVERYTHING_SEARCH_PROFILE_RATE", "0")) if sample_rate is None else sample_rate
+        self.keep = int(os.getenv("EVERYTHING_SEARCH_PROFILE_KEEP", "20")) if keep is None else keep
+        self.trace_memory = trace_memory
+        self.top_functions = 25
+        self._traces: List[Any] = []
+        self._sequence = itertools.count()
+        self._active = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        keep: Optional[int] = None,
+        trace_memory: Optional[bool] = None,
+        clear: bool = False
+    ) -> None:
+        """Change profiling settings at runtime."""
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            if enabled is False:
+                self.sample_rate = 0.0
+            elif enabled and not self.sample_rate:
+                self.sample_rate = 1.0
+            if trace_memory is not None:
+                self.trace_memory = trace_memory
+            if keep is not None:
+                self.keep = keep
+                while len(self._traces) > keep:
+                    heapq.heappop(self._traces)
+            if clear:
+                self._traces.clear()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "keep": self.keep,
+            "trace_memory": self.trace_memory,
+            "traces": len(self._traces),
+        }
+
+    def _try_start(self) -> bool:
+        with self._lock:
+            if self._active or not self.enabled or random.random() >= self.sample_rate:
+                return False
+            self._active = True
+            return True
+
+    @contextmanager
+    def profile(self) -> Iterator[Optional[ProfileSession]]:
+        """Profile the enclosed request if it is sampled.
+
+        Yields the ``ProfileSession`` (so the caller can attach the normalized
+        query) or None when the request is not sampled.
+        """
+        if not self._try_start():
+            yield None
+            return
+
+        session = ProfileSession(self.trace_memory)
+        token = _current_session.set(session)
+        started_tracing = False
+        if session.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        profile = _start_profile()
+        started = time.perf_counter()
+        try:
+            yield session
+        finally:
+            duration = time.perf_counter() - started
+            if profile is not None:
+                profile.disable()
+                session.add_profile(profile)
+            memory: Dict[str, Any] = {}
+            if session.trace_memory and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+                memory = {
+                    "current_kb": current // 1024,
+                    "peak_kb": peak // 1024,
+                    "top_allocations": [str(stat) for stat in top],
+                }
+                if started_tracing:
+                    tracemalloc.stop()
+            _current_session.reset(token)
+            self._record(session, duration, memory)
+            with self._lock:
+                self._active = False
+
+    def wrap(self, func: Callable[[], Any]) -> Callable[[], Any]:
+        """Make ``func`` profile itself when it runs on another thread.
+
+        Must be called in the context of the request; the returned callable
+        adds its own profile to that request's session.
+        """
+        session = _current_session.get()
+        if session is None:
+            return func
+
+        def profiled() -> Any:
+            profile = _start_profile()
+            try:
+                return func()
+            finally:
+                if profile is not None:
+                    profile.disable()
+                    session.add_profile(profile)
+        return profiled
+
+    def _record(self, session: ProfileSession, duration: float, memory: Dict[str, Any]) -> None:
+        trace = {
+            "query": session.query,
+            "started_at": session.started_at,
+            "duration_ms": round(duration * 1000, 3),
+            "cpu_profile": session.cpu_report(self.top_functions),
+            "memory": memory,
+        }
+        with self._lock:
+            heapq.heappush(self._traces, (duration, next(self._sequence), trace))
+            while len(self._traces) > self.keep:
+                heapq.heappop(self._traces)
+
+    def traces(self) -> List[Dict[str, Any]]:
+        """Kept traces, slowest first."""
+        with self._lock:
+            return [trace for _, _, trace in sorted(self._traces, reverse=True)]
+
+    def to_json(self) -> str:
+        return json.dumps({"status": self.status(), "traces": self.traces()}, indent=2)
+
+def _start_profile() -> Optional[cProfile.Profile]:
+    """Enable a profiler for this thread, if the interpreter allows another one."""
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ allows a single profiler per interpreter; the one
+        # already running covers this thread as well
+        return None
+    return profile
+
+# Process-wide profiler used by the server
+PROFILER = QueryProfiler()
@@ -0,0 +1,365 @@
+"""Everything search syntax: parsed once, lowered to each backend.
+
+A query is tokenized and parsed into a small AST, cached per query string:
+
+* whitespace is AND, ``|`` is OR (binding tighter than AND, as in
+  Everything), ``!`` is NOT and ``< >`` groups
+* ``"..."`` quotes text, so spaces and operators inside it are literal
+* ``*`` and ``?`` are wildcards; a term with wildcards has to match the
+  whole filename, a term without them matches anywhere in it
+* a term matches the full path instead of the filename when it contains a
+  path separator, is prefixed with ``path:``, or the search sets match_path
+* ``ext:py;txt`` matches file extensions
+* other Everything functions (``size:``, ``dm:``, ...) are kept for
+  Everything; the command-line backends reject them
+
+The AST is lowered to a canonical Everything string (``to_everything``), to
+a locate invocation plus a post-filter (``locate_plan``) and to an mdfind
+``-name`` invocation plus a post-filter (``mdfind_plan``).  The backend
+plans push the most selective condition down to the index and evaluate
+the full query on what comes back, so every backend answers the query the
+way Everything would.
+"""
+
+import os
+import re
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
+
+class Term(NamedTuple):
+    """Text matched against the filename (or path)."""
+    text: str
+    match_path: bool = False
+    quoted: bool = False
+
+class Extension(NamedTuple):
+    """``ext:`` with its lowercased extensions."""
+    extensions: Tuple[str, ...]
+
+class Function(NamedTuple):
+    """An Everything search function only Everything can evaluate."""
+    name: str
+    value: str
+
+class Not(NamedTuple):
+    operand: "Node"
+
+class And(NamedTuple):
+    operands: Tuple["Node", ...]
+
+class Or(NamedTuple):
+    operands: Tuple["Node", ...]
+
+Node = Union[Term, Extension, Function, Not, And, Or]
+
+# Everything functions and modifiers recognized before a ':'
+EVERYTHING_FUNCTIONS = frozenset("""
+    size count childcount childfilecount childfoldercount len
+    datemodified dm dateaccessed da datecreated dc daterun dr recentchange rc
+    attrib attributes type parent infolder nosubfolders startwith endwith child
+    depth parents shell filelist filelistfilename frn fsi
+    case nocase file folder nopath regex noregex wfn nowfn wholeword ww
+    wildcards nowildcards
+""".split())
+
+_WILDCARDS = frozenset("*?")
+# Characters locate would treat as glob syntax in a plain pattern
+_LOCATE_GLOB = frozenset("*?[\\")
+_COMPARISON = re.compile(r"<=|>=|<|>|=")
+_FUNCTION = re.compile(r"([A-Za-z]+):")
+# Characters that have to be quoted to survive in an Everything query
+_NEEDS_QUOTES = re.compile(r'[\s|<>"]|^!')
+
+class _Token(NamedTuple):
+    kind: str  # 'term', 'or', 'not', 'open' or 'close'
+    text: str = ""
+    quoted: bool = False
+    function: Optional[str] = None
+
+def _read_text(query: str, i: int, stop: str) -> Tuple[str, bool, int]:
+    """Read term text from ``query[i]`` up to whitespace or a ``stop`` character.
+
+    Returns the text with quotes removed, whether any part was quoted, and
+    the index after it.
+    """
+    chars: List[str] = []
+    quoted = False
+    while i < len(query):
+        char = query[i]
+        if char == '"':
+            end = query.find('"', i + 1)
+            if end < 0:
+                raise ValueError("Unterminated quote in query")
+            chars.append(query[i + 1:end])
+            quoted = True
+            i = end + 1
+        elif char.isspace() or char in stop:
+            break
+        else:
+            chars.append(char)
+            i += 1
+    return "".join(chars), quoted, i
+
+def tokenize(query: str) -> List[_Token]:
+    tokens: List[_Token] = []
+    i = 0
+    while i < len(query):
+        char = query[i]
+        if char.isspace():
+            i += 1
+        elif char == "|":
+            tokens.append(_Token("or"))
+            i += 1
+        elif char == "!":
+            tokens.append(_Token("not"))
+            i += 1
+        elif char == "<":
+            tokens.append(_Token("open"))
+            i += 1
+        elif char == ">":
+            tokens.append(_Token("close"))
+            i += 1
+        else:
+            function = _FUNCTION.match(query, i)
+            name = function.group(1).lower() if function else None
+            if name in EVERYTHING_FUNCTIONS or name in ("ext", "path"):
+                i = function.end()
+                # Comparisons such as size:>1mb are part of the value
+                operator = _COMPARISON.match(query, i) if name in EVERYTHING_FUNCTIONS else None
+                prefix = operator.group() if operator else ""
+                i += len(prefix)
+                value, quoted, i = _read_text(query, i, "|<>")
+                tokens.append(_Token("term", prefix + value, quoted, name))
+            else:
+                text, quoted, i = _read_text(query, i, "|<>")
+                tokens.append(_Token("term", text, quoted))
+    return tokens
+
+class _Parser:
+    """Recursive descent over the tokens: and := or+, or := unary ('|' unary)*."""
+
+    def __init__(self, tokens: List[_Token]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[_Token]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def parse(self) -> Node:
+        node = self.parse_and()
+        if self.peek() is not None:
+            raise ValueError("Unbalanced '>' in query")
+        return node
+
+    def parse_and(self) -> Node:
+        operands = []
+        while self.peek() is not None and self.peek().kind != "close":
+            operands.append(self.parse_or())
+        if not operands:
+            raise ValueError("Empty query not allowed")
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+    def parse_or(self) -> Node:
+        operands = [self.parse_unary()]
+        while self.peek() is not None and self.peek().kind == "or":
+            self.pos += 1
+            operands.append(self.parse_unary())
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+    def parse_unary(self) -> Node:
+        token = self.peek()
+        if token is None:
+            raise ValueError("Query ends with an operator")
+        self.pos += 1
+        if token.kind == "not":
+            return Not(self.parse_unary())
+        if token.kind == "open":
+            node = self.parse_and()
+            if self.peek() is None:
+                raise ValueError("Unbalanced '<' in query")
+            self.pos += 1
+            return node
+        if token.kind == "term":
+            return _term_node(token)
+        raise ValueError(f"Unexpected '{'|' if token.kind == 'or' else '>'}' in query")
+
+def _term_node(token: _Token) -> Node:
+    if token.function == "ext":
+        extensions = tuple(sorted({ext.strip().lstrip(".").lower() for ext in token.text.split(";")} - {""}))
+        if not extensions:
+            raise ValueError("ext: needs at least one extension")
+        return Extension(extensions)
+    if token.function == "path":
+        return Term(token.text, match_path=True, quoted=token.quoted)
+    if token.function is not None:
+        return Function(token.function, token.text)
+    return Term(token.text, quoted=token.quoted)
+
+@lru_cache(maxsize=1024)
+def parse_query(query: str) -> Node:
+    """The AST of an Everything-syntax query.
+
+    Raises:
+        ValueError: If the query is empty or malformed.
+    """
+    return _Parser(tokenize(query)).parse()
+
+# Everything rendering
+
+def _quote(text: str, quoted: bool) -> str:
+    return f'"{text}"' if quoted or not text or _NEEDS_QUOTES.search(text) else text
+
+def to_everything(node: Node) -> str:
+    """Canonical Everything query for ``node``."""
+    if isinstance(node, Term):
+        return ("path:" if node.match_path else "") + _quote(node.text, node.quoted)
+    if isinstance(node, Extension):
+        return "ext:" + ";".join(node.extensions)
+    if isinstance(node, Function):
+        operator = _COMPARISON.match(node.value)
+        prefix = operator.group() if operator else ""
+        rest = node.value[len(prefix):]
+        return f"{node.name}:{prefix}{_quote(rest, False) if rest else ''}"
+    if isinstance(node, Not):
+        operand = node.operand
+        inner = to_everything(operand)
+        return "!" + (f"<{inner}>" if isinstance(operand, (And, Or)) else inner)
+    if isinstance(node, Or):
+        return "|".join(
+            f"<{to_everything(operand)}>" if isinstance(operand, And) else to_everything(operand)
+            for operand in node.operands
+        )
+    return " ".join(to_everything(operand) for operand in node.operands)
+
+def canonical_query(query: str) -> str:
+    """Parse ``query`` and render it back in canonical Everything syntax."""
+    return to_everything(parse_query(query))
+
+def positive_terms(node: Node) -> List[str]:
+    """Texts of the terms and function values the query searches for (not excluded)."""
+    if isinstance(node, (Term, Function)):
+        return [node.text] if isinstance(node, Term) else [node.value]
+    if isinstance(node, Extension):
+        return list(node.extensions)
+    if isinstance(node, Not):
+        return []
+    return [text for operand in node.operands for text in positive_terms(operand)]
+
+# Evaluation on paths
+
+def _is_path_term(term: Term, match_path: bool) -> bool:
+    return match_path or term.match_path or "/" in term.text or "\\" in term.text
+
+def _has_wildcards(text: str) -> bool:
+    return any(char in _WILDCARDS for char in text)
+
+def _wildcard_regex(text: str, match_case: bool) -> "re.Pattern[str]":
+    pattern = "".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in text)
+    return re.compile(pattern, re.DOTALL | (0 if match_case else re.IGNORECASE))
+
+def compile_matcher(node: Node, match_case: bool = False, match_path: bool = False) -> Callable[[str], bool]:
+    """Predicate telling whether a path matches the query, as Everything would.
+
+    Raises:
+        ValueError: For Everything functions, which only Everything evaluates.
+    """
+    if isinstance(node, Term):
+        in_path = _is_path_term(node, match_path)
+        if _has_wildcards(node.text):
+            full_match = _wildcard_regex(node.text, match_case).fullmatch
+            if in_path:
+                return lambda path: full_match(path) is not None
+            return lambda path: full_match(os.path.basename(path)) is not None
+        needle = node.text if match_case else node.text.casefold()
+        fold = (lambda text: text) if match_case else str.casefold
+        if in_path:
+            return lambda path: needle in fold(path)
+        return lambda path: needle in fold(os.path.basename(path))
+    if isinstance(node, Extension):
+        extensions = set(node.extensions)
+        return lambda path: os.path.splitext(os.path.basename(path))[1][1:].lower() in extensions
+    if isinstance(node, Function):
+        raise ValueError(
+            f"'{node.name}:' is only supported by Everything; use the filters argument instead"
+        )
+    if isinstance(node, Not):
+        operand = compile_matcher(node.operand, match_case, match_path)
+        return lambda path: not operand(path)
+    operands = [compile_matcher(operand, match_case, match_path) for operand in node.operands]
+    if isinstance(node, Or):
+        return lambda path: any(match(path) for match in operands)
+    return lambda path: all(match(path) for match in operands)
+
+# Backend plans
+
+class IndexPlan(NamedTuple):
+    """What to ask the backend for and how to check what it returns.
+
+    ``patterns`` are run by the backend (any one may match); ``basename``
+    applies them to the filename only; ``post_filter`` is None when the
+    backend's answer is already exact.
+    """
+    patterns: Tuple[str, ...]
+    basename: bool
+    post_filter: Optional[Callable[[str], bool]]
+
+def _literal_length(pattern: str) -> int:
+    return sum(char not in _WILDCARDS for char in pattern)
+
+def _locate_patterns(node: Node, match_case: bool, match_path: bool) -> Optional[Tuple[Tuple[str, ...], bool]]:
+    """Locate patterns matching exactly what ``node`` matches, if it has any."""
+    if isinstance(node, Term):
+        if not node.text or any(char in node.text for char in "[\\"):
+            return None
+        # locate matches plain patterns anywhere and glob patterns in full,
+        # exactly like Everything terms; -b makes them apply to the filename
+        return (node.text,), not _is_path_term(node, match_path)
+    if isinstance(node, Extension) and not match_case:
+        return tuple(f"*.{ext}" for ext in node.extensions if not _LOCATE_GLOB & set(ext)), True
+    if isinstance(node, Or):
+        parts = [_locate_patterns(operand, match_case, match_path) for operand in node.operands]
+        if any(part is None for part in parts) or len({basename for _, basename in parts}) != 1:
+            return None
+        return tuple(pattern for patterns, _ in parts for pattern in patterns), parts[0][1]
+    return None
+
+def locate_plan(node: Node, match_case: bool = False, match_path: bool = False) -> IndexPlan:
+    """locate invocation for ``node``: the most selective required condition.
+
+    Falls back to listing every path (``/``) when no condition can be pushed
+    down, e.g. for a query that only excludes.
+    """
+    conjuncts = node.operands if isinstance(node, And) else (node,)
+    best = None
+    for conjunct in conjuncts:
+        pushed = _locate_patterns(conjunct, match_case, match_path)
+        if pushed is None or not pushed[0]:
+            continue
+        selectivity = min(_literal_length(pattern) for pattern in pushed[0])
+        if best is None or selectivity > best[0]:
+            best = (selectivity, pushed, conjunct)
+    matcher = compile_matcher(node, match_case, match_path)
+    if best is None:
+        return IndexPlan(("/",), False, matcher)
+    _, (patterns, basename), conjunct = best
+    return IndexPlan(patterns, basename, None if conjunct is node else matcher)
+
+def mdfind_plan(node: Node, match_case: bool = False, match_path: bool = False) -> IndexPlan:
+    """``mdfind -name`` text for ``node`` (a case-insensitive filename substring).
+
+    The longest wildcard-free run of a required filename term or of a single
+    extension is used.  With none, ``patterns`` is empty and the whole index
+    has to be listed.
+    """
+    conjuncts = node.operands if isinstance(node, And) else (node,)
+    best = ""
+    for conjunct in conjuncts:
+        if isinstance(conjunct, Term) and not _is_path_term(conjunct, match_path):
+            candidates = re.split(r"[*?]", conjunct.text)
+        elif isinstance(conjunct, Extension) and len(conjunct.extensions) == 1:
+            candidates = ["." + conjunct.extensions[0]]
+        else:
+            continue
+        best = max([best] + candidates, key=len)
+    matcher = compile_matcher(node, match_case, match_path)
+    return IndexPlan((best,) if best else (), True, matcher)
@@ -0,0 +1,128 @@
+"""Relevance ranking of search results.
+
+Candidates are scored on four signals, each in [0, 1]:
+
+* name: how well the filename matches the query terms (exact, prefix,
+  word start, substring), and how much of the name they cover
+* depth: shallower paths are preferred
+* recency: modification time, halving every ``RECENCY_HALF_LIFE_DAYS``
+* run_count: how often the file was opened through Everything
+
+Signals a backend can't provide are left out and the remaining weights
+rescaled.  Ranking runs in two phases: a bounded heap keeps the best
+``pool_size()`` candidates by the path-only signals (name and depth, no
+file system access), then only that pool is stat'ed for recency and
+ranked by the full score.
+"""
+
+import math
+import re
+import time
+from typing import Dict, List, Optional
+
+WEIGHTS: Dict[str, float] = {"name": 0.55, "depth": 0.15, "recency": 0.2, "run_count": 0.1}
+RECENCY_HALF_LIFE_DAYS = 30.0
+# Run count at which the run-count signal saturates
+RUN_COUNT_SATURATION = 100
+
+# Wildcards, operators and regex syntax separating the literal query terms
+_TERM_SPLIT = re.compile(r'[\s*?|"<>^$()\[\]{}+\\/!]+')
+_WORD_BREAKS = frozenset("_-. ")
+
+def pool_size(max_results: int) -> int:
+    """Candidates kept after the path-only phase for ``max_results`` answers."""
+    return min(max(max_results * 10, 200), 5000)
+
+def query_terms(query: str) -> List[str]:
+    """Literal terms of a query, lowercased; search functions like ``ext:py`` are skipped."""
+    return [term for term in _TERM_SPLIT.split(query.lower()) if term and ":" not in term]
+
+def highlighted_coverage(highlighted: str) -> Optional[float]:
+    """Fraction of an Everything-highlighted name inside ``*...*`` marks.
+
+    Everything wraps matched text in ``*`` and escapes a literal ``*`` as ``**``.
+    """
+    inside = False
+    matched = total = 0
+    i = 0
+    while i < len(highlighted):
+        char = highlighted[i]
+        if char == "*":
+            if highlighted[i + 1:i + 2] == "*":
+                i += 1
+            else:
+                inside = not inside
+                i += 1
+                continue
+        total += 1
+        matched += inside
+        i += 1
+    return matched / total if total else None
+
+class RelevanceScorer:
+    """Scores candidate paths for one query."""
+
+    def __init__(self, query: str, now: Optional[float] = None):
+        self.terms = query_terms(query)
+        self.now = time.time() if now is None else now
+
+    def name_score(self, filename: str, highlighted: Optional[str] = None) -> float:
+        """Match quality of the filename, from 0 (no term in the name) to 1 (exact)."""
+        if not self.terms:
+            return 0.5
+        name = filename.lower()
+        stem = name.rsplit(".", 1)[0] if "." in name[1:] else name
+        quality = 0.0
+        covered = 0
+        for term in self.terms:
+            if term == name or term == stem:
+                quality += 1.0
+            elif name.startswith(term):
+                quality += 0.8
+            else:
+                index = name.find(term)
+                if index < 0:
+                    continue
+                quality += 0.65 if name[index - 1] in _WORD_BREAKS else 0.45
+            covered += len(term)
+        quality /= len(self.terms)
+        coverage = highlighted_coverage(highlighted) if highlighted else None
+        if coverage is None:
+            coverage = min(1.0, covered / len(stem)) if stem else 0.0
+        return 0.85 * quality + 0.15 * coverage
+
+    @staticmethod
+    def depth_score(path: str) -> float:
+        depth = path.count("/") + path.count("\\")
+        return 1.0 / (1.0 + 0.1 * max(0, depth - 1))
+
+    def recency_score(self, modified: float) -> float:
+        age_days = max(0.0, self.now - modified) / 86400
+        return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    @staticmethod
+    def run_count_score(run_count: int) -> float:
+        return min(1.0, math.log1p(max(0, run_count)) / math.log1p(RUN_COUNT_SATURATION))
+
+    def score(
+        self,
+        path: str,
+        filename: Optional[str] = None,
+        modified: Optional[float] = None,
+        run_count: Optional[int] = None,
+        highlighted: Optional[str] = None
+    ) -> float:
+        """Weighted score of the available signals, in [0, 1]."""
+        if filename is None:
+            filename = re.split(r"[\\/]", path)[-1]
+        signals = {"name": self.name_score(filename, highlighted), "depth": self.depth_score(path)}
+        if modified is not None:
+            signals["recency"] = self.recency_score(modified)
+        if run_count is not None:
+            signals["run_count"] = self.run_count_score(run_count)
+        total = sum(WEIGHTS[signal] for signal in signals)
+        return sum(WEIGHTS[signal] * value for signal, value in signals.items()) / total
+
+    def path_score(self, path: str) -> float:
+        """Score from the path alone, used to pick the pool."""
+        return self.score(path)
@@ -0,0 +1,118 @@
+"""Literal prefilters for regex searches.
+
+locate evaluates a regex against every database entry, while a plain
+substring pattern takes its fast path.  Most regexes can only match paths
+containing some fixed text (``src/.*_test\\.py$`` needs ``_test.py``), so the
+longest such literal is searched without ``--regex`` and the compiled regex
+then runs only on the candidates it returns.
+
+The prefilter is used only for patterns in the subset of syntax that means
+the same to Python's ``re`` and to POSIX extended regexes (literals, ``.``,
+bracket ranges, groups, alternation, greedy repeats, ``^`` and ``$``), so a
+prefiltered search returns exactly what locate's regex mode would.
+"""
+
+import re
+from typing import Callable, List, NamedTuple, Optional
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Shorter literals match too much of the database to be worth it
+MIN_LITERAL_LENGTH = 3
+
+# Characters locate treats as wildcards in a non-regex pattern
+_GLOB_CHARS = re.compile(r"[*?\[\]\\]")
+# Escapes of letters and digits mean different things to Python and POSIX
+_ALNUM_ESCAPE = re.compile(r"\\[A-Za-z0-9]")
+
+_ALLOWED_AT = {sre_constants.AT_BEGINNING, sre_constants.AT_END}
+_ALLOWED_IN = {sre_constants.LITERAL, sre_constants.RANGE, sre_constants.NEGATE}
+
+class Unsupported(Exception):
+    """The pattern uses syntax outside the common Python/POSIX subset."""
+
+class RegexPrefilter(NamedTuple):
+    """Plain locate pattern to run and the check its candidates must pass."""
+    literal: str
+    matches: Callable[[str], bool]
+
+def _required(items) -> List[str]:
+    """Literal strings every match of the parsed ``items`` must contain."""
+    literals: List[str] = []
+    run: List[str] = []
+
+    def flush() -> None:
+        if run:
+            literals.append("".join(run))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+        elif op is sre_constants.SUBPATTERN:
+            _group, add_flags, del_flags, body = av
+            if add_flags or del_flags:
+                raise Unsupported("inline flags")
+            inner = _required(body)
+            if all(sub_op is sre_constants.LITERAL for sub_op, _ in body):
+                run.extend(inner[0] if inner else "")
+            else:
+                flush()
+                literals.extend(inner)
+        elif op is sre_constants.MAX_REPEAT:
+            low, _high, body = av
+            inner = _required(body)
+            flush()
+            if low >= 1:
+                literals.extend(inner)
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                _required(branch)  # Only checked; alternatives share no literal
+            flush()
+        elif op is sre_constants.IN:
+            if any(item_op not in _ALLOWED_IN for item_op, _ in av):
+                raise Unsupported("character class escape")
+            flush()
+        elif op is sre_constants.AT:
+            if av not in _ALLOWED_AT:
+                raise Unsupported("anchor")
+            flush()
+        elif op in (sre_constants.ANY, sre_constants.NOT_LITERAL):
+            flush()
+        else:
+            raise Unsupported(str(op))
+    flush()
+    return literals
+
+def required_literals(pattern: str) -> Optional[List[str]]:
+    """Fixed substrings every match of ``pattern`` contains.
+
+    None when the pattern is invalid or uses syntax outside the
+    Python/POSIX common subset.
+    """
+    if "(?" in pattern or "[:" in pattern or _ALNUM_ESCAPE.search(pattern):
+        return None
+    try:
+        return _required(sre_parse.parse(pattern))
+    except (Unsupported, re.error, OverflowError, RecursionError):
+        return None
+
+def locate_prefilter(pattern: str, ignore_case: bool) -> Optional[RegexPrefilter]:
+    """The prefilter for a locate regex search, or None to use ``--regex``."""
+    literals = required_literals(pattern)
+    if not literals:
+        return None
+    # Pieces free of glob characters, which locate would not take literally
+    pieces = [piece for literal in literals for piece in _GLOB_CHARS.split(literal)]
+    literal = max(pieces, key=len)
+    if len(literal) < MIN_LITERAL_LENGTH:
+        return None
+    # POSIX '.' also matches a newline
+    flags = re.DOTALL | (re.IGNORECASE if ignore_case else 0)
+    search = re.compile(pattern, flags).search
+    return RegexPrefilter(literal, lambda path: search(path) is not None)
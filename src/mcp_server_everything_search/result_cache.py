@@ -0,0 +1,241 @@
+"""Search results kept on disk, so repeated queries survive server restarts.
+
+Results are stored in a SQLite database under ``storage.cache_dir()``, one
+row per ``QueryKey``, as zlib-compressed JSON.  An entry is served while:
+
+* locate: the database fingerprint it was stored under is unchanged, for at
+  most ``EVERYTHING_SEARCH_RESULT_CACHE_MAX_AGE`` seconds
+* live indexes (Everything, Spotlight), and searches whose results depend on
+  file metadata or contents rather than only on the indexed paths: for
+  ``EVERYTHING_SEARCH_RESULT_CACHE_TTL`` seconds
+
+A locate entry outlives changes to the files it lists, so only its paths are
+stored; size and dates are stat'ed again on every hit.
+
+Truncated results are never stored.  Once the stored results exceed
+``EVERYTHING_SEARCH_RESULT_CACHE_BYTES`` the least recently used entries are
+evicted; a size of 0 disables the cache.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, List, Optional
+
+from .normalization import QueryKey
+from .search_interface import SearchResult, SearchResults
+from .storage import cache_dir
+from .watch import depends_on_metadata
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CACHE_FILE = f"results-v{FORMAT_VERSION}.sqlite"
+
+# Result attributes stored per row, in this order
+_FIELDS = ("path", "filename", "extension", "size", "created", "modified", "accessed",
+           "run_count", "score", "matches")
+_DATE_FIELDS = ("created", "modified", "accessed")
+# Attributes read from stat(), which go stale while the paths stay valid
+_STAT_FIELDS = ("size",) + _DATE_FIELDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+def cache_key(key: QueryKey) -> str:
+    return json.dumps(key.to_json(), sort_keys=True, separators=(",", ":"), default=str)
+
+def encode_results(results: List[Any], with_stat: bool = True) -> bytes:
+    """Compact form of a result list: the values of ``_FIELDS`` per row.
+
+    Without ``with_stat`` the ``_STAT_FIELDS`` are left out (stored as null).
+    """
+    rows = []
+    datetimes = False
+    for result in results:
+        row = {field: getattr(result, field, None) for field in _FIELDS}
+        if not with_stat:
+            row.update(dict.fromkeys(_STAT_FIELDS))
+        for field in _DATE_FIELDS:
+            if isinstance(row[field], datetime):
+                row[field] = row[field].isoformat()
+                datetimes = True
+        rows.append([row[field] for field in _FIELDS])
+    payload = {"datetimes": datetimes, "rows": rows}
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+def decode_results(data: bytes) -> SearchResults:
+    payload = json.loads(zlib.decompress(data).decode("utf-8"))
+    results = SearchResults()
+    for row in payload["rows"]:
+        values = dict(zip(_FIELDS, row))
+        if payload["datetimes"]:
+            for field in _DATE_FIELDS:
+                if values[field] is not None:
+                    values[field] = datetime.fromisoformat(values[field])
+        if values["matches"] is not None:
+            values["matches"] = [tuple(hit) for hit in values["matches"]]
+        results.append(SearchResult(**values))
+    return results
+
+def restat_results(results: SearchResults) -> SearchResults:
+    """Fill in the ``_STAT_FIELDS`` of each result from a fresh stat()."""
+    for result in results:
+        try:
+            stat = os.stat(result.path)
+        except (OSError, ValueError):
+            # Same as a search: a path that can't be stat'ed has no file information
+            continue
+        result.size = stat.st_size
+        result.created = datetime.fromtimestamp(stat.st_ctime)
+        result.modified = datetime.fromtimestamp(stat.st_mtime)
+        result.accessed = datetime.fromtimestamp(stat.st_atime)
+    return results
+
+class ResultCache:
+    """Disk-backed ``QueryKey`` -> results store shared by all server processes."""
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_age: Optional[float] = None,
+        path: Optional[str] = None
+    ):
+        env = os.getenv
+        self.max_bytes = int(env("EVERYTHING_SEARCH_RESULT_CACHE_BYTES", str(64 * 1024 * 1024))) if max_bytes is None else max_bytes
+        self.ttl = float(env("EVERYTHING_SEARCH_RESULT_CACHE_TTL", "60")) if ttl is None else ttl
+        self.max_age = float(env("EVERYTHING_SEARCH_RESULT_CACHE_MAX_AGE", "86400")) if max_age is None else max_age
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connected_path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def path(self) -> str:
+        return self._path or os.path.join(cache_dir(), CACHE_FILE)
+
+    def _connect(self) -> sqlite3.Connection:
+        path = self.path
+        if self._connection is None or self._connected_path != path:
+            if self._connection is not None:
+                self._connection.close()
+            connection = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            # Several server processes may share the file
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._connection, self._connected_path = connection, path
+        return self._connection
+
+    @staticmethod
+    def paths_only(key: QueryKey, fingerprint: Any) -> bool:
+        """Whether entries for ``key`` are stored without file information.
+
+        True for the long-lived locate entries, which stay valid as long as
+        the indexed paths do while the files themselves keep changing.
+        """
+        return fingerprint is not None and not depends_on_metadata(key)
+
+    def lifetime(self, key: QueryKey, fingerprint: Any) -> float:
+        """Seconds an entry for ``key`` stays valid (given a matching fingerprint)."""
+        if self.paths_only(key, fingerprint):
+            return self.max_age
+        return self.ttl
+
+    def get(self, key: QueryKey, fingerprint: Any = None) -> Optional[SearchResults]:
+        """Stored results for ``key`` if still valid, else None.
+
+        Args:
+            fingerprint: ``SearchProvider.index_fingerprint()``; entries stored
+                under a different one are stale.
+        """
+        if not self.enabled:
+            return None
+        stored_key = cache_key(key)
+        try:
+            with self._lock:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT fingerprint, created, data FROM results WHERE key = ?", (stored_key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                stored_fingerprint, created, data = row
+                now = time.time()
+                if (stored_fingerprint != _encode_fingerprint(fingerprint)
+                        or now - created >= self.lifetime(key, fingerprint)):
+                    connection.execute("DELETE FROM results WHERE key = ?", (stored_key,))
+                    return None
+                connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, stored_key))
+            results = decode_results(data)
+            if self.paths_only(key, fingerprint):
+                restat_results(results)
+            return results
+        except (sqlite3.Error, OSError, ValueError, KeyError, zlib.error) as e:
+            logger.warning("Result cache lookup failed: %s", e)
+            return None
+
+    def put(self, key: QueryKey, fingerprint: Any, results: List[Any]) -> None:
+        """Store complete results for ``key``; truncated results are ignored."""
+        if not self.enabled or getattr(results, "truncated", False):
+            return
+        if self.lifetime(key, fingerprint) <= 0:
+            return
+        data = encode_results(results, with_stat=not self.paths_only(key, fingerprint))
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO results (key, fingerprint, created, accessed, size, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (cache_key(key), _encode_fingerprint(fingerprint), now, now, len(data), data)
+                )
+                self._evict(connection)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Result cache update failed: %s", e)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        """Drop least recently used entries until the total fits ``max_bytes``."""
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% so every put near the limit doesn't evict again
+        excess = total - int(self.max_bytes * 0.9)
+        evicted = []
+        for stored_key, size in connection.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if excess <= 0:
+                break
+            evicted.append((stored_key,))
+            excess -= size
+        connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connect().execute("DELETE FROM results")
+
+def _encode_fingerprint(fingerprint: Any) -> Optional[str]:
+    return None if fingerprint is None else json.dumps(fingerprint, separators=(",", ":"))
+
+# Process-wide result cache used by the server
+RESULT_CACHE = ResultCache()
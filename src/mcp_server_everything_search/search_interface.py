@@ -1,14 +1,35 @@
 """Platform-agnostic search interface for MCP."""
 
 import abc
+import heapq
+import itertools
+import logging
 import platform
+import queue
+import shutil
+import signal
 import subprocess
 import os
+import tempfile
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
+from .content import CANDIDATE_LIMIT, CONTENT_SCANNER, LineHit
+from .filters import MetadataPredicate, everything_query
+from .fuzzy import FUZZY_INDEX
+from .metrics import METRICS
+from .platform_search import ContentQuery, MetadataFilters
+from .ranking import RelevanceScorer, pool_size
+from .query_syntax import locate_plan, mdfind_plan, parse_query
+from .regex_literals import locate_prefilter
+from .security import SensitiveFileFilter
+
+logger = logging.getLogger(__name__)
+
 @dataclass
 class SearchResult:
     """Universal search result structure."""
@@ -20,9 +41,306 @@ class SearchResult:
     modified: Optional[datetime] = None
     accessed: Optional[datetime] = None
     attributes: Optional[str] = None
+    run_count: Optional[int] = None
+    score: Optional[float] = None
+    matches: Optional[List[LineHit]] = None
+
+class SearchResults(List[SearchResult]):
+    """Search results plus whether the search stopped before completing."""
+    truncated: bool = False
+
+class Deadline:
+    """Point in time by which a search has to finish.
+
+    A deadline created with ``timeout=None`` never expires.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None for no deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+def _kill_process(proc: subprocess.Popen) -> None:
+    """Kill a backend process together with any children it spawned."""
+    if os.name == 'posix':
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+            return
+        except OSError:
+            pass
+    proc.kill()
+
+class CommandStream:
+    """Output lines of a backend command, read while the command runs.
+
+    Iterating starts the command.  The process is killed when the deadline
+    passes or when the consumer stops iterating, so a caller that only needs
+    the first few lines neither waits for nor buffers the rest.  Afterwards
+    ``returncode``, ``stderr``, ``exhausted`` (all output was read) and
+    ``timed_out`` describe how the command ended.  ``source`` names what the
+    command searches (a locate database), for messages.
+    """
+
+    def __init__(self, cmd: List[str], deadline: Deadline, source: Optional[str] = None):
+        self.cmd = cmd
+        self.deadline = deadline
+        self.source = source
+        self.returncode: Optional[int] = None
+        self.stderr = ''
+        self.exhausted = False
+        self.timed_out = False
+        self._proc: Optional[subprocess.Popen] = None
+        self._cancelled = False
+
+    def _expire(self, proc: subprocess.Popen) -> None:
+        if proc.poll() is None:
+            self.timed_out = True
+            _kill_process(proc)
+
+    def cancel(self) -> None:
+        """Kill the command if it is still running, ending the iteration."""
+        self._cancelled = True
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            _kill_process(proc)
+
+    def __iter__(self) -> Iterator[str]:
+        started = time.perf_counter()
+        # stderr goes to a file so a chatty backend can't block on a full pipe
+        with tempfile.TemporaryFile() as stderr:
+            proc = subprocess.Popen(
+                self.cmd, stdout=subprocess.PIPE, stderr=stderr, text=True,
+                start_new_session=os.name == 'posix'
+            )
+            self._proc = proc
+            if self._cancelled:
+                _kill_process(proc)
+            timer = None
+            remaining = self.deadline.remaining()
+            if remaining is not None:
+                timer = threading.Timer(remaining, self._expire, (proc,))
+                timer.daemon = True
+                timer.start()
+            try:
+                for line in proc.stdout:
+                    if line.endswith('\n'):
+                        yield line[:-1]
+                    elif not self.timed_out:
+                        yield line
+                    # else: a line cut off mid-write by the kill
+                self.exhausted = not self._cancelled
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                if proc.poll() is None:
+                    _kill_process(proc)
+                proc.stdout.close()
+                self.returncode = proc.wait()
+                stderr.seek(0)
+                self.stderr = stderr.read().decode(errors='replace')
+                METRICS.observe('spawn', time.perf_counter() - started)
+
+# Marks the end of one shard's output in FanOutStream's queue
+_SHARD_DONE = object()
+
+class FanOutStream:
+    """Merged output lines of several backend commands run concurrently.
+
+    Each command is a ``CommandStream`` read on its own thread, so the
+    merged stream takes as long as the slowest command rather than the sum
+    of all of them.  Lines are yielded as they arrive from any command,
+    each distinct line once.  When the consumer stops iterating, every
+    command still running is killed.  A command that fails doesn't affect
+    the others: afterwards ``streams`` tells how each one ended and
+    ``errors`` holds exceptions raised while starting or reading one.
+    """
+
+    def __init__(
+        self,
+        cmds: List[List[str]],
+        deadline: Deadline,
+        buffer_lines: int = 4096,
+        sources: Optional[List[str]] = None
+    ):
+        sources = sources or [None] * len(cmds)
+        self.streams = [CommandStream(cmd, deadline, source) for cmd, source in zip(cmds, sources)]
+        self.errors: Dict[int, Exception] = {}
+        self.buffer_lines = buffer_lines
+
+    @property
+    def exhausted(self) -> bool:
+        return all(stream.exhausted or i in self.errors for i, stream in enumerate(self.streams))
+
+    @property
+    def timed_out(self) -> bool:
+        return any(stream.timed_out for stream in self.streams)
+
+    def _pump(self, index: int, lines: "queue.Queue[Any]", stop: threading.Event) -> None:
+        def put(item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    lines.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        output = iter(self.streams[index])
+        try:
+            for line in output:
+                if not put(line):
+                    break
+        except Exception as e:
+            self.errors[index] = e
+        finally:
+            output.close()
+            put(_SHARD_DONE)
+
+    def __iter__(self) -> Iterator[str]:
+        lines: "queue.Queue[Any]" = queue.Queue(self.buffer_lines)
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._pump, args=(i, lines, stop), name=f"fan-out-{i}", daemon=True)
+            for i in range(len(self.streams))
+        ]
+        for thread in threads:
+            thread.start()
+        seen = set()
+        running = len(threads)
+        try:
+            while running:
+                line = lines.get()
+                if line is _SHARD_DONE:
+                    running -= 1
+                elif line not in seen:
+                    seen.add(line)
+                    yield line
+        finally:
+            stop.set()
+            for stream in self.streams:
+                stream.cancel()
+            for thread in threads:
+                thread.join()
+
+def _as_search_result(result: Any) -> SearchResult:
+    """``result`` as a ``SearchResult``; Everything returns its own pydantic model."""
+    if isinstance(result, SearchResult):
+        return result
+    times = {}
+    for field in ('created', 'modified', 'accessed'):
+        value = getattr(result, field)
+        times[field] = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return SearchResult(
+        path=result.path,
+        filename=result.filename,
+        extension=result.extension,
+        size=result.size,
+        attributes=result.attributes,
+        run_count=result.run_count,
+        **times
+    )
+
+def _name_key(path: str) -> Tuple[str, str]:
+    return os.path.basename(path).lower(), path
+
+def _path_key(path: str) -> Tuple[str, str, str]:
+    directory, name = os.path.split(path)
+    return directory.lower(), name.lower(), path
+
+def _extension_key(path: str) -> Tuple[str, str, str]:
+    name = os.path.basename(path)
+    return os.path.splitext(name)[1].lower(), name.lower(), path
+
+# Sort keys computable from the path alone, by ascending sort_by value
+# (the descending variant of each order is the ascending value + 1)
+PATH_SORT_KEYS: Dict[int, Callable[[str], Any]] = {1: _name_key, 3: _path_key, 7: _extension_key}
+# Sort keys that need a stat() of the candidate: the stat_result attribute
+STAT_SORT_KEYS: Dict[int, str] = {5: 'st_size', 11: 'st_ctime', 13: 'st_mtime'}
 
 class SearchProvider:
     """Concrete search provider that handles all platforms."""
+
+    BACKENDS = {'windows': 'everything', 'darwin': 'mdfind', 'linux': 'locate'}
+
+    def backend_name(self) -> str:
+        """Name of the search backend used on this platform."""
+        system = platform.system().lower()
+        return self.BACKENDS.get(system, system)
+
+    # Where mlocate/plocate keep their database; LOCATE_PATH adds more
+    LOCATE_DATABASES = (
+        '/var/lib/plocate/plocate.db',
+        '/var/lib/mlocate/mlocate.db',
+        '/var/lib/locate/locatedb',
+        '/var/cache/locate/locatedb',
+    )
+
+    @staticmethod
+    def locate_databases() -> List[str]:
+        """Locate databases searched concurrently, from ``EVERYTHING_SEARCH_LOCATE_DBS``.
+
+        Empty when unset: locate then uses its default database.
+        """
+        return [db for db in os.getenv('EVERYTHING_SEARCH_LOCATE_DBS', '').split(os.pathsep) if db]
+
+    def _locate_stream(self, options: List[str], patterns: List[str], deadline: Deadline):
+        """Stream of paths matching any of ``patterns``: one locate per configured database.
+
+        With several databases they are searched concurrently and merged by
+        a ``FanOutStream``.
+        """
+        databases = self.locate_databases()
+        if len(databases) <= 1:
+            return CommandStream(options + [arg for db in databases for arg in ('-d', db)] + patterns, deadline)
+        return FanOutStream([options + ['-d', db] + patterns for db in databases], deadline, sources=databases)
+
+    def iter_indexed_paths(self) -> Iterator[str]:
+        """Every path the platform's search backend knows about.
+
+        Used to build derived indexes such as the fuzzy filename index.
+        """
+        system = platform.system().lower()
+        if system == 'windows':
+            yield from self._everything_sdk().full_paths("")
+            return
+        if system == 'linux':
+            locate_cmd = self._locate_command()[0]
+            stream = self._locate_stream([locate_cmd], ['/'], Deadline())
+        elif system == 'darwin':
+            stream = CommandStream(['mdfind', "kMDItemFSName == '*'"], Deadline())
+        else:
+            raise NotImplementedError(f"No search provider available for {system}")
+        yield from stream
+        for shard in getattr(stream, 'streams', [stream]):
+            if shard.returncode not in (0, 1):
+                raise RuntimeError(f"{shard.cmd[0]} failed: {shard.stderr}")
+
+    def index_fingerprint(self) -> Optional[Tuple[Tuple[str, int, int], ...]]:
+        """Identity of the backend's index, changing whenever its paths may have.
+
+        Only locate has one: its results can't change until updatedb rewrites
+        the database.  None for live indexes (Everything, Spotlight) or when
+        no database is found.
+        """
+        if platform.system().lower() != 'linux':
+            return None
+        extra = self.locate_databases() + [db for db in os.getenv('LOCATE_PATH', '').split(os.pathsep) if db]
+        fingerprint = []
+        for db in extra + list(self.LOCATE_DATABASES):
+            try:
+                stat = os.stat(db)
+            except OSError:
+                continue
+            fingerprint.append((db, stat.st_mtime_ns, stat.st_size))
+        return tuple(fingerprint) or None
     
     def search_files(
         self,
@@ -32,24 +350,105 @@ class SearchProvider:
         match_case: bool = False,
         match_whole_word: bool = False,
         match_regex: bool = False,
-        sort_by: Optional[int] = None
+        sort_by: Optional[int] = None,
+        deadline: Optional[Deadline] = None,
+        filters: Optional[MetadataFilters] = None,
+        rank_by_relevance: bool = False,
+        fuzzy: bool = False,
+        content: Optional[ContentQuery] = None
     ) -> List[SearchResult]:
-        """Execute a file search using platform-specific methods."""
+        """Execute a file search using platform-specific methods.
+
+        When ``deadline`` passes, child processes are killed and the results
+        gathered so far are returned with ``truncated`` set.  ``filters`` are
+        applied before ``max_results`` is, so the limit counts matches only.
+        ``rank_by_relevance`` orders results by ``ranking.RelevanceScorer``
+        instead of ``sort_by``.  ``fuzzy`` treats the query as a possibly
+        misspelled filename and answers it from the fuzzy index, closest
+        names first.  With ``content`` only files containing it are returned,
+        each with its matching lines; up to ``content.CANDIDATE_LIMIT``
+        filename matches are scanned, in result order.
+        """
+        deadline = deadline or Deadline()
+        if content is not None:
+            candidates = self.search_files(
+                query, max(max_results, CANDIDATE_LIMIT), match_path, match_case, match_whole_word,
+                match_regex, sort_by, deadline, filters, rank_by_relevance, fuzzy
+            )
+            return self._filter_content(candidates, content, max_results, deadline)
+        if fuzzy:
+            return self._search_fuzzy(query, max_results, deadline, filters)
         system = platform.system().lower()
         if system == 'darwin':
-            return self._search_macos(query, max_results, match_path, match_case, match_whole_word, match_regex, sort_by)
+            return self._search_macos(query, max_results, match_path, match_case, match_whole_word, match_regex, sort_by, deadline, filters, rank_by_relevance)
         elif system == 'linux':
-            return self._search_linux(query, max_results, match_path, match_case, match_whole_word, match_regex, sort_by)
+            return self._search_linux(query, max_results, match_path, match_case, match_whole_word, match_regex, sort_by, deadline, filters, rank_by_relevance)
         elif system == 'windows':
-            return self._search_windows(query, max_results, match_path, match_case, match_whole_word, match_regex, sort_by)
+            return self._search_windows(query, max_results, match_path, match_case, match_whole_word, match_regex, sort_by, deadline, filters, rank_by_relevance)
         else:
             raise NotImplementedError(f"No search provider available for {system}")
 
-    def _convert_path_to_result(self, path: str) -> SearchResult:
-        """Convert a path to a SearchResult with file information."""
+    def _search_fuzzy(
+        self,
+        query: str,
+        max_results: int,
+        deadline: Deadline,
+        filters: Optional[MetadataFilters] = None
+    ) -> SearchResults:
+        """Typo-tolerant filename search against the fuzzy index.
+
+        Until the first index is built, which may take longer than a request
+        can wait, an exact filename search stands in, marked truncated.
+        """
+        remaining = deadline.remaining()
+        # Half the time left, so the fallback still gets the other half
+        timeout = None if remaining is None else remaining / 2
+        index = FUZZY_INDEX.index(self.iter_indexed_paths, self.index_fingerprint(), timeout)
+        # Only the filename part of the query is matched
+        name = query.replace('\\', '/').rstrip('/').rsplit('/', 1)[-1].strip('*')
+        if index is None:
+            METRICS.increment('fuzzy_fallback')
+            results = self.search_files(name or query, max_results, deadline=deadline, filters=filters)
+            results.truncated = True
+            return results
+        with METRICS.span('fuzzy_lookup'):
+            matches = index.lookup(name)
+        paths = (path for _, name_id in matches for path in index.paths(name_id))
+        return self._select(paths, max_results, None, deadline, filters)
+
+    def _filter_content(
+        self,
+        candidates: List[SearchResult],
+        content: ContentQuery,
+        max_results: int,
+        deadline: Deadline
+    ) -> SearchResults:
+        """Keep the candidates whose files contain ``content``, in order.
+
+        Sensitive files are dropped before the scan so they are never read.
+        """
+        by_path = {
+            result.path: _as_search_result(result) for result in candidates
+            if not SensitiveFileFilter.is_sensitive_path(result.path)
+        }
+        with METRICS.span('content_scan'):
+            matches, timed_out = CONTENT_SCANNER.scan(by_path, content, max_results, deadline)
+        results = SearchResults()
+        results.truncated = getattr(candidates, 'truncated', False) or timed_out
+        for path, hits in matches:
+            result = by_path[path]
+            result.matches = hits
+            results.append(result)
+        return results
+
+    def _convert_path_to_result(self, path: str, stat: Optional[os.stat_result] = None) -> SearchResult:
+        """Convert a path to a SearchResult with file information.
+
+        ``stat`` is used instead of a fresh stat() call when already known.
+        """
         try:
             path_obj = Path(path)
-            stat = path_obj.stat()
+            stat = stat or path_obj.stat()
             return SearchResult(
                 path=str(path_obj),
                 filename=path_obj.name,
@@ -66,6 +465,187 @@ class SearchProvider:
                 filename=os.path.basename(path)
             )
 
+    def _convert_paths(self, paths: Iterable[str], deadline: Deadline, truncated: bool = False) -> SearchResults:
+        """Stat each path into a result.
+
+        Once the deadline passes, the remaining paths are returned without
+        file information instead of being stat'ed.
+        """
+        results = SearchResults()
+        results.truncated = truncated
+        return self._fill(results, ((path, None) for path in paths), deadline)
+
+    def _fill(
+        self,
+        results: SearchResults,
+        candidates: Iterable[Tuple[str, Optional[os.stat_result]]],
+        deadline: Deadline
+    ) -> SearchResults:
+        """Append ``(path, stat)`` candidates to ``results``, stat'ing where needed."""
+        with METRICS.span('stat'):
+            for path, stat in candidates:
+                if stat is None and deadline.expired():
+                    results.truncated = True
+                    results.append(SearchResult(path=path, filename=os.path.basename(path)))
+                else:
+                    results.append(self._convert_path_to_result(path, stat))
+        return results
+
+    def _candidates(
+        self,
+        paths: Iterable[str],
+        filters: Optional[MetadataFilters],
+        deadline: Deadline,
+        results: SearchResults
+    ) -> Iterator[Tuple[str, Optional[os.stat_result]]]:
+        """Apply the metadata filters to the paths as they stream in.
+
+        Name-only conditions run first and stat() is only called for paths
+        that pass them.  Yields each surviving path with its stat result, or
+        None when no stat was needed.
+        """
+        if filters is None or filters.is_empty():
+            for path in paths:
+                yield path, None
+            return
+        predicate = MetadataPredicate(filters)
+        for path in paths:
+            if not predicate.match_name(path):
+                continue
+            if not predicate.needs_stat:
+                yield path, None
+                continue
+            if deadline.expired():
+                results.truncated = True
+                return
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Stale database entry
+            if predicate.match_stat(stat):
+                yield path, stat
+
+    def _select(
+        self,
+        paths: Iterable[str],
+        max_results: int,
+        sort_by: Optional[int],
+        deadline: Deadline,
+        filters: Optional[MetadataFilters] = None,
+        rank_query: Optional[str] = None
+    ) -> SearchResults:
+        """Turn a stream of candidate paths into the results to return.
+
+        Metadata filters run first, on every candidate.  Without a sort order
+        the first ``max_results`` matches are taken and the rest of the stream
+        is never read.  With one, a bounded heap keeps the best
+        ``max_results`` candidates, so memory stays O(max_results) no matter
+        how many paths the backend produces.  Name, path and extension orders
+        pick their winners without stat(); only the winners are stat'ed.
+        Size and date orders stat each candidate once and reuse that stat for
+        the result.  With ``rank_query`` the results are ranked by relevance
+        to it instead (see ``_rank``).
+        """
+        results = SearchResults()
+        candidates = self._candidates(paths, filters, deadline, results)
+        if rank_query is not None:
+            return self._rank(candidates, rank_query, max_results, deadline, results)
+        ascending = sort_by - 1 if sort_by and sort_by % 2 == 0 else sort_by
+        pick = heapq.nlargest if ascending != sort_by else heapq.nsmallest
+
+        path_key = PATH_SORT_KEYS.get(ascending)
+        attribute = STAT_SORT_KEYS.get(ascending)
+        if path_key is None and attribute is None:
+            return self._fill(results, itertools.islice(candidates, max_results), deadline)
+
+        if path_key is not None:
+            with METRICS.span('top_k'):
+                winners = pick(max_results, candidates, key=lambda candidate: path_key(candidate[0]))
+            return self._fill(results, winners, deadline)
+
+        def stat_candidates() -> Iterator[Tuple[Any, str, os.stat_result]]:
+            for path, stat in candidates:
+                if stat is None:
+                    if deadline.expired():
+                        results.truncated = True
+                        return
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue  # Stale database entry
+                yield getattr(stat, attribute), path, stat
+
+        with METRICS.span('top_k'):
+            winners = pick(max_results, stat_candidates())
+        return self._fill(results, ((path, stat) for _, path, stat in winners), deadline)
+
+    def _rank(
+        self,
+        candidates: Iterable[Tuple[str, Optional[os.stat_result]]],
+        query: str,
+        max_results: int,
+        deadline: Deadline,
+        results: SearchResults
+    ) -> SearchResults:
+        """Rank candidates by relevance in two bounded phases.
+
+        A heap keeps the best ``pool_size(max_results)`` candidates by their
+        path-only score; only that pool is stat'ed to add recency, and the
+        best ``max_results`` by full score become the results.
+        """
+        scorer = RelevanceScorer(query)
+        with METRICS.span('rank'):
+            pool = heapq.nlargest(
+                pool_size(max_results), candidates, key=lambda candidate: scorer.path_score(candidate[0])
+            )
+        scored = []
+        for path, stat in pool:
+            if stat is None and not deadline.expired():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    pass
+            elif stat is None:
+                results.truncated = True
+            modified = stat.st_mtime if stat is not None else None
+            scored.append((scorer.score(path, modified=modified), path, stat))
+        for score, path, stat in heapq.nlargest(max_results, scored, key=lambda item: item[0]):
+            if stat is not None:
+                result = self._convert_path_to_result(path, stat)
+            else:
+                result = SearchResult(path=path, filename=os.path.basename(path))
+            result.score = round(score, 4)
+            results.append(result)
+        return results
+
+    def _locate_command(self) -> Tuple[str, str]:
+        """The locate implementation to use: ``(command, 'plocate' | 'mlocate')``."""
+        # Check for available locate command
+        locate_cmd = None
+        locate_type = None
+
+        # Check for plocate first (newer version)
+        if shutil.which('plocate'):
+            locate_cmd = 'plocate'
+            locate_type = 'plocate'
+        else:
+            # Check for mlocate
+            if shutil.which('locate'):
+                locate_cmd = 'locate'
+                locate_type = 'mlocate'
+            else:
+                raise RuntimeError(
+                    "Neither 'locate' nor 'plocate' is installed. Please install one:\n"
+                    "Ubuntu/Debian: sudo apt-get install plocate\n"
+                    "              or\n"
+                    "              sudo apt-get install mlocate\n"
+                    "Fedora: sudo dnf install mlocate\n"
+                    "After installation, the database will be updated automatically, or run:\n"
+                    "For plocate: sudo updatedb\n"
+                    "For mlocate: sudo /etc/cron.daily/mlocate"
+                )
+        return locate_cmd, locate_type
+
     def _search_macos(
         self,
         query: str,
@@ -74,26 +654,33 @@ class SearchProvider:
         match_case: bool = False,
         match_whole_word: bool = False,
         match_regex: bool = False,
-        sort_by: Optional[int] = None
+        sort_by: Optional[int] = None,
+        deadline: Optional[Deadline] = None,
+        filters: Optional[MetadataFilters] = None,
+        rank_by_relevance: bool = False
     ) -> List[SearchResult]:
         """macOS search implementation using mdfind."""
         try:
-            # Build mdfind command
-            cmd = ['mdfind']
-            if match_path:
-                # When matching path, don't use -name
-                cmd.append(query)
+            # Build mdfind command: -name takes a filename substring, so the
+            # query itself is checked on the paths it returns
+            plan = mdfind_plan(parse_query(query), match_case, match_path)
+            if plan.patterns:
+                cmd = ['mdfind', '-name', plan.patterns[0]]
             else:
-                cmd.extend(['-name', query])
+                cmd = ['mdfind', "kMDItemFSName == '*'"]
             
-            # Execute search
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                raise RuntimeError(f"mdfind failed: {result.stderr}")
-
-            # Process results
-            paths = result.stdout.splitlines()[:max_results]
-            return [self._convert_path_to_result(path) for path in paths]
+            # Execute search, consuming the output as it streams in
+            deadline = deadline or Deadline()
+            stream = CommandStream(cmd, deadline)
+            lines = iter(stream)
+            try:
+                results = self._select(filter(plan.post_filter, lines), max_results, sort_by, deadline, filters, query if rank_by_relevance else None)
+            finally:
+                lines.close()
+            if stream.exhausted and stream.returncode != 0 and not stream.timed_out:
+                raise RuntimeError(f"mdfind failed: {stream.stderr}")
+            results.truncated = results.truncated or stream.timed_out
+            return results
             
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Search failed: {e}")
@@ -106,35 +693,13 @@ class SearchProvider:
         match_case: bool = False,
         match_whole_word: bool = False,
         match_regex: bool = False,
-        sort_by: Optional[int] = None
+        sort_by: Optional[int] = None,
+        deadline: Optional[Deadline] = None,
+        filters: Optional[MetadataFilters] = None,
+        rank_by_relevance: bool = False
     ) -> List[SearchResult]:
         """Linux search implementation using locate/plocate."""
-        # Check for available locate command
-        locate_cmd = None
-        locate_type = None
-
-        # Check for plocate first (newer version)
-        plocate_check = subprocess.run(['which', 'plocate'], capture_output=True)
-        if plocate_check.returncode == 0:
-            locate_cmd = 'plocate'
-            locate_type = 'plocate'
-        else:
-            # Check for mlocate
-            mlocate_check = subprocess.run(['which', 'locate'], capture_output=True)
-            if mlocate_check.returncode == 0:
-                locate_cmd = 'locate'
-                locate_type = 'mlocate'
-            else:
-                raise RuntimeError(
-                    "Neither 'locate' nor 'plocate' is installed. Please install one:\n"
-                    "Ubuntu/Debian: sudo apt-get install plocate\n"
-                    "              or\n"
-                    "              sudo apt-get install mlocate\n"
-                    "Fedora: sudo dnf install mlocate\n"
-                    "After installation, the database will be updated automatically, or run:\n"
-                    "For plocate: sudo updatedb\n"
-                    "For mlocate: sudo /etc/cron.daily/mlocate"
-                )
+        locate_cmd, locate_type = self._locate_command()
 
         try:
             # Build locate command
@@ -142,23 +707,44 @@ class SearchProvider:
             if not match_case:
                 cmd.append('-i')
             if match_regex:
-                cmd.append('--regex' if locate_type == 'mlocate' else '-r')
-            cmd.append(query)
+                # A regex that requires some fixed text runs as a fast substring
+                # search for that text, and the regex only checks its candidates
+                prefilter = locate_prefilter(query, ignore_case=not match_case)
+                if prefilter is None:
+                    # ERE on both: plocate's -r is a POSIX basic regex
+                    cmd.append('--regex')
+                    patterns, post_filter = [query], None
+                else:
+                    METRICS.increment('regex_prefiltered')
+                    patterns, post_filter = [prefilter.literal], prefilter.matches
+            else:
+                # Everything syntax: locate runs the most selective condition,
+                # the rest of the query is checked on its output
+                plan = locate_plan(parse_query(query), match_case, match_path)
+                if plan.basename:
+                    cmd.append('-b')
+                patterns, post_filter = list(plan.patterns), plan.post_filter
+            if not sort_by and filters is None and not rank_by_relevance and post_filter is None:
+                # Unsorted results are the first N matches: let locate stop there
+                cmd.extend(['-l', str(max_results)])
             
-            # Execute search
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                error_msg = result.stderr.lower()
-                if "no such file or directory" in error_msg or "database" in error_msg:
-                    raise RuntimeError(
-                        f"The {locate_type} database needs to be created. "
-                        f"Please run: sudo updatedb"
-                    )
-                raise RuntimeError(f"{locate_cmd} failed: {result.stderr}")
-
-            # Process results
-            paths = result.stdout.splitlines()[:max_results]
-            return [self._convert_path_to_result(path) for path in paths]
+            # Execute search, consuming the output as it streams in
+            deadline = deadline or Deadline()
+            stream = self._locate_stream(cmd, patterns, deadline)
+            lines = iter(stream)
+            try:
+                candidates = lines if post_filter is None else filter(post_filter, lines)
+                results = self._select(candidates, max_results, sort_by, deadline, filters, query if rank_by_relevance else None)
+            finally:
+                lines.close()
+            if isinstance(stream, FanOutStream):
+                self._check_shards(stream, locate_cmd, locate_type)
+            else:
+                error = self._locate_error(stream, locate_cmd, locate_type)
+                if error is not None:
+                    raise error
+            results.truncated = results.truncated or stream.timed_out
+            return results
             
         except FileNotFoundError:
             raise RuntimeError(
@@ -171,6 +757,48 @@ class SearchProvider:
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Search failed: {e}")
 
+    @staticmethod
+    def _locate_error(stream: CommandStream, locate_cmd: str, locate_type: str) -> Optional[RuntimeError]:
+        """The error a finished locate command reported, if any."""
+        # locate exits with 1 and no message when nothing matched
+        no_matches = stream.returncode == 1 and not stream.stderr.strip()
+        if not stream.exhausted or stream.returncode == 0 or stream.timed_out or no_matches:
+            return None
+        error_msg = stream.stderr.lower()
+        if "no such file or directory" in error_msg or "database" in error_msg:
+            return RuntimeError(
+                f"The {locate_type} database needs to be created. "
+                f"Please run: sudo updatedb"
+            )
+        return RuntimeError(f"{locate_cmd} failed: {stream.stderr}")
+
+    def _check_shards(self, stream: FanOutStream, locate_cmd: str, locate_type: str) -> None:
+        """Raise only when every database failed; otherwise log the failed ones."""
+        errors = []
+        for i, shard in enumerate(stream.streams):
+            error = stream.errors.get(i) or self._locate_error(shard, locate_cmd, locate_type)
+            if error is not None:
+                errors.append((shard.source, error))
+        if not errors:
+            return
+        if len(errors) == len(stream.streams):
+            raise errors[0][1]
+        METRICS.increment('shard_errors', len(errors))
+        for database, error in errors:
+            logger.warning("Skipping locate database %s: %s", database, error)
+
+    def _everything_sdk(self):
+        """An ``EverythingSDK`` for the DLL named by ``EVERYTHING_SDK_PATH``."""
+        from .everything_sdk import EverythingSDK
+
+        # Use relative path from current file directory as default
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        default_dll_path = os.path.join(current_dir, '..', '..', 'Everything-SDK', 'dll', 'Everything64.dll')
+        default_dll_path = os.path.normpath(default_dll_path)
+
+        dll_path = os.getenv('EVERYTHING_SDK_PATH', default_dll_path)
+        return EverythingSDK(dll_path)
+
     def _search_windows(
         self,
         query: str,
@@ -179,31 +807,67 @@ class SearchProvider:
         match_case: bool = False,
         match_whole_word: bool = False,
         match_regex: bool = False,
-        sort_by: Optional[int] = None
+        sort_by: Optional[int] = None,
+        deadline: Optional[Deadline] = None,
+        filters: Optional[MetadataFilters] = None,
+        rank_by_relevance: bool = False
     ) -> List[SearchResult]:
         """Windows search implementation using Everything SDK."""
-        import os
-        from .everything_sdk import EverythingSDK
+        from .everything_sdk import EVERYTHING_SORT_DATE_MODIFIED_DESCENDING, RANKING_REQUEST_FLAGS
 
-        # Use relative path from current file directory as default
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        default_dll_path = os.path.join(current_dir, '..', '..', 'Everything-SDK', 'dll', 'Everything64.dll')
-        default_dll_path = os.path.normpath(default_dll_path)
+        everything_sdk = self._everything_sdk()
 
-        dll_path = os.getenv('EVERYTHING_SDK_PATH', default_dll_path)
-        everything_sdk = EverythingSDK(dll_path)
+        scorer = RelevanceScorer(query) if rank_by_relevance else None
 
         # Replace double backslashes with single backslashes
         query = query.replace("\\\\", "\\")
         # If the query contains forward slashes, replace them with backslashes
         query = query.replace("/", "\\")
+        # Let the index evaluate the metadata filters
+        query, match_regex = everything_query(query, match_regex, filters)
+
+        if scorer is None:
+            return everything_sdk.search_files(
+                query=query,
+                max_results=max_results,
+                match_path=match_path,
+                match_case=match_case,
+                match_whole_word=match_whole_word,
+                match_regex=match_regex,
+                sort_by=sort_by,
+                deadline=deadline
+            )
 
-        return everything_sdk.search_files(
+        # Rank a larger pool of the most recently modified matches, fetched
+        # without size/attribute data; only the winners are stat'ed
+        deadline = deadline or Deadline()
+        pool = everything_sdk.search_files(
             query=query,
-            max_results=max_results,
+            max_results=pool_size(max_results),
             match_path=match_path,
             match_case=match_case,
             match_whole_word=match_whole_word,
             match_regex=match_regex,
-            sort_by=sort_by
-        )
\ No newline at end of file
+            sort_by=EVERYTHING_SORT_DATE_MODIFIED_DESCENDING,
+            request_flags=RANKING_REQUEST_FLAGS,
+            deadline=deadline
+        )
+        with METRICS.span('rank'):
+            ranked = heapq.nlargest(max_results, (
+                (scorer.score(
+                    r.path,
+                    filename=r.filename,
+                    modified=datetime.fromisoformat(r.modified).timestamp() if r.modified else None,
+                    run_count=r.run_count,
+                    highlighted=r.highlighted_filename
+                ), r)
+                for r in pool
+            ), key=lambda item: item[0])
+        results = SearchResults()
+        results.truncated = getattr(pool, 'truncated', False)
+        for score, r in ranked:
+            result = self._convert_path_to_result(r.path)
+            result.run_count = r.run_count
+            result.score = round(score, 4)
+            results.append(result)
+        return results
\ No newline at end of file
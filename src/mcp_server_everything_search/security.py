@@ -0,0 +1,69 @@
+"""Sensitive query and result filtering."""
+
+import re
+from typing import List
+
+class SensitiveFileFilter:
+    """Filter to prevent access to sensitive files and directories."""
+
+    # Sensitive keywords that should be filtered
+    SENSITIVE_KEYWORDS = [
+        'password', 'passwd', 'pwd', 'secret', 'key', 'token', 'credential',
+        'private', 'confidential', 'sensitive', 'security', 'auth', 'login'
+    ]
+
+    # Sensitive directory patterns (case-insensitive)
+    SENSITIVE_PATHS = [
+        r'.*[/\\]system32[/\\].*',
+        r'.*[/\\]windows[/\\]system.*',
+        r'.*[/\\]program files[/\\].*',
+        r'.*[/\\]programdata[/\\].*',
+        r'.*[/\\]users[/\\][^/\\]+[/\\]appdata[/\\].*',
+        r'.*[/\\]\.ssh[/\\].*',
+        r'.*[/\\]\.gnupg[/\\].*',
+        r'.*[/\\]keychain[/\\].*',
+        r'.*[/\\]etc[/\\]shadow.*',
+        r'.*[/\\]etc[/\\]passwd.*',
+        r'.*[/\\]var[/\\]log[/\\].*',
+        r'.*[/\\]registry[/\\].*',
+        r'.*[/\\]sam$',
+        r'.*[/\\]security$',
+        r'.*[/\\]software$',
+        r'.*[/\\]system$'
+    ]
+
+    # Compiled once: a single scan replaces one pass per keyword/pattern
+    _KEYWORD_RE = re.compile('|'.join(re.escape(keyword) for keyword in SENSITIVE_KEYWORDS))
+    _PATH_RE = re.compile('|'.join(f'(?:{pattern})' for pattern in SENSITIVE_PATHS))
+
+    @classmethod
+    def is_sensitive_query(cls, query: str) -> bool:
+        """Check if a query contains sensitive keywords."""
+        return cls._KEYWORD_RE.search(query.lower()) is not None
+
+    @classmethod
+    def filter_sensitive_results(cls, results: List, max_filtered: int = 10) -> List:
+        """Filter out sensitive files from search results."""
+        filtered_results = []
+        filtered_count = 0
+
+        for result in results:
+            if cls.is_sensitive_path(result.path):
+                filtered_count += 1
+                if filtered_count <= max_filtered:
+                    continue  # Skip this result
+            filtered_results.append(result)
+
+        return filtered_results
+
+    @classmethod
+    def is_sensitive_path(cls, path: str) -> bool:
+        """Check if a file path is sensitive."""
+        path_lower = path.lower()
+
+        # Check for sensitive keywords in filename
+        if cls._KEYWORD_RE.search(path_lower):
+            return True
+
+        # Check for sensitive directory patterns
+        return cls._PATH_RE.match(path_lower) is not None
@@ -1,83 +1,34 @@
 """MCP server implementation for cross-platform file search."""
 
+import argparse
+import asyncio
 import json
+import logging
+import os
 import platform
 import sys
-import re
-from typing import List
+from collections import Counter
+from contextlib import asynccontextmanager, suppress
+from functools import lru_cache, partial
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
 from mcp.server import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool, Resource, ResourceTemplate, Prompt
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 
-from .platform_search import UnifiedSearchQuery, WindowsSpecificParams, build_search_command
-from .search_interface import SearchProvider
-
-class SensitiveFileFilter:
-    """Filter to prevent access to sensitive files and directories."""
-    
-    # Sensitive keywords that should be filtered
-    SENSITIVE_KEYWORDS = [
-        'password', 'passwd', 'pwd', 'secret', 'key', 'token', 'credential',
-        'private', 'confidential', 'sensitive', 'security', 'auth', 'login'
-    ]
-    
-    # Sensitive directory patterns (case-insensitive)
-    SENSITIVE_PATHS = [
-        r'.*[/\\]system32[/\\].*',
-        r'.*[/\\]windows[/\\]system.*',
-        r'.*[/\\]program files[/\\].*',
-        r'.*[/\\]programdata[/\\].*',
-        r'.*[/\\]users[/\\][^/\\]+[/\\]appdata[/\\].*',
-        r'.*[/\\]\.ssh[/\\].*',
-        r'.*[/\\]\.gnupg[/\\].*',
-        r'.*[/\\]keychain[/\\].*',
-        r'.*[/\\]etc[/\\]shadow.*',
-        r'.*[/\\]etc[/\\]passwd.*',
-        r'.*[/\\]var[/\\]log[/\\].*',
-        r'.*[/\\]registry[/\\].*',
-        r'.*[/\\]sam$',
-        r'.*[/\\]security$',
-        r'.*[/\\]software$',
-        r'.*[/\\]system$'
-    ]
-    
-    @classmethod
-    def is_sensitive_query(cls, query: str) -> bool:
-        """Check if a query contains sensitive keywords."""
-        query_lower = query.lower()
-        return any(keyword in query_lower for keyword in cls.SENSITIVE_KEYWORDS)
-    
-    @classmethod
-    def filter_sensitive_results(cls, results: List, max_filtered: int = 10) -> List:
-        """Filter out sensitive files from search results."""
-        filtered_results = []
-        filtered_count = 0
-        
-        for result in results:
-            if cls._is_sensitive_path(result.path):
-                filtered_count += 1
-                if filtered_count <= max_filtered:
-                    continue  # Skip this result
-            filtered_results.append(result)
-        
-        return filtered_results
-    
-    @classmethod
-    def _is_sensitive_path(cls, path: str) -> bool:
-        """Check if a file path is sensitive."""
-        path_lower = path.lower()
-        
-        # Check for sensitive keywords in filename
-        if any(keyword in path_lower for keyword in cls.SENSITIVE_KEYWORDS):
-            return True
-        
-        # Check for sensitive directory patterns
-        for pattern in cls.SENSITIVE_PATHS:
-            if re.match(pattern, path_lower):
-                return True
-        
-        return False
+from .admission import AdmissionController, Priority, query_priority
+from .coalescing import SingleFlight
+from .duplicates import DUPLICATE_FINDER, DuplicatesArguments, candidate_key
+from .history import PREFETCH_TIMEOUT, Prefetcher, QueryHistory
+from .metrics import METRICS
+from .normalization import QueryKey, format_validation_error, normalize_arguments
+from .profiling import PROFILER, ProfilingArguments
+from .result_cache import RESULT_CACHE
+from .platform_search import WindowsSpecificParams, get_search_tool_schema
+from .search_interface import Deadline, SearchProvider, SearchResults
+from .security import SensitiveFileFilter
+from .watch import WATCH_URI_PREFIX, UnwatchArguments, WatchRegistry
 
 class SearchQuery(BaseModel):
     """Search query parameters."""
@@ -91,171 +42,456 @@ class WindowsSearchQuery(SearchQuery):
 # Global server instance
 server = Server("everything-search")
 
-@server.list_tools()
-async def handle_list_tools() -> List[Tool]:
-    """List available search tools."""
+# Identical concurrent searches share one backend execution
+_search_flight = SingleFlight()
+
+# Bounds how many backend searches run at once
+_admission = AdmissionController()
+
+# Searches registered with watch_search
+_watches = WatchRegistry()
+
+# Searches run so far, for prefetching the popular ones into the result cache
+_history = QueryHistory()
+
+METRICS_URI = "metrics://search"
+PROFILES_URI = "profiles://search"
+
+# Extra seconds a backend gets to hand back partial results after its
+# deadline before the caller abandons the wait altogether
+_ABANDON_GRACE = 1.0
+
+@lru_cache(maxsize=None)
+def _search_tools() -> List[Tool]:
+    """Build the tool list once; the schema comes straight from the models."""
     return [
         Tool(
             name="search",
             description="Search for files and directories using platform-specific search engines",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "base": {
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "Search query string. See platform-specific documentation for syntax details."
-                            },
-                            "max_results": {
-                                "type": "integer",
-                                "minimum": 1,
-                                "maximum": 1000,
-                                "default": 100,
-                                "description": "Maximum number of results to return (1-1000)"
-                            }
-                        },
-                        "required": ["query"]
-                    },
-                    "windows_params": {
-                        "type": "object",
-                        "properties": {
-                            "match_case": {
-                                "type": "boolean",
-                                "default": False,
-                                "description": "Enable case-sensitive search"
-                            },
-                            "match_path": {
-                                "type": "boolean", 
-                                "default": False,
-                                "description": "Match against full path instead of filename only"
-                            },
-                            "match_regex": {
-                                "type": "boolean",
-                                "default": False,
-                                "description": "Enable regex search"
-                            },
-                            "match_whole_word": {
-                                "type": "boolean",
-                                "default": False,
-                                "description": "Match whole words only"
-                            },
-                            "sort_by": {
-                                "type": "integer",
-                                "enum": [1, 2, 3, 4, 5, 6, 7, 8, 11, 12, 13, 14],
-                                "default": 1,
-                                "description": "Sort order for results"
-                            }
-                        }
-                    }
-                },
-                "required": ["base"]
-            }
+            inputSchema=get_search_tool_schema()
+        ),
+        Tool(
+            name="watch_search",
+            description=(
+                "Register a search to watch. Returns a watch id; reading the "
+                f"{WATCH_URI_PREFIX}<id> resource reports only the paths added and "
+                "removed since the previous read"
+            ),
+            inputSchema=get_search_tool_schema()
+        ),
+        Tool(
+            name="unwatch_search",
+            description="Remove a search registered with watch_search",
+            inputSchema=UnwatchArguments.model_json_schema()
+        ),
+        Tool(
+            name="find_duplicates",
+            description=(
+                "Find files with identical content among the results of a search. "
+                "Reports groups of duplicates, most reclaimable space first, and the "
+                "bytes that removing the extra copies would free"
+            ),
+            inputSchema=DuplicatesArguments.model_json_schema()
+        ),
+        Tool(
+            name="configure_profiling",
+            description=(
+                "Admin: enable or disable sampled profiling of search calls. "
+                f"Traces of the slowest calls are readable at {PROFILES_URI}"
+            ),
+            inputSchema=ProfilingArguments.model_json_schema()
         )
     ]
 
+@server.list_tools()
+async def handle_list_tools() -> List[Tool]:
+    """List available search tools."""
+    return list(_search_tools())
+
+async def _execute_search(
+    key: QueryKey,
+    deadline: Deadline,
+    use_cache: bool = True,
+    priority: Optional[Priority] = None
+) -> List:
+    """Answer from the result cache, or from the backend once admitted.
+
+    The blocking backend search runs on a worker thread; its complete
+    results are stored in the cache.  ``priority`` overrides the admission
+    priority estimated from the key.
+    """
+    loop = asyncio.get_running_loop()
+    search_provider = SearchProvider()
+    fingerprint = search_provider.index_fingerprint()
+    if use_cache:
+        with METRICS.span('result_cache'):
+            cached = await loop.run_in_executor(None, RESULT_CACHE.get, key, fingerprint)
+        if cached is not None:
+            METRICS.increment('cache_hits')
+            return cached
+    async with _admission.slot(
+        search_provider.backend_name(),
+        query_priority(key) if priority is None else priority,
+        deadline.remaining()
+    ):
+        search = partial(search_provider.search_files, deadline=deadline, **key.search_kwargs())
+        with METRICS.span('backend'):
+            results = await loop.run_in_executor(None, PROFILER.wrap(search))
+    await loop.run_in_executor(None, RESULT_CACHE.put, key, fingerprint, results)
+    return results
+
+async def _search(
+    key: QueryKey,
+    deadline: Deadline,
+    use_cache: bool = True,
+    priority: Optional[Priority] = None
+) -> List:
+    """Search through the coalescing layer, never waiting past the deadline.
+
+    A coalesced call runs under the deadline of the request that started it;
+    every waiter still stops waiting at its own deadline.  If the backend does
+    not return in time, an empty truncated result stands in for it.
+    ``use_cache=False`` skips cached results (the fresh ones are still stored).
+    """
+    flight_key = key if use_cache else (key, 'uncached')
+    if flight_key in _search_flight:
+        METRICS.increment('coalesced')
+    try:
+        return await _search_flight.run(
+            flight_key,
+            partial(_execute_search, key, deadline, use_cache, priority),
+            timeout=deadline.remaining() + _ABANDON_GRACE
+        )
+    except asyncio.TimeoutError:
+        results = SearchResults()
+        results.truncated = True
+        return results
+
+async def _prefetch_search(key: QueryKey) -> List:
+    """Search ``key`` into the result cache behind any live search."""
+    return await _search(key, Deadline(PREFETCH_TIMEOUT), priority=Priority.BACKGROUND)
+
+_prefetcher = Prefetcher(_history, _prefetch_search)
+
+@asynccontextmanager
+async def background_work() -> AsyncIterator[None]:
+    """Prefetch popular searches while the block runs; save the history after."""
+    task = asyncio.create_task(_prefetcher.run())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+        _history.flush()
+
+# Groups listed per line of the summary of omitted results
+_SUMMARY_GROUPS = 8
+# Characters kept of a directory or extension named in the summary
+_SUMMARY_LABEL = 80
+
+def _ranking_line(result) -> str:
+    """Relevance line for ranked results, empty otherwise."""
+    score = getattr(result, 'score', None)
+    if score is None:
+        return ""
+    run_count = getattr(result, 'run_count', None)
+    return f"Relevance: {score:.3f}{f' (run count {run_count})' if run_count else ''}\n"
+
+def _content_lines(result) -> str:
+    """Matching lines of a content search result, empty otherwise."""
+    matches = getattr(result, 'matches', None)
+    if not matches:
+        return ""
+    return "Matches:\n" + "".join(f"  {line_no}: {text}\n" for line_no, text in matches)
+
+def _format_result(r) -> str:
+    """One result's block of the text response."""
+    return (
+        f"Path: {r.path}\n"
+        f"Filename: {r.filename}"
+        f"{f' ({r.extension})' if r.extension else ''}\n"
+        f"Size: {f'{r.size:,} bytes' if r.size is not None else 'N/A'}\n"
+        f"Created: {r.created if r.created else 'N/A'}\n"
+        f"Modified: {r.modified if r.modified else 'N/A'}\n"
+        f"Accessed: {r.accessed if r.accessed else 'N/A'}\n"
+        f"{_ranking_line(r)}"
+        f"{_content_lines(r)}"
+    )
+
+def _label(name: str) -> str:
+    """``name`` cut to ``_SUMMARY_LABEL`` characters, keeping its end."""
+    return name if len(name) <= _SUMMARY_LABEL else "..." + name[3 - _SUMMARY_LABEL:]
+
+def _counts_line(counts: Counter, groups: int) -> str:
+    """The ``groups`` largest counts as ``name (n)``, the rest folded into one entry."""
+    listed = counts.most_common(groups)
+    entries = [f"{_label(name)} ({count})" for name, count in listed]
+    rest = sum(counts.values()) - sum(count for _, count in listed)
+    if rest:
+        entries.append(f"{len(counts) - len(listed)} other ({rest})")
+    return ", ".join(entries)
+
+def _omitted_summary(omitted: List, max_bytes: int, groups: int = _SUMMARY_GROUPS) -> str:
+    """Counts of the results left out of a response, per top directory and extension."""
+    parents = [os.path.dirname(r.path) for r in omitted]
+    try:
+        root = os.path.commonpath(parents)
+    except ValueError:
+        root = ""  # Different drives, or relative and absolute paths mixed
+    directories: Counter = Counter()
+    for parent in parents:
+        below = os.path.relpath(parent, root) if root else parent
+        directories[below if not root or below == os.curdir else below.split(os.sep)[0]] += 1
+    # Not every backend fills in the extension
+    extensions = Counter(r.extension or os.path.splitext(r.filename)[1][1:] or "(none)" for r in omitted)
+    return (
+        f"Results omitted: {len(omitted)} more beyond the {max_bytes:,}-byte response budget\n"
+        f"By directory{f' under {_label(root)}' if root else ''}: {_counts_line(directories, groups)}\n"
+        f"By extension: {_counts_line(extensions, groups)}\n"
+    )
+
+def _format_results(results: List, truncated: bool = False, max_bytes: Optional[int] = None) -> str:
+    """Render search results as the tool's text response.
+
+    With ``max_bytes``, rows are added only while the UTF-8 text fits in that
+    budget; the rows left out are replaced by a summary of where they are, so
+    the response never exceeds the budget however many and however large the
+    results.
+    """
+    tail = "\nResults truncated: search deadline exceeded" if truncated else ""
+    if max_bytes is None:
+        return "\n".join(_format_result(r) for r in results) + tail
+
+    rows: List[str] = []
+    used = len(tail.encode())
+    for r in results:
+        row = _format_result(r)
+        size = len(row.encode()) + (1 if rows else 0)
+        if used + size > max_bytes:
+            break
+        rows.append(row)
+        used += size
+    if len(rows) == len(results):
+        return "\n".join(rows) + tail
+
+    # Give back rows until the summary of everything left out fits as well
+    while True:
+        summary = _omitted_summary(results[len(rows):], max_bytes)
+        room = max_bytes - used - (1 if rows else 0)
+        if not rows or len(summary.encode()) <= room:
+            break
+        used -= len(rows.pop().encode()) + (1 if rows else 0)
+    # Then list fewer groups
+    groups = _SUMMARY_GROUPS
+    while len(summary.encode()) > room and groups > 0:
+        groups -= 1
+        summary = _omitted_summary(results[len(rows):], max_bytes, groups)
+    METRICS.increment('rows_omitted', len(results) - len(rows))
+    text = "\n".join(rows + [summary]) + tail
+    # Cuts only a budget smaller than the summary's fixed lines
+    return text.encode()[:max_bytes].decode(errors='ignore')
+
+def _watch_search_func(timeout: float):
+    """Search callable for the watch registry: filtered paths, truncation and backend count."""
+    async def search(key: QueryKey) -> Tuple[List[str], bool, int]:
+        # Watches report changes, so they never read cached results
+        results = await _search(key, Deadline(timeout), use_cache=False)
+        paths = [r.path for r in results if not SensitiveFileFilter.is_sensitive_path(r.path)]
+        return paths, getattr(results, 'truncated', False), len(results)
+    return search
+
+async def _watch_search(arguments: dict) -> List[TextContent]:
+    """Register a watch and report its id and initial size."""
+    try:
+        request = normalize_arguments(arguments)
+        fingerprint = SearchProvider().index_fingerprint()
+        watch = await _watches.add(
+            request.key, request.timeout, _watch_search_func(request.timeout), fingerprint
+        )
+    except Exception as e:
+        return [TextContent(type="text", text=f"Watch failed: {str(e)}")]
+    return [TextContent(type="text", text=json.dumps(
+        {"watch_id": watch.id, "uri": watch.uri, "total": len(watch.paths)}
+    ))]
+
+def _unwatch_search(arguments: dict) -> List[TextContent]:
+    try:
+        args = UnwatchArguments.model_validate(arguments or {})
+        _watches.remove(args.watch_id)
+    except ValidationError as e:
+        return [TextContent(type="text", text=f"Unwatch failed: {format_validation_error(e)}")]
+    except ValueError as e:
+        return [TextContent(type="text", text=f"Unwatch failed: {str(e)}")]
+    return [TextContent(type="text", text=json.dumps({"removed": args.watch_id}))]
+
+async def _poll_watch(uri: str) -> str:
+    """Read a watch resource: the change since the previous read, as JSON."""
+    watch = _watches.get_by_uri(uri)
+    provider = SearchProvider()
+    change = await _watches.poll(
+        watch,
+        _watch_search_func(watch.timeout),
+        fingerprint=provider.index_fingerprint(),
+        incremental=provider.backend_name() == 'everything'
+    )
+    return json.dumps(change, indent=2)
+
+async def _find_duplicates(arguments: dict) -> List[TextContent]:
+    """Search for candidates, then group the ones with identical content."""
+    try:
+        request = normalize_arguments(arguments)
+        args = DuplicatesArguments.model_validate(arguments)
+        deadline = Deadline(request.timeout)
+        results = await _search(candidate_key(request.key, args), deadline)
+        # Sensitive files are never read
+        files = [r for r in results if not SensitiveFileFilter.is_sensitive_path(r.path)]
+        loop = asyncio.get_running_loop()
+        report = await loop.run_in_executor(None, DUPLICATE_FINDER.find, files, args.min_size, deadline)
+        report.truncated = report.truncated or getattr(results, 'truncated', False)
+    except ValidationError as e:
+        return [TextContent(type="text", text=f"Duplicate search failed: {format_validation_error(e)}")]
+    except Exception as e:
+        return [TextContent(type="text", text=f"Duplicate search failed: {str(e)}")]
+    return [TextContent(type="text", text=json.dumps(report.to_dict(args.max_groups), indent=2))]
+
+def _configure_profiling(arguments: dict) -> List[TextContent]:
+    """Apply a ``configure_profiling`` call and report the resulting state."""
+    try:
+        args = ProfilingArguments.model_validate(arguments or {})
+    except ValidationError as e:
+        return [TextContent(type="text", text=f"Profiling update failed: {format_validation_error(e)}")]
+    PROFILER.configure(**args.model_dump())
+    return [TextContent(type="text", text=json.dumps(PROFILER.status()))]
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict) -> List[TextContent]:
     """Handle tool calls."""
+    if name == "configure_profiling":
+        return _configure_profiling(arguments)
+    if name == "watch_search":
+        return await _watch_search(arguments)
+    if name == "unwatch_search":
+        return _unwatch_search(arguments)
+    if name == "find_duplicates":
+        return await _find_duplicates(arguments)
     if name != "search":
         raise ValueError(f"Unknown tool: {name}")
     
+    METRICS.increment('requests')
     try:
-        # Get current platform
-        current_platform = platform.system().lower()
-        
-        # Extract base parameters
-        base_params = arguments.get('base', {})
-        if not isinstance(base_params, dict):
-            raise ValueError("'base' parameter must be a dictionary")
-        
-        # Handle windows_params
-        windows_params = None
-        if 'windows_params' in arguments:
-            if isinstance(arguments['windows_params'], str):
-                # If it's a string, try to parse as JSON
-                try:
-                    windows_params = json.loads(arguments['windows_params'])
-                except json.JSONDecodeError:
-                    raise ValueError("Invalid JSON in 'windows_params'")
-            elif isinstance(arguments['windows_params'], dict):
-                # If already a dict, use directly
-                windows_params = arguments['windows_params']
-            else:
-                raise ValueError("'windows_params' must be a string or dictionary")
-
-        # Combine parameters
-        query_params = {
-            **base_params,
-            'windows_params': windows_params
-        }
-
-        # Validate query before processing
-        query_string = query_params.get('query', '').strip()
-        if not query_string:
-            raise ValueError("Empty query not allowed")
-
-        # Check for sensitive queries
-        if SensitiveFileFilter.is_sensitive_query(query_string):
-            raise ValueError("Query contains restricted keywords")
-
-        # Check for Issue #14: Quoted string queries
-        if '"' in query_string:
-            raise ValueError("Quoted string queries not supported")
-
-        # Create unified query
-        query = UnifiedSearchQuery(**query_params)
-
-        if current_platform == "windows":
-            # Use Everything SDK directly
-            platform_params = query.windows_params or WindowsSpecificParams()
-            search_provider = SearchProvider()
-            
-            results = search_provider.search_files(
-                query=query.query,
-                max_results=query.max_results,
-                **platform_params.dict()
-            )
-        else:
-            # Use command-line search for other platforms
-            command = build_search_command(query)
-            search_provider = SearchProvider()
-            
-            results = search_provider.search_files(
-                query=query.query,
-                max_results=query.max_results,
-                **query.windows_params.dict() if query.windows_params else {}
-            )
-        
-        # Apply sensitive file filtering to all results
-        filtered_results = SensitiveFileFilter.filter_sensitive_results(results)
+        with METRICS.span('request'), PROFILER.profile() as profile:
+            # Validate and canonicalize the request in one pass
+            with METRICS.span('normalize'):
+                request = normalize_arguments(arguments)
+            _prefetcher.note_request()
+            _history.record(request.key)
+            if profile is not None:
+                profile.query = request.key.to_json()
+
+            results = await _search(request.key, Deadline(request.timeout))
+            truncated = getattr(results, 'truncated', False)
+            if truncated:
+                METRICS.increment('truncated')
+
+            # Apply sensitive file filtering to all results
+            with METRICS.span('sensitive_filter'):
+                filtered_results = SensitiveFileFilter.filter_sensitive_results(results)
+
+            with METRICS.span('format'):
+                text = _format_results(filtered_results, truncated, request.max_response_bytes)
 
         return [TextContent(
             type="text",
-            text="\n".join([
-                f"Path: {r.path}\n"
-                f"Filename: {r.filename}"
-                f"{f' ({r.extension})' if r.extension else ''}\n"
-                f"Size: {r.size:,} bytes\n"
-                f"Created: {r.created if r.created else 'N/A'}\n"
-                f"Modified: {r.modified if r.modified else 'N/A'}\n"
-                f"Accessed: {r.accessed if r.accessed else 'N/A'}\n"
-                for r in filtered_results
-            ])
+            text=text
         )]
     except Exception as e:
+        METRICS.increment('errors')
         return [TextContent(
             type="text",
             text=f"Search failed: {str(e)}"
         )]
+    finally:
+        METRICS.export()
+
+@server.list_resources()
+async def handle_list_resources() -> List[Resource]:
+    """List the server's introspection resources."""
+    return [
+        Resource(
+            uri=METRICS_URI,
+            name="Search metrics",
+            description="Per-stage latency histograms and counters of the search tool",
+            mimeType="application/json"
+        ),
+        Resource(
+            uri=PROFILES_URI,
+            name="Search profiles",
+            description="Slowest sampled search calls with cProfile and tracemalloc reports",
+            mimeType="application/json"
+        )
+    ] + [
+        Resource(
+            uri=watch.uri,
+            name=f"Watch: {watch.key.query}",
+            description="Paths added and removed since this resource was last read",
+            mimeType="application/json"
+        )
+        for watch in _watches.watches()
+    ]
+
+@server.read_resource()
+async def handle_read_resource(uri) -> Iterable[ReadResourceContents]:
+    """Read one of the resources listed by ``handle_list_resources``."""
+    if str(uri) == METRICS_URI:
+        return [ReadResourceContents(content=METRICS.to_json(), mime_type="application/json")]
+    if str(uri) == PROFILES_URI:
+        return [ReadResourceContents(content=PROFILER.to_json(), mime_type="application/json")]
+    if str(uri).startswith(WATCH_URI_PREFIX):
+        return [ReadResourceContents(content=await _poll_watch(str(uri)), mime_type="application/json")]
+    raise ValueError(f"Unknown resource: {uri}")
 
-async def main():
-    """Main entry point for the server."""
+def configure_logging():
+    """Send log records to stderr; SEARCH_DEBUG=true enables debug output."""
+    debug = os.getenv('SEARCH_DEBUG', '').lower() in ('1', 'true', 'yes')
+    logging.basicConfig(
+        level=logging.DEBUG if debug else logging.WARNING,
+        format="%(asctime)s %(name)s %(levelname)s: %(message)s",
+        stream=sys.stderr
+    )
+
+async def serve_stdio():
+    """Serve one MCP client over stdio in this process."""
     options = server.create_initialization_options()
-    async with stdio_server() as (read_stream, write_stream):
+    async with stdio_server() as (read_stream, write_stream), background_work():
         await server.run(read_stream, write_stream, options, raise_exceptions=True)
 
+def daemon_enabled() -> bool:
+    """Whether the stdio entry point should proxy to the shared daemon."""
+    return os.getenv("EVERYTHING_SEARCH_DAEMON", "").lower() in ("1", "true", "yes")
+
+def main(argv: Optional[List[str]] = None):
+    """Main entry point for the server.
+
+    ``--daemon`` runs the shared search daemon; otherwise one client is
+    served over stdio, through the daemon when ``EVERYTHING_SEARCH_DAEMON``
+    is set.
+    """
+    parser = argparse.ArgumentParser(prog="mcp-server-everything-search")
+    parser.add_argument("--daemon", action="store_true", help="run the shared search daemon on localhost")
+    args = parser.parse_args(argv)
+    configure_logging()
+    if not (args.daemon or daemon_enabled()):
+        asyncio.run(serve_stdio())
+        return
+    # Imported only when used: it serves this module's server and needs the
+    # HTTP transports, which plain stdio serving does without
+    from . import daemon
+    if args.daemon:
+        asyncio.run(daemon.serve_daemon())
+    else:
+        asyncio.run(daemon.proxy_stdio())
+
 def configure_windows_console():
     """Configure Windows console for UTF-8 output."""
     if platform.system() == "Windows":
@@ -281,9 +517,8 @@ def configure_windows_console():
 if __name__ == "__main__":
     configure_windows_console()
     
-    import asyncio
     try:
-        asyncio.run(main())
+        main()
     except KeyboardInterrupt:
         print("\nServer stopped by user")
     except Exception as e:
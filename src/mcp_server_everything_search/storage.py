@@ -0,0 +1,34 @@
+"""Location of the server's on-disk caches.
+
+``EVERYTHING_SEARCH_CACHE_DIR`` overrides the platform default
+(``%LOCALAPPDATA%`` on Windows, ``~/Library/Caches`` on macOS and
+``$XDG_CACHE_HOME`` or ``~/.cache`` elsewhere).
+"""
+
+import os
+import platform
+import tempfile
+
+APP_NAME = "everything-search"
+
+def cache_dir() -> str:
+    """Directory for cache files, created on first use."""
+    path = os.getenv("EVERYTHING_SEARCH_CACHE_DIR")
+    if not path:
+        system = platform.system().lower()
+        if system == "windows":
+            base = os.getenv("LOCALAPPDATA") or tempfile.gettempdir()
+        elif system == "darwin":
+            base = os.path.expanduser("~/Library/Caches")
+        else:
+            base = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        path = os.path.join(base, APP_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Replace ``path`` with ``data`` so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,204 @@
+"""Saved searches that report what changed since they were last read.
+
+A client registers a search with the ``watch_search`` tool and then reads
+``watch://<id>``; each read returns only the paths added and removed since
+the previous read.  Polls avoid re-running the full search where the
+backend allows it:
+
+* locate: the results can only change when updatedb rewrites the database,
+  so an unchanged database fingerprint answers the poll without a search.
+* Everything: while the snapshot holds every match, only items whose
+  recently-changed date is newer than the last poll are fetched, and
+  removals are found by checking the snapshot's paths still exist.
+* Otherwise the search runs again and the results are diffed against the
+  snapshot.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field
+
+from .filters import MetadataPredicate
+from .metrics import METRICS
+from .normalization import QueryKey
+from .platform_search import MetadataFilters
+from .search_interface import STAT_SORT_KEYS
+
+WATCH_URI_PREFIX = "watch://"
+
+# Seconds subtracted from the last poll time for incremental polls, so items
+# changed while that poll was running are not missed
+_CHANGE_SLACK = 2.0
+
+# Async search callable: key -> (sensitive-filtered paths, truncated, backend result count)
+SearchFunc = Callable[[QueryKey], Awaitable[Tuple[List[str], bool, int]]]
+
+class UnwatchArguments(BaseModel):
+    """Arguments accepted by the ``unwatch_search`` tool."""
+    watch_id: str = Field(description="Id returned by watch_search")
+
+@dataclass
+class Watch:
+    """A registered search and the paths it returned at the last poll."""
+    id: str
+    key: QueryKey
+    timeout: float
+    paths: Set[str]
+    polled_at: float
+    fingerprint: Optional[Hashable] = None
+    # Backend results withheld by the sensitive-path filter
+    hidden: int = 0
+    # Whether the search behind the snapshot stopped at its deadline
+    truncated: bool = False
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    @property
+    def uri(self) -> str:
+        return f"{WATCH_URI_PREFIX}{self.id}"
+
+    @property
+    def complete(self) -> bool:
+        """Whether the snapshot holds every match rather than the first max_results."""
+        return not self.truncated and len(self.paths) + self.hidden < self.key.max_results
+
+def depends_on_metadata(key: QueryKey) -> bool:
+    """Whether the results can change without the indexed paths changing."""
+    if key.rank_by_relevance or key.content is not None:
+        return True  # Ranking weighs recency; content search reads the files
+    ascending = key.sort_by - 1 if key.sort_by and key.sort_by % 2 == 0 else key.sort_by
+    if ascending in STAT_SORT_KEYS:
+        return True
+    return key.filters is not None and MetadataPredicate(key.filters).needs_stat
+
+def _changed_since(key: QueryKey, since: float) -> QueryKey:
+    """``key`` restricted to items changed at or after ``since``."""
+    changed_after = datetime.fromtimestamp(since)
+    if key.filters is None:
+        filters = MetadataFilters(changed_after=changed_after)
+    else:
+        filters = key.filters.model_copy(update={"changed_after": changed_after})
+    return key._replace(filters=filters)
+
+def _missing(paths: List[str]) -> Set[str]:
+    """The ``paths`` that no longer exist."""
+    return {path for path in paths if not os.path.exists(path)}
+
+class WatchRegistry:
+    """The server's registered watches."""
+
+    def __init__(self, max_watches: Optional[int] = None):
+        self.max_watches = max_watches or int(os.getenv("EVERYTHING_SEARCH_MAX_WATCHES", "64"))
+        self._watches: Dict[str, Watch] = {}
+
+    def __len__(self) -> int:
+        return len(self._watches)
+
+    def watches(self) -> List[Watch]:
+        return list(self._watches.values())
+
+    def get(self, watch_id: str) -> Watch:
+        watch = self._watches.get(watch_id)
+        if watch is None:
+            raise ValueError(f"Unknown watch: {watch_id}")
+        return watch
+
+    def get_by_uri(self, uri: str) -> Watch:
+        return self.get(uri[len(WATCH_URI_PREFIX):])
+
+    def remove(self, watch_id: str) -> None:
+        self.get(watch_id)
+        del self._watches[watch_id]
+
+    async def add(
+        self,
+        key: QueryKey,
+        timeout: float,
+        search: SearchFunc,
+        fingerprint: Optional[Hashable] = None
+    ) -> Watch:
+        """Run the search once and register its results as the first snapshot."""
+        if len(self._watches) >= self.max_watches:
+            raise ValueError("Too many watches; remove one with unwatch_search")
+        polled_at = time.time()
+        paths, truncated, found = await search(key)
+        watch = Watch(
+            uuid.uuid4().hex[:12], key, timeout, set(paths), polled_at, fingerprint,
+            hidden=found - len(paths), truncated=truncated
+        )
+        self._watches[watch.id] = watch
+        return watch
+
+    async def poll(
+        self,
+        watch: Watch,
+        search: SearchFunc,
+        fingerprint: Optional[Hashable] = None,
+        incremental: bool = False
+    ) -> Dict[str, Any]:
+        """Bring the watch up to date and report the change since the last poll.
+
+        Args:
+            watch: The watch to poll.
+            search: Runs a search and returns its sensitive-filtered paths,
+                whether it was truncated and how many results the backend
+                returned before filtering.
+            fingerprint: Current ``SearchProvider.index_fingerprint()``.
+            incremental: Whether the backend can search by recently-changed
+                date (Everything).
+        """
+        async with watch.lock:
+            polled_at = time.time()
+            truncated = False
+            mode = "full"
+            if (
+                fingerprint is not None
+                and fingerprint == watch.fingerprint
+                and not depends_on_metadata(watch.key)
+            ):
+                mode = "index_unchanged"
+                added: Set[str] = set()
+                removed: Set[str] = set()
+            else:
+                current = None
+                if incremental and watch.complete:
+                    changed, truncated, found = await search(_changed_since(watch.key, watch.polled_at - _CHANGE_SLACK))
+                    # One stat per path: kept off the event loop
+                    gone = await asyncio.get_running_loop().run_in_executor(None, _missing, list(watch.paths))
+                    current = (watch.paths - gone) | set(changed)
+                    # Counted twice if already hidden before: errs towards a full search
+                    hidden = watch.hidden + found - len(changed)
+                    if not truncated and len(current) + hidden < watch.key.max_results:
+                        mode = "incremental"
+                        watch.hidden = hidden
+                    else:
+                        current = None  # May no longer hold every match: start over
+                if current is None:
+                    paths, truncated, found = await search(watch.key)
+                    current = set(paths)
+                    watch.hidden = found - len(paths)
+                    if truncated:
+                        # Missing paths may just not have been reached
+                        current |= watch.paths
+                added = current - watch.paths
+                removed = watch.paths - current
+                watch.paths = current
+                watch.truncated = truncated
+            watch.polled_at = polled_at
+            watch.fingerprint = fingerprint
+            METRICS.increment(f"watch_poll_{mode}")
+            return {
+                "watch_id": watch.id,
+                "query": watch.key.to_json(),
+                "added": sorted(added),
+                "removed": sorted(removed),
+                "total": len(watch.paths),
+                "truncated": truncated,
+                "mode": mode,
+                "polled_at": datetime.fromtimestamp(polled_at).isoformat(timespec="seconds"),
+            }
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the search pipeline
+
+Every stage runs in its own worker process against deterministic stand-ins
+(see fakes.py), so latency and peak RSS are measured per stage:
+
+    normalize         request validation and QueryKey construction
+    everything_sdk    EverythingSDK.search_files over a simulated DLL
+    locate            SearchProvider locate backend (fake locate + mlocate.db)
+    mdfind            SearchProvider mdfind backend (fake mdfind)
+    stat_enrich       stat() enrichment of 1000 paths
+    sensitive_filter  SensitiveFileFilter over the whole corpus (capped at 100k)
+    format            text formatting of 1000 results
+
+Usage:
+    python tests/benchmark_performance.py
+    python tests/benchmark_performance.py --scenarios 1k,100k,10m --stages locate,format
+    python tests/benchmark_performance.py --save-baseline
+    python tests/benchmark_performance.py --fail-on-regression --json bench_output.json
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'src'))
+sys.path.insert(0, TESTS_DIR)
+
+SCENARIOS = {"1k": 1_000, "100k": 100_000, "10m": 10_000_000}
+STAGES = ["normalize", "everything_sdk", "locate", "mdfind", "stat_enrich", "sensitive_filter", "format"]
+QUERIES = ["parser", "*.csproj", "report_*", "data", "handler_worker"]
+DEFAULT_BASELINE = os.path.join(TESTS_DIR, "benchmark_baseline.json")
+
+# Corpora above this size are only written to the mlocate db, not to disk
+MATERIALIZE_LIMIT = 100_000
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process and its children, in KiB."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    scale = 1024 if sys.platform == "darwin" else 1
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    return max(own, children)
+
+def prepare_scenario(workdir: str, count: int) -> str:
+    """Generate (or reuse) the corpus, mlocate db and fake binaries for ``count`` paths."""
+    from fakes import generate_paths, install_fake_backends, materialize, write_mlocate_db
+
+    scenario_dir = os.path.join(workdir, f"corpus-{count}")
+    marker = os.path.join(scenario_dir, "ready")
+    if os.path.exists(marker):
+        return scenario_dir
+
+    os.makedirs(scenario_dir, exist_ok=True)
+    paths = generate_paths(count, root=os.path.join(scenario_dir, "tree"))
+    with open(os.path.join(scenario_dir, "paths.txt"), "w") as f:
+        f.write("\n".join(paths))
+    if count <= MATERIALIZE_LIMIT:
+        materialize(paths)
+    db_path = os.path.join(scenario_dir, "mlocate.db")
+    write_mlocate_db(db_path, paths)
+    env = install_fake_backends(os.path.join(scenario_dir, "bin"), db_path)
+    with open(os.path.join(scenario_dir, "env.json"), "w") as f:
+        json.dump(env, f)
+    open(marker, "w").close()
+    return scenario_dir
+
+def _load_paths(scenario_dir: str) -> List[str]:
+    with open(os.path.join(scenario_dir, "paths.txt")) as f:
+        return f.read().split("\n")
+
+def _stage_runner(stage: str, scenario_dir: str) -> Callable[[int], int]:
+    """Set up ``stage`` and return a callable running one iteration.
+
+    The callable returns the number of items it processed.
+    """
+    from mcp_server_everything_search.search_interface import Deadline, SearchProvider
+    from mcp_server_everything_search.security import SensitiveFileFilter
+
+    with open(os.path.join(scenario_dir, "env.json")) as f:
+        os.environ.update(json.load(f))
+    provider = SearchProvider()
+
+    if stage == "normalize":
+        from mcp_server_everything_search.normalization import normalize_arguments
+        requests = [
+            {"base": {"query": f"{q} {i}", "max_results": 1 + i % 1000},
+             "windows_params": {"match_case": bool(i % 2), "sort_by": 14}}
+            for i, q in enumerate(QUERIES * 20)
+        ]
+
+        def run(_: int) -> int:
+            for request in requests:
+                normalize_arguments(request)
+            return len(requests)
+        return run
+
+    if stage == "everything_sdk":
+        from fakes import FakeEverythingDLL
+        from mcp_server_everything_search.everything_sdk import EverythingSDK
+        sdk = EverythingSDK("", dll=FakeEverythingDLL(_load_paths(scenario_dir)))
+        return lambda i: len(sdk.search_files(QUERIES[i % len(QUERIES)], max_results=1000))
+
+    if stage == "locate":
+        return lambda i: len(provider._search_linux(QUERIES[i % len(QUERIES)], max_results=1000))
+
+    if stage == "mdfind":
+        return lambda i: len(provider._search_macos(QUERIES[i % len(QUERIES)], max_results=1000))
+
+    paths = _load_paths(scenario_dir)
+    if stage == "stat_enrich":
+        sample = paths[:1000]
+        return lambda _: len(provider._convert_paths(sample, Deadline()))
+
+    if stage == "sensitive_filter":
+        from mcp_server_everything_search.search_interface import SearchResult
+        results = [SearchResult(path=p, filename=os.path.basename(p)) for p in paths[:100_000]]
+
+        def run(_: int) -> int:
+            SensitiveFileFilter.filter_sensitive_results(results)
+            return len(results)
+        return run
+
+    if stage == "format":
+        from mcp_server_everything_search.server import _format_results
+        results = provider._convert_paths(paths[:1000], Deadline())
+        return lambda _: (_format_results(results), len(results))[1]
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+def run_worker(stage: str, scenario_dir: str, repeat: int) -> Dict[str, Any]:
+    """Time ``repeat`` iterations of one stage in the current process."""
+    run = _stage_runner(stage, scenario_dir)
+    run(0)  # warm-up
+    latencies = []
+    items = 0
+    for i in range(repeat):
+        started = time.perf_counter()
+        items += run(i)
+        latencies.append(time.perf_counter() - started)
+    total = sum(latencies)
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput": items / total if total else 0.0,
+        "peak_rss_kb": peak_rss_kb(),
+        "iterations": repeat,
+    }
+
+def run_stage(stage: str, scenario_dir: str, repeat: int) -> Dict[str, Any]:
+    """Run one stage in a fresh worker process so its peak RSS is its own."""
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", stage, scenario_dir, str(repeat)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "worker failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """List the stages whose p50/p99 regressed beyond ``tolerance``."""
+    regressions = []
+    for scenario, stages in current.items():
+        for stage, result in stages.items():
+            reference = baseline.get(scenario, {}).get(stage)
+            if not reference or "error" in result or "error" in reference:
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                if result[metric] > reference[metric] * (1 + tolerance):
+                    regressions.append(
+                        f"{scenario}/{stage} {metric}: {result[metric]:.2f} vs {reference[metric]:.2f}"
+                    )
+    return regressions
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'scenario':<8} {'stage':<17} {'p50 ms':>10} {'p99 ms':>10} {'items/s':>12} {'peak RSS KiB':>13} {'p50 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    for scenario, stages in results.items():
+        for stage, result in stages.items():
+            if "error" in result:
+                print(f"{scenario:<8} {stage:<17} ERROR: {result['error']}")
+                continue
+            reference = baseline.get(scenario, {}).get(stage)
+            delta = ""
+            if reference and "error" not in reference and reference["p50_ms"]:
+                delta = f"{(result['p50_ms'] / reference['p50_ms'] - 1) * 100:+.0f}%"
+            rss = result["peak_rss_kb"] if result["peak_rss_kb"] is not None else "n/a"
+            print(
+                f"{scenario:<8} {stage:<17} {result['p50_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+                f"{result['throughput']:>12.0f} {rss:>13} {delta:>12}"
+            )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="1k,100k", help="Comma-separated subset of: " + ",".join(SCENARIOS))
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated subset of the stages")
+    parser.add_argument("--repeat", type=int, default=20, help="Iterations per stage (3 for the 10m scenario)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "everything-search-bench"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.30, help="Allowed slowdown before a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    parser.add_argument("--worker", nargs=3, metavar=("STAGE", "SCENARIO_DIR", "REPEAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        stage, scenario_dir, repeat = args.worker
+        print(json.dumps(run_worker(stage, scenario_dir, int(repeat))))
+        return 0
+
+    baseline: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for scenario in args.scenarios.split(","):
+        count = SCENARIOS[scenario]
+        print(f"Preparing {scenario} corpus...", file=sys.stderr)
+        scenario_dir = prepare_scenario(args.workdir, count)
+        repeat = args.repeat if count <= MATERIALIZE_LIMIT else 3
+        results[scenario] = {}
+        for stage in args.stages.split(","):
+            print(f"  {scenario}/{stage}", file=sys.stderr)
+            results[scenario][stage] = run_stage(stage, scenario_dir, repeat)
+
+    print_report(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        merged = {**baseline, **results}
+        with open(args.baseline, "w") as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
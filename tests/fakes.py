@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Deterministic stand-ins for the search backends used by benchmarks and tests
+
+- FakeEverythingDLL implements the Everything_* calls made by EverythingSDK
+  over an in-memory corpus.
+- write_mlocate_db/read_mlocate_db produce and read real mlocate.db files.
+- install_fake_backends puts `locate` and `mdfind` scripts backed by such a
+  database into a directory meant to be prepended to PATH.
+"""
+
+import fnmatch
+import os
+import random
+import re
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+MLOCATE_MAGIC = b"\0mlocate"
+
+# Windows FILETIME of 2025-01-01, in 100ns ticks since 1601
+_BASE_FILETIME = 133800000000000000
+
+EXTENSIONS = ["py", "txt", "log", "json", "md", "csproj", "cs", "js", "ts", "png", "dll", "so"]
+WORDS = [
+    "alpha", "build", "cache", "data", "engine", "fixture", "graph", "handler",
+    "index", "job", "kernel", "loader", "model", "node", "output", "parser",
+    "query", "report", "server", "task", "util", "view", "worker", "yaml",
+]
+
+def generate_paths(count: int, root: str = "/bench", seed: int = 14) -> List[str]:
+    """Generate a reproducible synthetic directory tree with ``count`` files."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        project = f"proj{i % 97:02d}"
+        module = rng.choice(WORDS)
+        depth = rng.randint(0, 3)
+        subdirs = "/".join(rng.choice(WORDS) for _ in range(depth))
+        name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i}"
+        # Sprinkle in names the sensitive filter has to remove
+        if i % 101 == 0:
+            name = f"secret_{name}"
+        ext = rng.choice(EXTENSIONS)
+        parts = [root, project, "src", module] + ([subdirs] if subdirs else []) + [f"{name}.{ext}"]
+        paths.append("/".join(parts))
+    return paths
+
+def materialize(paths: Iterable[str], size_seed: int = 7) -> None:
+    """Create small files for ``paths`` so stat() calls hit real inodes."""
+    rng = random.Random(size_seed)
+    for path in paths:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"x" * rng.randint(0, 2048))
+
+def write_mlocate_db(db_path: str, paths: Iterable[str], root: str = "/") -> None:
+    """Write ``paths`` (and their parent directories) as an mlocate.db file."""
+    tree: Dict[str, Dict[str, bool]] = {}
+    for path in paths:
+        parent, name = os.path.split(path)
+        tree.setdefault(parent, {})[name] = False
+        # Register every ancestor as a subdirectory of its own parent
+        while parent != root and parent not in ("", "/"):
+            grandparent, dirname = os.path.split(parent)
+            entries = tree.setdefault(grandparent, {})
+            if entries.get(dirname):
+                break
+            entries[dirname] = True
+            tree.setdefault(parent, {})
+            parent = grandparent
+
+    with open(db_path, "wb") as f:
+        f.write(MLOCATE_MAGIC)
+        f.write(struct.pack(">IBBH", 0, 0, 0, 0))
+        f.write(root.encode() + b"\0")
+        for directory in sorted(tree):
+            f.write(struct.pack(">QII", 0, 0, 0))
+            f.write(directory.encode() + b"\0")
+            for name, is_dir in sorted(tree[directory].items()):
+                f.write(bytes([1 if is_dir else 0]) + name.encode() + b"\0")
+            f.write(b"\2")
+
+def read_mlocate_db(db_path: str) -> Iterator[str]:
+    """Yield every path stored in an mlocate.db file."""
+    with open(db_path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MLOCATE_MAGIC):
+        raise ValueError(f"{db_path} is not an mlocate database")
+    conf_size = struct.unpack(">I", data[8:12])[0]
+    pos = data.index(b"\0", 16) + 1 + conf_size
+    end = len(data)
+    while pos < end:
+        pos += 16
+        nul = data.index(b"\0", pos)
+        directory = data[pos:nul].decode("utf-8", "surrogateescape")
+        prefix = directory if directory.endswith("/") else directory + "/"
+        pos = nul + 1
+        while data[pos] != 2:
+            nul = data.index(b"\0", pos + 1)
+            yield prefix + data[pos + 1:nul].decode("utf-8", "surrogateescape")
+            pos = nul + 1
+        pos += 1
+
+def _database_paths(databases: Sequence[str]) -> Iterator[str]:
+    for db in databases:
+        yield from read_mlocate_db(db)
+
+# BRE characters that are operators only when backslash-escaped (GNU extensions included)
+_BRE_ESCAPED_OPERATORS = "(){}+?|"
+
+def _bre_to_python(pattern: str) -> str:
+    """A POSIX basic regex as a Python regex (bracket expressions copied as they are)."""
+    out = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            out.append(nxt if nxt in _BRE_ESCAPED_OPERATORS else ch + nxt)
+            i += 2
+            continue
+        if ch == "[":
+            end = pattern.find("]", i + 2 if pattern[i + 1:i + 2] in ("]", "^") else i + 1)
+            end = len(pattern) - 1 if end < 0 else end
+            out.append(pattern[i:end + 1])
+            i = end + 1
+            continue
+        out.append(re.escape(ch) if ch in _BRE_ESCAPED_OPERATORS else ch)
+        i += 1
+    return "".join(out)
+
+def locate_main(argv: Sequence[str]) -> int:
+    """Entry point of the fake `locate`: substring/glob/regex (-r basic, --regex extended) over an mlocate db (or basenames with -b)."""
+    ignore_case = regex = basic_regex = match_all = basename = False
+    limit: Optional[int] = None
+    databases: List[str] = []
+    patterns: List[str] = []
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg in ("-i", "--ignore-case"):
+            ignore_case = True
+        elif arg == "--regex":
+            regex = True
+        elif arg in ("-r", "--regexp"):
+            regex = basic_regex = True
+        elif arg in ("-A", "--all"):
+            match_all = True
+        elif arg in ("-b", "--basename"):
+            basename = True
+        elif arg in ("-e", "--existing"):
+            pass
+        elif arg in ("-d", "--database"):
+            databases.extend(args.pop(0).split(":"))
+        elif arg in ("-l", "-n", "--limit"):
+            limit = int(args.pop(0))
+        else:
+            patterns.append(arg)
+    if not databases:
+        databases = os.environ.get("FAKE_LOCATE_DB", "").split(":")
+
+    matchers = []
+    for pattern in patterns:
+        if regex:
+            compiled = re.compile(_bre_to_python(pattern) if basic_regex else pattern, re.IGNORECASE if ignore_case else 0)
+            matchers.append(lambda path, c=compiled: c.search(path) is not None)
+        else:
+            needle = pattern.lower() if ignore_case else pattern
+            if any(ch in needle for ch in "*?["):
+                matchers.append(lambda path, n=needle: fnmatch.fnmatchcase(path, n))
+            else:
+                matchers.append(lambda path, n=needle: n in path)
+    combine = all if match_all else any
+
+    out = sys.stdout
+    found = 0
+    try:
+        for path in _database_paths(databases):
+            candidate = os.path.basename(path) if basename else path
+            candidate = candidate.lower() if ignore_case and not regex else candidate
+            if combine(m(candidate) for m in matchers):
+                out.write(path + "\n")
+                found += 1
+                if limit is not None and found >= limit:
+                    break
+        out.flush()
+    except BrokenPipeError:
+        pass
+    return 0 if found else 1
+
+def mdfind_main(argv: Sequence[str]) -> int:
+    """Entry point of the fake `mdfind`: case-insensitive name or path substring.
+
+    The only metadata query understood is ``kMDItemFSName == '*'``, matching
+    every entry.
+    """
+    args = list(argv)
+    onlyin = None
+    by_name = False
+    query = ""
+    while args:
+        arg = args.pop(0)
+        if arg == "-name":
+            by_name = True
+            query = args.pop(0)
+        elif arg == "-onlyin":
+            onlyin = args.pop(0)
+        elif arg.startswith("-"):
+            continue
+        else:
+            query = arg
+    needle = "" if query == "kMDItemFSName == '*'" else query.lower()
+    databases = os.environ.get("FAKE_LOCATE_DB", "").split(":")
+    try:
+        for path in _database_paths(databases):
+            if onlyin and not path.startswith(onlyin.rstrip("/") + "/"):
+                continue
+            haystack = os.path.basename(path) if by_name else path
+            if needle in haystack.lower():
+                sys.stdout.write(path + "\n")
+        sys.stdout.flush()
+    except BrokenPipeError:
+        pass
+    return 0
+
+def install_fake_backends(bin_dir: str, db_path: str) -> Dict[str, str]:
+    """Write `locate` and `mdfind` scripts into ``bin_dir``.
+
+    Returns:
+        Environment overrides that put the scripts first on PATH and point
+        them at ``db_path``.
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    for command, entry in (("locate", "locate_main"), ("mdfind", "mdfind_main")):
+        script = os.path.join(bin_dir, command)
+        with open(script, "w") as f:
+            f.write(
+                f"#!{sys.executable}\n"
+                "import sys\n"
+                f"sys.path.insert(0, {tests_dir!r})\n"
+                f"from fakes import {entry}\n"
+                f"sys.exit({entry}(sys.argv[1:]))\n"
+            )
+        os.chmod(script, 0o755)
+    return {
+        "PATH": bin_dir + os.pathsep + os.environ.get("PATH", ""),
+        "FAKE_LOCATE_DB": db_path,
+    }
+
+class _FakeFunction:
+    """Callable that tolerates the argtypes/restype assignments ctypes code makes."""
+
+    def __init__(self, func):
+        self._func = func
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        return self._func(*args)
+
+class FakeEverythingDLL:
+    """In-memory implementation of the Everything SDK calls used by EverythingSDK.
+
+    Each corpus entry is ``(full_path, size, filetime)``; results support the
+    name/path/size/extension/date sorts and plain, wildcard and regex search.
+    """
+
+    EVERYTHING_OK = 0
+
+    def __init__(self, paths: Iterable[str], seed: int = 3):
+        rng = random.Random(seed)
+        self._corpus = []
+        for path in paths:
+            directory, name = os.path.split(path)
+            ext = name.rsplit(".", 1)[1] if "." in name else ""
+            filetime = _BASE_FILETIME + rng.randint(0, 10 ** 15)
+            self._corpus.append((path, directory, name, ext, rng.randint(0, 10 ** 7), filetime, rng.randint(0, 50)))
+        # Everything keeps its index sorted by name
+        self._corpus.sort(key=lambda entry: entry[2].lower())
+        self._results: list = []
+        self._reset_state()
+        for attr in dir(self):
+            if attr.startswith("_Everything_"):
+                setattr(self, attr[1:], _FakeFunction(getattr(self, attr)))
+
+    def _reset_state(self) -> None:
+        self._search = ""
+        self._match_path = self._match_case = self._whole_word = self._regex = False
+        self._max = 0xFFFFFFFF
+        self._sort = 1
+
+    def _matcher(self):
+        query = self._search
+        flags = 0 if self._match_case else re.IGNORECASE
+        if self._regex:
+            return re.compile(query, flags).search
+        terms = query.split()
+        patterns = []
+        for term in terms:
+            if any(ch in term for ch in "*?"):
+                patterns.append(re.compile(fnmatch.translate(term), flags).match)
+            else:
+                patterns.append(re.compile(re.escape(term), flags).search)
+        return lambda text: all(p(text) for p in patterns)
+
+    def _Everything_SetSearchW(self, query):
+        self._search = query
+
+    def _Everything_SetMatchPath(self, value):
+        self._match_path = bool(value)
+
+    def _Everything_SetMatchCase(self, value):
+        self._match_case = bool(value)
+
+    def _Everything_SetMatchWholeWord(self, value):
+        self._whole_word = bool(value)
+
+    def _Everything_SetRegex(self, value):
+        self._regex = bool(value)
+
+    def _Everything_SetMax(self, value):
+        self._max = value
+
+    def _Everything_SetSort(self, value):
+        self._sort = value
+
+    def _Everything_SetRequestFlags(self, value):
+        pass
+
+    def _Everything_QueryW(self, wait):
+        match = self._matcher()
+        field = 0 if self._match_path else 2
+        sort_keys = {
+            3: lambda e: e[0].lower(), 5: lambda e: e[4], 7: lambda e: e[3].lower(),
+            11: lambda e: e[5], 13: lambda e: e[5], 19: lambda e: e[6], 21: lambda e: e[5],
+        }
+        sort = self._sort or 1
+        key = sort_keys.get(sort - (sort % 2 == 0))
+        if key is None and sort == 1:
+            # Index order already matches: stop at the requested maximum
+            results = []
+            for entry in self._corpus:
+                if match(entry[field]):
+                    results.append(entry)
+                    if len(results) >= self._max:
+                        break
+        else:
+            results = [entry for entry in self._corpus if match(entry[field])]
+            if key is not None:
+                results.sort(key=key, reverse=sort % 2 == 0)
+            elif sort == 2:
+                results.reverse()
+            results = results[:self._max]
+        self._results = results
+        return True
+
+    def _Everything_GetNumResults(self):
+        return len(self._results)
+
+    def _Everything_GetLastError(self):
+        return self.EVERYTHING_OK
+
+    def _Everything_GetResultFullPathNameW(self, index, buffer, size):
+        buffer.value = self._results[index][0][:size - 1]
+        return len(buffer.value)
+
+    def _Everything_GetResultFileNameW(self, index):
+        return self._results[index][2]
+
+    def _Everything_GetResultPathW(self, index):
+        return self._results[index][1]
+
+    def _Everything_GetResultExtensionW(self, index):
+        return self._results[index][3]
+
+    def _set_out(self, out, value):
+        target = out._obj if hasattr(out, "_obj") else out
+        target.value = value
+        return True
+
+    def _Everything_GetResultSize(self, index, out):
+        return self._set_out(out, self._results[index][4])
+
+    def _Everything_GetResultDateCreated(self, index, out):
+        return self._set_out(out, self._results[index][5])
+
+    def _Everything_GetResultDateModified(self, index, out):
+        return self._set_out(out, self._results[index][5])
+
+    def _Everything_GetResultDateAccessed(self, index, out):
+        return self._set_out(out, self._results[index][5])
+
+    def _Everything_GetResultDateRecentlyChanged(self, index, out):
+        return self._set_out(out, self._results[index][5])
+
+    def _Everything_GetResultAttributes(self, index):
+        return 0x20
+
+    def _Everything_GetResultRunCount(self, index):
+        return self._results[index][6]
+
+    def _Everything_GetResultHighlightedFileNameW(self, index):
+        return self._results[index][2]
+
+    def _Everything_GetResultHighlightedPathW(self, index):
+        return self._results[index][1]
+
+    def _Everything_Reset(self):
+        self._results = []
+        self._reset_state()
+
+    def _Everything_CleanUp(self):
+        self._Everything_Reset()
+
+if __name__ == "__main__":
+    command = os.path.basename(sys.argv[1]) if len(sys.argv) > 1 else ""
+    if command == "locate":
+        sys.exit(locate_main(sys.argv[2:]))
+    if command == "mdfind":
+        sys.exit(mdfind_main(sys.argv[2:]))
+    sys.exit("usage: fakes.py locate|mdfind [args...]")
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test of the real stdio server
+
+Launches ``python -m mcp_server_everything_search`` over stdio with the
+deterministic stand-ins of the benchmarks (fake locate/mdfind on PATH over a
+synthetic corpus, see benchmark_performance.prepare_scenario) and replays a
+weighted mix of query shapes from ``--concurrency`` client tasks sharing one
+session.  Reports throughput, latency percentiles per shape, error and shed
+rates, event-loop responsiveness (ping round trips sent alongside the load)
+and the server's RSS over time, as JSON for regression gating.
+
+Query shapes (default weights):
+
+    substring   plain filename word                         40
+    wildcard    *.ext and prefix_* patterns                 20
+    sorted      substring sorted by size (stats candidates) 15
+    filtered    extension and size filters                  10
+    regex       regex with a required literal               10
+    content     content search over the filename matches     5
+
+The result cache is disabled unless ``--result-cache`` is given, so every
+call reaches the backend.
+
+Usage:
+    python tests/load_test.py
+    python tests/load_test.py --concurrency 50 --duration 60 --json load.json
+    python tests/load_test.py --mix substring=1,regex=1 --scenario 100k
+    python tests/load_test.py --save-baseline
+    python tests/load_test.py --fail-on-regression --max-error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, TESTS_DIR)
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from benchmark_performance import SCENARIOS, percentile, prepare_scenario
+from fakes import EXTENSIONS, WORDS
+
+DEFAULT_BASELINE = os.path.join(TESTS_DIR, "load_baseline.json")
+
+def _substring(rng: random.Random) -> Dict[str, Any]:
+    return {"base": {"query": rng.choice(WORDS), "max_results": 50}}
+
+def _wildcard(rng: random.Random) -> Dict[str, Any]:
+    pattern = f"*.{rng.choice(EXTENSIONS)}" if rng.random() < 0.5 else f"{rng.choice(WORDS)}_*"
+    return {"base": {"query": pattern, "max_results": 100}}
+
+def _sorted(rng: random.Random) -> Dict[str, Any]:
+    return {"base": {"query": rng.choice(WORDS), "max_results": 100}, "windows_params": {"sort_by": 6}}
+
+def _filtered(rng: random.Random) -> Dict[str, Any]:
+    filters = {"extensions": rng.sample(EXTENSIONS, 2), "min_size": rng.randint(0, 1024)}
+    return {"base": {"query": rng.choice(WORDS), "max_results": 50, "filters": filters}}
+
+def _regex(rng: random.Random) -> Dict[str, Any]:
+    pattern = f"{rng.choice(WORDS)}_.*_[0-9]+\\.(py|json)$"
+    return {"base": {"query": pattern, "max_results": 50}, "windows_params": {"match_regex": True}}
+
+def _content(rng: random.Random) -> Dict[str, Any]:
+    content = {"pattern": "x" * rng.randint(4, 64)}
+    return {"base": {"query": f"*.{rng.choice(EXTENSIONS)}", "max_results": 20, "content": content}}
+
+SHAPES: Dict[str, Callable[[random.Random], Dict[str, Any]]] = {
+    "substring": _substring,
+    "wildcard": _wildcard,
+    "sorted": _sorted,
+    "filtered": _filtered,
+    "regex": _regex,
+    "content": _content,
+}
+DEFAULT_MIX = "substring=40,wildcard=20,sorted=15,filtered=10,regex=10,content=5"
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """``name=weight,...`` into weights by shape."""
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SHAPES:
+            raise ValueError(f"Unknown query shape: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def rss_kb(pid: int) -> Optional[int]:
+    """Resident set size of ``pid`` in KiB, or None where it can't be read."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        out = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True).stdout
+        return int(out.strip()) if out.strip() else None
+    except (OSError, ValueError):
+        return None
+
+def server_pid() -> Optional[int]:
+    """Pid of the server process this process launched."""
+    try:
+        out = subprocess.run(["ps", "-A", "-o", "pid=,ppid=,args="], capture_output=True, text=True).stdout
+    except OSError:
+        return None
+    for line in out.splitlines():
+        pid, ppid, args = (line.split(None, 2) + [""])[:3]
+        if int(ppid) == os.getpid() and "mcp_server_everything_search" in args:
+            return int(pid)
+    return None
+
+def _summary(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+class LoadRun:
+    """Outcome of every call made during one run."""
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, float, str]] = []  # shape, seconds, outcome
+        self.pings: List[float] = []
+        self.rss: List[Tuple[float, Optional[int]]] = []
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        by_shape: Dict[str, Dict[str, Any]] = {}
+        for shape in sorted({shape for shape, _, _ in self.calls}):
+            calls = [(seconds, outcome) for name, seconds, outcome in self.calls if name == shape]
+            by_shape[shape] = {
+                "requests": len(calls),
+                "errors": sum(1 for _, outcome in calls if outcome == "error"),
+                "busy": sum(1 for _, outcome in calls if outcome == "busy"),
+                **_summary([seconds for seconds, _ in calls]),
+            }
+        outcomes = [outcome for _, _, outcome in self.calls]
+        total = len(self.calls)
+        samples = [kb for _, kb in self.rss if kb is not None]
+        return {
+            "requests": total,
+            "elapsed_s": elapsed,
+            "throughput_rps": total / elapsed if elapsed else 0.0,
+            "errors": outcomes.count("error"),
+            "busy": outcomes.count("busy"),
+            "error_rate": outcomes.count("error") / total if total else 0.0,
+            "busy_rate": outcomes.count("busy") / total if total else 0.0,
+            "latency": _summary([seconds for _, seconds, _ in self.calls]),
+            "by_shape": by_shape,
+            "pings": len(self.pings),
+            "ping": _summary(self.pings),
+            "peak_rss_kb": max(samples) if samples else None,
+            "rss_kb": [[round(t, 2), kb] for t, kb in self.rss],
+        }
+
+def _outcome(result) -> str:
+    text = result.content[0].text if result.content else ""
+    if "Server busy" in text:
+        return "busy"
+    if result.isError or text.startswith("Search failed"):
+        return "error"
+    return "ok"
+
+async def run_load(
+    env: Dict[str, str],
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float,
+    max_requests: Optional[int],
+    sample_interval: float,
+    seed: int
+) -> Dict[str, Any]:
+    """Drive one server process and report what was observed."""
+    params = StdioServerParameters(command=sys.executable, args=["-m", "mcp_server_everything_search"], env=env)
+    run = LoadRun()
+    shapes, weights = list(mix), list(mix.values())
+    issued = 0
+
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            pid = server_pid()
+            started = time.perf_counter()
+            stop_at = started + duration
+
+            def more() -> bool:
+                return time.perf_counter() < stop_at and (max_requests is None or issued < max_requests)
+
+            async def client(worker: int) -> None:
+                nonlocal issued
+                rng = random.Random(seed * 1000 + worker)
+                while more():
+                    issued += 1
+                    shape = rng.choices(shapes, weights)[0]
+                    call_started = time.perf_counter()
+                    try:
+                        outcome = _outcome(await session.call_tool("search", SHAPES[shape](rng)))
+                    except Exception:
+                        outcome = "error"
+                    run.calls.append((shape, time.perf_counter() - call_started, outcome))
+
+            async def monitor() -> None:
+                while more():
+                    ping_started = time.perf_counter()
+                    await session.send_ping()
+                    run.pings.append(time.perf_counter() - ping_started)
+                    if pid is not None:
+                        run.rss.append((time.perf_counter() - started, rss_kb(pid)))
+                    await asyncio.sleep(sample_interval)
+
+            await asyncio.gather(monitor(), *(client(i) for i in range(concurrency)))
+            elapsed = time.perf_counter() - started
+            metrics = await session.read_resource("metrics://search")
+
+    report = run.report(elapsed)
+    report["server_metrics"] = json.loads(metrics.contents[0].text)
+    return report
+
+def server_env(scenario_dir: str, workdir: str, result_cache: bool) -> Dict[str, str]:
+    """Environment of the server: fake backends first on PATH, source tree importable."""
+    with open(os.path.join(scenario_dir, "env.json")) as f:
+        fake_env = json.load(f)
+    env = dict(os.environ)
+    env.update(fake_env)
+    env["PATH"] = os.pathsep.join([os.path.join(scenario_dir, "bin"), os.environ.get("PATH", "")])
+    env["PYTHONPATH"] = os.path.abspath(SRC_DIR)
+    env["EVERYTHING_SEARCH_CACHE_DIR"] = tempfile.mkdtemp(prefix="cache-", dir=workdir)
+    if not result_cache:
+        env["EVERYTHING_SEARCH_RESULT_CACHE_BYTES"] = "0"
+    return env
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """List the latency and throughput figures that regressed beyond ``tolerance``."""
+    regressions = []
+    for metric in ("p50_ms", "p95_ms", "p99_ms"):
+        reference = baseline.get("latency", {}).get(metric)
+        if reference and current["latency"][metric] > reference * (1 + tolerance):
+            regressions.append(f"latency {metric}: {current['latency'][metric]:.1f} vs {reference:.1f}")
+    reference = baseline.get("throughput_rps")
+    if reference and current["throughput_rps"] < reference * (1 - tolerance):
+        regressions.append(f"throughput_rps: {current['throughput_rps']:.1f} vs {reference:.1f}")
+    reference = baseline.get("peak_rss_kb")
+    if reference and current["peak_rss_kb"] and current["peak_rss_kb"] > reference * (1 + tolerance):
+        regressions.append(f"peak_rss_kb: {current['peak_rss_kb']} vs {reference}")
+    return regressions
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['requests']} requests in {report['elapsed_s']:.1f}s: {report['throughput_rps']:.1f} req/s, "
+        f"errors {report['error_rate']:.1%}, busy {report['busy_rate']:.1%}, "
+        f"peak RSS {report['peak_rss_kb'] or 'n/a'} KiB"
+    )
+    header = f"{'shape':<10} {'requests':>9} {'errors':>7} {'busy':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["by_shape"].items())
+    rows.append(("all", {**report["latency"], "requests": report["requests"],
+                         "errors": report["errors"], "busy": report["busy"]}))
+    # Round trips of pings sent during the load: how long the event loop lets requests wait
+    rows.append(("ping", {**report["ping"], "requests": report["pings"], "errors": 0, "busy": 0}))
+    for name, row in rows:
+        print(
+            f"{name:<10} {row['requests']:>9} {row['errors']:>7} {row['busy']:>6} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}"
+        )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="1k", choices=["1k", "100k"], help="Corpus size")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent client tasks")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep issuing calls")
+    parser.add_argument("--requests", type=int, help="Stop after this many calls")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted query shapes, e.g. substring=3,regex=1")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Seconds between ping/RSS samples")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--result-cache", action="store_true", help="Leave the server's result cache enabled")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "everything-search-bench"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.30, help="Allowed slowdown before a regression")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="Fail when more calls than this fail")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--json", help="Write machine-readable results to this file")
+    args = parser.parse_args(argv)
+
+    print(f"Preparing {args.scenario} corpus...", file=sys.stderr)
+    scenario_dir = prepare_scenario(args.workdir, SCENARIOS[args.scenario])
+    env = server_env(scenario_dir, args.workdir, args.result_cache)
+    report = asyncio.run(run_load(
+        env, parse_mix(args.mix), args.concurrency, args.duration, args.requests, args.sample_interval, args.seed
+    ))
+    report["config"] = {
+        "scenario": args.scenario, "concurrency": args.concurrency, "mix": args.mix,
+        "result_cache": args.result_cache, "seed": args.seed,
+    }
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({key: value for key, value in report.items() if key != "rss_kb"}, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    failures = []
+    if report["error_rate"] > args.max_error_rate:
+        failures.append(f"error_rate: {report['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            failures += compare(report, json.load(f), args.tolerance)
+    if failures:
+        print("\nRegressions:")
+        for line in failures:
+            print(f"  {line}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for adaptive admission control
+"""
+
+import asyncio
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from mcp_server_everything_search.admission import AIMDLimiter, Priority, ServerBusyError
+
+def test_concurrency_is_bounded():
+    """No more searches run at once than the limit allows."""
+    limiter = AIMDLimiter(initial_limit=2, max_limit=2)
+    peak = 0
+
+    async def search():
+        nonlocal peak
+        await limiter.acquire()
+        peak = max(peak, limiter.in_flight)
+        await asyncio.sleep(0.01)
+        limiter.release(0.01)
+
+    async def scenario():
+        await asyncio.gather(*[search() for _ in range(8)])
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert limiter.in_flight == 0 and limiter.queued == 0
+
+def test_cheap_queries_jump_the_queue():
+    """Waiting cheap searches are admitted before expensive ones."""
+    limiter = AIMDLimiter(initial_limit=1, max_limit=1)
+    order = []
+
+    async def search(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        limiter.release(0.01)
+
+    async def scenario():
+        await limiter.acquire()
+        tasks = [
+            asyncio.ensure_future(search("regex", Priority.EXPENSIVE)),
+            asyncio.ensure_future(search("plain", Priority.CHEAP)),
+        ]
+        await asyncio.sleep(0)
+        limiter.release(0.01)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["plain", "regex"]
+
+def test_full_queue_sheds_load():
+    """Requests beyond the queue bound fail fast with a busy error."""
+    limiter = AIMDLimiter(initial_limit=1, max_limit=1, max_queue=1)
+
+    async def scenario():
+        await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(ServerBusyError):
+            await limiter.acquire()
+        with pytest.raises(ServerBusyError):
+            await limiter.acquire(timeout=0.01)
+        waiting.cancel()
+
+    asyncio.run(scenario())
+
+def test_limit_adapts_to_latency():
+    """Fast completions raise the limit, slow ones cut it."""
+    limiter = AIMDLimiter(initial_limit=4, max_limit=32, target_latency=1.0)
+    limiter.in_flight = 10
+    for _ in range(4):
+        limiter.release(0.1)
+    assert limiter.limit > 4.5
+
+    before = limiter.limit
+    limiter.release(5.0)
+    assert limiter.limit == pytest.approx(before * 0.5)
+
+def test_slot_granted_as_the_wait_times_out_is_passed_on(monkeypatch):
+    """A grant racing the timeout neither leaks the slot nor miscounts the queue."""
+    limiter = AIMDLimiter(initial_limit=1, max_limit=1)
+
+    async def late_wait_for(future, timeout):
+        # The slot frees up and is handed over, but the timeout wins
+        limiter.release(0.01)
+        assert future.done()
+        raise asyncio.TimeoutError()
+
+    async def scenario():
+        await limiter.acquire()
+        monkeypatch.setattr(asyncio, "wait_for", late_wait_for)
+        with pytest.raises(ServerBusyError):
+            await limiter.acquire(timeout=1)
+
+    asyncio.run(scenario())
+    assert limiter.in_flight == 0 and limiter.queued == 0
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for in-flight search coalescing
+"""
+
+import asyncio
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcp_server_everything_search.coalescing import SingleFlight
+
+def test_identical_calls_share_one_execution():
+    """Concurrent calls with one key run the backend once."""
+    calls = []
+
+    async def backend():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ["a.csproj"]
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*[flight.run("*.csproj", backend) for _ in range(10)])
+        assert len(flight) == 0
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result == ["a.csproj"] for result in results)
+
+def test_waiter_timeout_does_not_cancel_others():
+    """A waiter giving up leaves the shared execution running."""
+    async def backend():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        flight = SingleFlight()
+        impatient = flight.run("q", backend, timeout=0.001)
+        patient = flight.run("q", backend)
+        return await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    impatient, patient = asyncio.run(scenario())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient == "done"
+
+def test_errors_reach_every_waiter():
+    """Backend failures propagate to all waiters and are not cached."""
+    async def backend():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("locate failed")
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*[flight.run("q", backend) for _ in range(3)], return_exceptions=True)
+        assert len(flight) == 0
+        return results
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(scenario()))
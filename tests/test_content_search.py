@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the content search stage
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.content import ContentScanner, scan_file
+from mcp_server_everything_search.normalization import normalize_arguments
+from mcp_server_everything_search.platform_search import ContentQuery
+from mcp_server_everything_search.search_interface import Deadline, SearchProvider
+from mcp_server_everything_search.server import _format_results
+
+def test_scan_reports_line_numbers_once_per_line(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("import os\n\ndef Handler(): handler()\nx = 1\nclass handler:\n")
+    assert scan_file(str(path), "handler") == [(3, "def Handler(): handler()"), (5, "class handler:")]
+    assert scan_file(str(path), "handler", match_case=True, max_hits=1) == [(3, "def Handler(): handler()")]
+    assert scan_file(str(path), r"^x\s*=", regex=True) == [(4, "x = 1")]
+    assert scan_file(str(path), "missing") is None
+
+def test_scan_skips_binary_empty_oversized_and_directories(tmp_path):
+    binary = tmp_path / "a.bin"
+    binary.write_bytes(b"\0\1handler")
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    big = tmp_path / "big.txt"
+    big.write_text("handler\n" * 100)
+    assert scan_file(str(binary), "handler") is None
+    assert scan_file(str(empty), "handler") is None
+    assert scan_file(str(big), "handler", max_bytes=100) is None
+    assert scan_file(str(tmp_path), "handler") is None
+    assert scan_file(str(tmp_path / "gone.txt"), "handler") is None
+
+def test_invalid_content_regex_is_rejected():
+    with pytest.raises(ValueError, match="Invalid content regex"):
+        normalize_arguments({"base": {"query": "a", "content": {"pattern": "(", "regex": True}}})
+    key = normalize_arguments({"base": {"query": "a", "content": {"pattern": "foo"}}}).key
+    assert key.content == ContentQuery(pattern="foo")
+
+def test_pool_scan_keeps_candidate_order_and_stops_at_limit(tmp_path):
+    paths = []
+    for i in range(80):
+        path = tmp_path / f"f{i:02d}.txt"
+        path.write_text("needle\n" if i % 3 == 0 else "hay\n")
+        paths.append(str(path))
+    scanner = ContentScanner(workers=2)
+    try:
+        matches, timed_out = scanner.scan(paths, ContentQuery(pattern="needle"), 5, Deadline(30))
+    finally:
+        scanner.shutdown()
+    assert not timed_out
+    assert [os.path.basename(path) for path, _ in matches] == ["f00.txt", "f03.txt", "f06.txt", "f09.txt", "f12.txt"]
+    assert matches[0][1] == [(1, "needle")]
+
+def test_expired_deadline_truncates_scan(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("needle\n")
+    matches, timed_out = ContentScanner(workers=1).scan([str(path)], ContentQuery(pattern="needle"), 5, Deadline(0))
+    assert matches == [] and timed_out
+
+def test_search_with_content_skips_sensitive_files(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    files = {"app/config.py": "TIMEOUT = 3\n", "app/main.py": "print(TIMEOUT)\n",
+             "app/secret_config.py": "TIMEOUT = 9\n", "app/other.py": "pass\n"}
+    paths = []
+    for name, text in files.items():
+        path = tmp_path / "tree" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        paths.append(str(path))
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, paths)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    results = SearchProvider().search_files(".py", sort_by=1, content=ContentQuery(pattern="timeout"))
+    assert [r.filename for r in results] == ["config.py", "main.py"]
+    assert results[0].matches == [(1, "TIMEOUT = 3")]
+    assert "Matches:\n  1: print(TIMEOUT)" in _format_results(results)
+
+def test_windows_content_search_over_everything_results(tmp_path, monkeypatch):
+    from fakes import FakeEverythingDLL
+    from mcp_server_everything_search.everything_sdk import EverythingSDK
+
+    paths = []
+    for name, text in {"main.py": "needle = 1\n", "util.py": "hay\n", "secret_keys.py": "needle\n"}.items():
+        path = tmp_path / name
+        path.write_text(text)
+        paths.append(str(path))
+    monkeypatch.setattr("platform.system", lambda: "Windows")
+    monkeypatch.setattr(SearchProvider, "_everything_sdk", lambda self: EverythingSDK("", dll=FakeEverythingDLL(paths)))
+
+    results = SearchProvider().search_files("*.py", content=ContentQuery(pattern="needle"))
+    assert [r.path for r in results] == [paths[0]]
+    assert results[0].matches == [(1, "needle = 1")]
+    assert results[0].modified is not None
+    assert "Matches:\n  1: needle = 1" in _format_results(results)
+
+def test_restricted_content_pattern_is_rejected():
+    with pytest.raises(ValueError, match="Content pattern contains restricted keywords"):
+        normalize_arguments({"base": {"query": "*", "content": {"pattern": "PASSWORD="}}})
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared search daemon and the stdio proxy in front of it
+"""
+
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+import pytest
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from fakes import install_fake_backends, write_mlocate_db
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="POSIX only")
+
+SRC = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def daemon(tmp_path):
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, ["/srv/report.txt", "/srv/notes.md"])
+    env = dict(os.environ)
+    env.update(install_fake_backends(str(tmp_path / "bin"), db_path))
+    env.update({
+        "PATH": str(tmp_path / "bin"),
+        "PYTHONPATH": SRC,
+        "EVERYTHING_SEARCH_CACHE_DIR": str(tmp_path / "cache"),
+        "EVERYTHING_SEARCH_DAEMON_PORT": str(_free_port()),
+        "EVERYTHING_SEARCH_DAEMON": "1",
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "mcp_server_everything_search", "--daemon"], env=env, stderr=subprocess.PIPE
+    )
+    token_path = tmp_path / "cache" / "daemon.token"
+    give_up = time.monotonic() + 15
+    while not token_path.exists():
+        assert proc.poll() is None, proc.stderr.read().decode()
+        assert time.monotonic() < give_up
+        time.sleep(0.1)
+    yield env
+    proc.terminate()
+    proc.wait(timeout=10)
+
+async def _session(env, queries):
+    params = StdioServerParameters(command=sys.executable, args=["-m", "mcp_server_everything_search"], env=env)
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for query in queries:
+                result = await session.call_tool("search", {"base": {"query": query}})
+                assert not result.isError, result.content[0].text
+            metrics = await session.read_resource("metrics://search")
+            return json.loads(metrics.contents[0].text)
+
+def test_proxied_sessions_share_one_daemon(daemon):
+    first = asyncio.run(_session(daemon, ["report"]))
+    second = asyncio.run(_session(daemon, ["notes"]))
+    # The second client sees the first client's search in the daemon's metrics
+    assert second["stages"]["normalize"]["count"] == first["stages"]["normalize"]["count"] + 1
+
+def test_daemon_rejects_requests_without_its_token(daemon):
+    url = f"http://127.0.0.1:{daemon['EVERYTHING_SEARCH_DAEMON_PORT']}/mcp"
+    response = httpx.post(url, json={"jsonrpc": "2.0", "id": 1, "method": "ping"})
+    assert response.status_code == 401
+    bad = httpx.post(url, json={}, headers={"Authorization": "Bearer wrong"})
+    assert bad.status_code == 401
+
+# Makes the HTTP server the daemon needs unimportable
+_BLOCK_HTTP_TRANSPORTS = """
+import sys
+class Block:
+    def find_spec(self, name, path=None, target=None):
+        if name == "uvicorn":
+            raise ImportError(name)
+sys.meta_path.insert(0, Block())
+from mcp_server_everything_search.server import main
+main([])
+sys.exit(3 if "mcp_server_everything_search.daemon" in sys.modules else 0)
+"""
+
+def test_stdio_serving_does_not_need_the_daemon_transports(tmp_path):
+    env = dict(os.environ, PYTHONPATH=SRC, EVERYTHING_SEARCH_CACHE_DIR=str(tmp_path / "cache"))
+    env.pop("EVERYTHING_SEARCH_DAEMON", None)
+    # The session ends at once: stdin is empty
+    done = subprocess.run(
+        [sys.executable, "-c", _BLOCK_HTTP_TRANSPORTS], env=env,
+        stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=60
+    )
+    assert done.returncode == 0, done.stderr
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for per-request search deadlines
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from mcp_server_everything_search.search_interface import Deadline, SearchProvider
+
+@pytest.fixture
+def hanging_locate(tmp_path, monkeypatch):
+    """A locate stand-in that prints two paths and then hangs."""
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    script = tmp_path / "locate"
+    script.write_text(
+        "#!/bin/sh\n"
+        "echo /tmp/first.log\n"
+        "echo /tmp/second.log\n"
+        "sleep 30\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path) + os.pathsep + os.environ.get("PATH", ""))
+    return script
+
+def test_deadline_basics():
+    """A deadline without timeout never expires."""
+    assert Deadline().remaining() is None
+    assert not Deadline().expired()
+    assert Deadline(0).expired()
+    assert 0 < Deadline(10).remaining() <= 10
+
+def test_hanging_backend_returns_partial_results(hanging_locate):
+    """The backend is killed at the deadline and partial output is kept."""
+    started = time.monotonic()
+    results = SearchProvider()._search_linux("log", deadline=Deadline(0.5))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 5
+    assert results.truncated
+    assert [r.path for r in results] == ["/tmp/first.log", "/tmp/second.log"]
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the duplicate file finder
+"""
+
+import asyncio
+import json
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.content import ContentScanner
+from mcp_server_everything_search.duplicates import EDGE_BYTES, DuplicateFinder, hash_file
+from mcp_server_everything_search.search_interface import Deadline, SearchResult
+from mcp_server_everything_search.server import handle_call_tool
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+def _results(*paths):
+    return [SearchResult(path=p, filename=os.path.basename(p), size=os.path.getsize(p)) for p in paths]
+
+def test_edge_hash_only_covers_both_ends(tmp_path):
+    big = b"a" * EDGE_BYTES + b"middle" + b"z" * EDGE_BYTES
+    first = _write(tmp_path / "a", big)
+    second = _write(tmp_path / "b", big.replace(b"middle", b"MIDDLE"))
+    size = len(big)
+    assert hash_file(first, size, True)[1] == hash_file(second, size, True)[1]
+    assert hash_file(first, size, False)[1] != hash_file(second, size, False)[1]
+    # A file whose size changed since it was indexed is skipped
+    assert hash_file(first, size + 1, True) is None
+
+def test_groups_identical_files_and_skips_unique_sizes(tmp_path):
+    big = os.urandom(3 * EDGE_BYTES)
+    paths = _results(
+        _write(tmp_path / "x" / "one.bin", big),
+        _write(tmp_path / "y" / "two.bin", big),
+        # Same size and ends, different middle: not a duplicate
+        _write(tmp_path / "z" / "near.bin", big[:EDGE_BYTES] + bytes(EDGE_BYTES) + big[-EDGE_BYTES:]),
+        _write(tmp_path / "s1.txt", b"small"),
+        _write(tmp_path / "s2.txt", b"small"),
+        _write(tmp_path / "other.txt", b"SMALL"),
+        _write(tmp_path / "unique.txt", b"only one of this size"),
+    )
+    os.link(tmp_path / "s1.txt", tmp_path / "s1_link.txt")
+    paths += _results(str(tmp_path / "s1_link.txt"))
+
+    report = DuplicateFinder(ContentScanner(workers=1)).find(paths, 1, Deadline(30))
+    groups = sorted((g.size, g.paths) for g in report.groups)
+    assert groups == [
+        (5, [str(tmp_path / "s1.txt"), str(tmp_path / "s2.txt")]),
+        (len(big), [str(tmp_path / "x" / "one.bin"), str(tmp_path / "y" / "two.bin")]),
+    ]
+    # The unique size was never opened
+    assert report.hashed_files == len(paths) - 1
+    summary = report.to_dict(max_groups=1)
+    assert summary["reclaimable_bytes"] == len(big) + 5
+    assert summary["duplicate_files"] == 2
+    assert [g["size"] for g in summary["groups"]] == [len(big)]
+
+def test_pool_hashing_matches_inline_hashing(tmp_path):
+    paths = _results(*[_write(tmp_path / f"f{i:02d}", bytes([i % 5]) * 100) for i in range(80)])
+    scanner = ContentScanner(workers=2)
+    try:
+        pooled = DuplicateFinder(scanner).find(paths, 1, Deadline(30))
+    finally:
+        scanner.shutdown()
+    inline = DuplicateFinder(ContentScanner(workers=1)).find(paths, 1, Deadline(30))
+    assert sorted(pooled.groups) == sorted(inline.groups)
+    assert len(pooled.groups) == 5
+
+def test_expired_deadline_truncates_pool_hashing(tmp_path):
+    paths = _results(*[_write(tmp_path / f"f{i:02d}", bytes([i % 5]) * 100) for i in range(80)])
+    scanner = ContentScanner(workers=2)
+    try:
+        report = DuplicateFinder(scanner).find(paths, 1, Deadline(0))
+    finally:
+        scanner.shutdown()
+    assert report.truncated
+    assert report.groups == []
+
+def test_find_duplicates_tool(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    files = [
+        _write(tmp_path / "data" / "build" / "out.tar", b"artifact" * 1000),
+        _write(tmp_path / "data" / "copy" / "out.tar", b"artifact" * 1000),
+        _write(tmp_path / "data" / "tiny.tar", b"t"),
+        _write(tmp_path / "data" / "tiny2.tar", b"t"),
+    ]
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, files)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    env["EVERYTHING_SEARCH_CACHE_DIR"] = str(tmp_path / "cache")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    result = asyncio.run(handle_call_tool("find_duplicates", {"base": {"query": "*.tar"}, "min_size": 2}))
+    report = json.loads(result[0].text)
+    assert report["reclaimable_bytes"] == 8000
+    assert report["groups"][0]["paths"] == files[:2]
+    assert not report["truncated"]
+
+    result = asyncio.run(handle_call_tool("find_duplicates", {"base": {"query": "*.tar"}, "min_size": 0}))
+    assert result[0].text.startswith("Duplicate search failed:")
+
+def test_every_ssh_candidate_is_skipped(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    files = [_write(tmp_path / "home" / ".ssh" / f"id{i:02d}.tar", b"ssh" * 100) for i in range(12)]
+    files += [_write(tmp_path / "data" / f"out{i}.tar", b"artifact" * 100) for i in range(2)]
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, files)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    env["EVERYTHING_SEARCH_CACHE_DIR"] = str(tmp_path / "cache")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    result = asyncio.run(handle_call_tool("find_duplicates", {"base": {"query": "*.tar"}, "min_size": 1}))
+    report = json.loads(result[0].text)
+    assert [group["paths"] for group in report["groups"]] == [files[12:]]
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Tests for EverythingSDK against the simulated Everything DLL
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import FakeEverythingDLL, generate_paths, read_mlocate_db, write_mlocate_db
+from mcp_server_everything_search.everything_sdk import EVERYTHING_SORT_SIZE_DESCENDING, EverythingSDK
+from mcp_server_everything_search.search_interface import Deadline
+
+PATHS = generate_paths(500)
+
+def test_search_extracts_all_fields():
+    """Results carry path, name, size and timestamps from the DLL."""
+    sdk = EverythingSDK("", dll=FakeEverythingDLL(PATHS))
+    results = sdk.search_files("*.csproj", max_results=5, sort_by=EVERYTHING_SORT_SIZE_DESCENDING)
+
+    assert 0 < len(results) <= 5
+    assert all(r.path.endswith(".csproj") and r.filename in r.path for r in results)
+    assert [r.size for r in results] == sorted((r.size for r in results), reverse=True)
+    assert all(r.modified for r in results)
+    assert not results.truncated
+
+def test_expired_deadline_truncates():
+    """An expired deadline stops result extraction."""
+    sdk = EverythingSDK("", dll=FakeEverythingDLL(PATHS))
+    results = sdk.search_files("parser", max_results=50, deadline=Deadline(0))
+    assert results.truncated
+    assert len(results) == 0
+
+def test_mlocate_database_round_trip(tmp_path):
+    """The generated mlocate.db lists every file."""
+    db = tmp_path / "mlocate.db"
+    write_mlocate_db(str(db), PATHS)
+    assert set(PATHS) <= set(read_mlocate_db(str(db)))
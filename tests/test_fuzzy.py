@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for typo-tolerant filename search
+"""
+
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import generate_paths, install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.fuzzy import FuzzyIndex, FuzzyIndexManager, edit_distance
+from mcp_server_everything_search.search_interface import Deadline, SearchProvider
+
+PATHS = [
+    "/srv/app/receive_handler.py",
+    "/srv/app/tests/receive_handler.py",
+    "/srv/app/request_handler.py",
+    "/srv/app/README.md",
+    "/srv/lib/parser.c",
+    "/srv/lib/parsers.h",
+]
+
+def test_edit_distance_counts_transpositions_once():
+    assert edit_distance("recieve", "receive", 3) == 1
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("abc", "abcdefg", 2) == 3
+
+def test_lookup_ranks_by_distance():
+    index = FuzzyIndex.build(PATHS, sep="/")
+    paths = list(index.search("recieve_handler"))
+    assert paths[:2] == ["/srv/app/receive_handler.py", "/srv/app/tests/receive_handler.py"]
+    assert "/srv/app/request_handler.py" not in paths
+    names = [index.names[name_id] for _, name_id in index.lookup("parsr.c")]
+    assert names[0] == "parser.c"
+    assert list(index.search("zzzzzz")) == []
+
+def test_index_round_trips_through_bytes():
+    index = FuzzyIndex.build(PATHS + ["/top"], sep="/", fingerprint=[["db", 1, 2]])
+    loaded = FuzzyIndex.from_bytes(index.to_bytes())
+    assert loaded.fingerprint == [["db", 1, 2]]
+    assert list(loaded.search("readme.md")) == ["/srv/app/README.md"]
+    assert list(loaded.search("top")) == ["/top"]
+
+def test_manager_persists_and_rebuilds_when_stale(tmp_path):
+    path = str(tmp_path / "fuzzy.bin")
+    calls = []
+
+    def source():
+        calls.append(1)
+        return PATHS
+
+    first = FuzzyIndexManager(path=path).index(source, fingerprint=("db", 1))
+    assert len(calls) == 1 and os.path.exists(path)
+    # A new process loads the saved index instead of enumerating again
+    manager = FuzzyIndexManager(path=path)
+    assert len(manager.index(source, fingerprint=("db", 1))) == len(first)
+    assert len(calls) == 1
+    # A changed fingerprint serves the old index and rebuilds in the background
+    assert manager.index(source, fingerprint=("db", 2)) is not None
+    for thread in threading.enumerate():
+        if thread.name == "fuzzy-index-rebuild":
+            thread.join()
+    assert len(calls) == 2
+    assert manager.is_fresh(manager.index(source, fingerprint=("db", 2)), ("db", 2))
+
+def test_fuzzy_search_through_locate(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    paths = generate_paths(2000, root=str(tmp_path / "tree"))
+    target = str(tmp_path / "tree" / "receive_handler.py")
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, paths + [target])
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    manager = FuzzyIndexManager(path=str(tmp_path / "fuzzy.bin"))
+    monkeypatch.setattr("mcp_server_everything_search.search_interface.FUZZY_INDEX", manager)
+
+    results = SearchProvider().search_files("recieve_handler", max_results=5, fuzzy=True)
+    assert results[0].path == target
+
+def _join_builds():
+    for thread in threading.enumerate():
+        if thread.name == "fuzzy-index-rebuild":
+            thread.join()
+
+def test_first_build_does_not_outlast_the_caller(tmp_path):
+    release = threading.Event()
+
+    def slow_source():
+        release.wait(10)
+        return PATHS
+
+    manager = FuzzyIndexManager(path=str(tmp_path / "fuzzy.bin"))
+    assert manager.index(slow_source, timeout=0.05) is None
+    # Others don't queue behind the build either
+    assert manager.index(slow_source, timeout=0) is None
+    release.set()
+    _join_builds()
+    assert len(manager.index(slow_source, timeout=0)) > 0
+
+def test_cold_fuzzy_search_falls_back_to_an_exact_search(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    target = str(tmp_path / "tree" / "receive_handler.py")
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, [target, str(tmp_path / "tree" / "other.py")])
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    manager = FuzzyIndexManager(path=str(tmp_path / "fuzzy.bin"))
+    monkeypatch.setattr("mcp_server_everything_search.search_interface.FUZZY_INDEX", manager)
+    release = threading.Event()
+    indexed_paths = SearchProvider.iter_indexed_paths
+
+    def slow_paths(self):
+        release.wait(10)
+        return indexed_paths(self)
+
+    monkeypatch.setattr(SearchProvider, "iter_indexed_paths", slow_paths)
+
+    cold = SearchProvider().search_files("receive_handler", max_results=5, fuzzy=True, deadline=Deadline(2))
+    assert [r.path for r in cold] == [target]
+    assert cold.truncated
+    release.set()
+    _join_builds()
+    warm = SearchProvider().search_files("recieve_handler", max_results=5, fuzzy=True, deadline=Deadline(2))
+    assert [r.path for r in warm] == [target]
+    assert not warm.truncated
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for the query history and the prefetch of popular searches
+"""
+
+import asyncio
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.history import HALF_LIFE, Prefetcher, QueryHistory
+from mcp_server_everything_search.normalization import QueryKey, normalize_arguments
+from mcp_server_everything_search.platform_search import ContentQuery
+from mcp_server_everything_search.result_cache import RESULT_CACHE
+from mcp_server_everything_search.search_interface import SearchProvider
+from mcp_server_everything_search.server import _prefetch_search
+
+NOW = 1_800_000_000.0
+
+def test_key_round_trips_through_json():
+    key = normalize_arguments({"base": {
+        "query": "*.py", "filters": {"extensions": ["py"], "modified_after": "2025-01-01T00:00:00"},
+        "content": {"pattern": "TODO"}
+    }}).key
+    assert QueryKey.from_json(key.to_json()) == key
+
+def test_recent_uses_outweigh_old_ones(tmp_path):
+    history = QueryHistory(path=str(tmp_path / "history.sqlite"))
+    old, recent, once = QueryKey("old", 100), QueryKey("recent", 100), QueryKey("once", 100)
+    for _ in range(3):
+        history.record(old, now=NOW - 3 * HALF_LIFE)
+    history.record(recent, now=NOW - 1)
+    history.record(recent, now=NOW)
+    history.record(once, now=NOW)
+    history.flush()
+    assert history.top(3) == [recent, once, old]
+    assert history.top(1) == [recent]
+
+def test_weights_are_rescaled_as_time_passes(tmp_path):
+    history = QueryHistory(path=str(tmp_path / "history.sqlite"))
+    for _ in range(5):
+        history.record(QueryKey("popular", 100), now=NOW)
+    history.flush()
+    # Far enough ahead that the raw weights would overflow a float
+    later = NOW + 2000 * HALF_LIFE
+    history.record(QueryKey("new", 100), now=later)
+    history.flush()
+    history.record(QueryKey("popular", 100), now=later + 1)
+    history.record(QueryKey("popular", 100), now=later + 2)
+    history.flush()
+    assert history.top(2) == [QueryKey("popular", 100), QueryKey("new", 100)]
+
+def test_processes_merge_into_one_history(tmp_path):
+    path = str(tmp_path / "history.sqlite")
+    first, second = QueryHistory(path=path), QueryHistory(path=path)
+    for _ in range(2):
+        first.record(QueryKey("a", 100), now=NOW)
+    second.record(QueryKey("b", 100), now=NOW)
+    second.record(QueryKey("a", 100), now=NOW)
+    second.record(QueryKey("a", 100), now=NOW)
+    first.flush()
+    second.flush()
+    assert first.top(2) == [QueryKey("a", 100), QueryKey("b", 100)]
+
+def test_history_keeps_only_the_most_popular(tmp_path):
+    history = QueryHistory(max_entries=2, path=str(tmp_path / "history.sqlite"))
+    for i, query in enumerate(["x", "y", "z"]):
+        for _ in range(i + 1):
+            history.record(QueryKey(query, 100), now=NOW)
+    history.flush()
+    assert [key.query for key in history.top(10)] == ["z", "y"]
+
+def test_live_request_stops_a_prefetch_round(tmp_path):
+    history = QueryHistory(path=str(tmp_path / "history.sqlite"))
+    for query in ["a", "b", "c"]:
+        history.record(QueryKey(query, 100))
+    history.flush()
+    searched = []
+
+    async def search(key):
+        searched.append(key.query)
+        prefetcher.note_request()  # A client calls in while the first key runs
+
+    prefetcher = Prefetcher(history, search, limit=3)
+    assert asyncio.run(prefetcher.prefetch()) == 1
+    assert len(searched) == 1
+
+def test_prefetch_fills_the_result_cache(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, ["/srv/app/main.py", "/srv/app/util.py"])
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    env["EVERYTHING_SEARCH_CACHE_DIR"] = str(tmp_path / "cache")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    history = QueryHistory(path=str(tmp_path / "history.sqlite"))
+    key = normalize_arguments({"base": {"query": "*.py"}}).key
+    history.record(key)
+    history.flush()
+    fingerprint = SearchProvider().index_fingerprint()
+    assert RESULT_CACHE.get(key, fingerprint) is None
+
+    assert asyncio.run(Prefetcher(history, _prefetch_search, limit=5).prefetch()) == 1
+    cached = RESULT_CACHE.get(key, fingerprint)
+    assert [r.path for r in cached] == ["/srv/app/main.py", "/srv/app/util.py"]
+
+def test_restricted_keys_are_never_prefetched(tmp_path):
+    history = QueryHistory(path=str(tmp_path / "history.sqlite"))
+    # Recorded before the content pattern was checked
+    history.record(QueryKey("*", 100, content=ContentQuery(pattern="password")))
+    history.record(QueryKey("*.py", 100))
+    history.flush()
+    assert history.top(5) == [QueryKey("*.py", 100)]
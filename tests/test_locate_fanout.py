@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for searching several locate databases concurrently
+"""
+
+import logging
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.search_interface import Deadline, FanOutStream, SearchProvider
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="POSIX only")
+
+def _shell(script):
+    return ["/bin/sh", "-c", script]
+
+def test_shards_run_concurrently_and_lines_are_deduplicated():
+    stream = FanOutStream([_shell(f"sleep 0.5; echo shared; echo only{i}") for i in range(3)], Deadline(10))
+    started = time.monotonic()
+    lines = list(stream)
+    assert time.monotonic() - started < 1.4
+    assert sorted(lines) == ["only0", "only1", "only2", "shared"]
+    assert stream.exhausted and not stream.timed_out
+
+def test_stopping_early_kills_the_slow_shards():
+    stream = FanOutStream([_shell("echo first"), _shell("sleep 30; echo late")], Deadline(60))
+    started = time.monotonic()
+    lines = iter(stream)
+    assert next(lines) == "first"
+    lines.close()
+    assert time.monotonic() - started < 5
+    assert not stream.exhausted
+
+def test_failing_shard_is_reported_without_stopping_others():
+    stream = FanOutStream([_shell("echo ok"), ["/nonexistent/command"]], Deadline(10))
+    assert list(stream) == ["ok"]
+    assert isinstance(stream.errors[1], FileNotFoundError)
+
+def _install(tmp_path, monkeypatch, databases):
+    env = install_fake_backends(str(tmp_path / "bin"), databases[0])
+    env["PATH"] = str(tmp_path / "bin")
+    env["EVERYTHING_SEARCH_LOCATE_DBS"] = os.pathsep.join(databases)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+def test_search_merges_databases_in_sort_order(tmp_path, monkeypatch):
+    data_db, srv_db = str(tmp_path / "data.db"), str(tmp_path / "srv.db")
+    write_mlocate_db(data_db, ["/data/b_report.txt", "/data/d_report.txt"])
+    write_mlocate_db(srv_db, ["/srv/a_report.txt", "/srv/c_report.txt", "/data/b_report.txt"])
+    _install(tmp_path, monkeypatch, [data_db, srv_db])
+
+    provider = SearchProvider()
+    results = provider.search_files("report", max_results=3, sort_by=1)
+    assert [r.path for r in results] == ["/srv/a_report.txt", "/data/b_report.txt", "/srv/c_report.txt"]
+    assert len(provider.search_files("report", max_results=10)) == 4
+    assert {db for db, _, _ in provider.index_fingerprint()} >= {data_db, srv_db}
+
+def test_missing_database_only_fails_its_shard(tmp_path, monkeypatch, caplog):
+    data_db = str(tmp_path / "data.db")
+    write_mlocate_db(data_db, ["/data/report.txt"])
+    _install(tmp_path, monkeypatch, [data_db, str(tmp_path / "missing.db")])
+    results = SearchProvider().search_files("report")
+    assert [r.path for r in results] == ["/data/report.txt"]
+
+    # A query locate runs as several patterns still names the database
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="mcp_server_everything_search.search_interface"):
+        results = SearchProvider().search_files("ext:txt;md")
+    assert [r.path for r in results] == ["/data/report.txt"]
+    skipped = [r.getMessage() for r in caplog.records if r.getMessage().startswith("Skipping")]
+    assert len(skipped) == 1
+    assert skipped[0].startswith(f"Skipping locate database {tmp_path / 'missing.db'}: ")
+
+    monkeypatch.setenv("EVERYTHING_SEARCH_LOCATE_DBS", os.pathsep.join(
+        [str(tmp_path / "missing.db"), str(tmp_path / "missing2.db")]
+    ))
+    with pytest.raises(RuntimeError, match="database"):
+        SearchProvider().search_files("report")
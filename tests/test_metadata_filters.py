@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for size/date/extension/type filters
+"""
+
+import re
+import sys
+import os
+from datetime import datetime
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.filters import everything_query
+from mcp_server_everything_search.normalization import normalize_arguments
+from mcp_server_everything_search.platform_search import MetadataFilters
+from mcp_server_everything_search.search_interface import SearchProvider
+
+def test_filters_compile_to_everything_functions():
+    filters = MetadataFilters(
+        min_size=100 * 1024 * 1024,
+        modified_after=datetime(2024, 5, 1, 8, 30),
+        extensions=[".LOG", "txt", "log"],
+        file_type="file",
+    )
+    search, regex = everything_query("build", False, filters)
+    assert search == "build size:>=104857600 dm:>=2024-05-01T08:30:00 ext:log;txt file:"
+    assert not regex
+
+def test_regex_query_moves_into_regex_function():
+    search, regex = everything_query("^a.*b$", True, MetadataFilters(max_size=10))
+    assert search == 'regex:"^a.*b$" size:<=10'
+    assert not regex
+    assert everything_query("^a", True, None) == ("^a", True)
+
+@pytest.mark.parametrize("pattern", ['say "hi"', r'a\"b', r'a\\"b', '[^"]+"$', r'x\\\"y'])
+def test_quotes_in_a_regex_do_not_end_the_regex_function(pattern):
+    search, _ = everything_query(pattern, True, MetadataFilters(max_size=10))
+    assert search.startswith('regex:"') and search.endswith('" size:<=10')
+    inner = search[len('regex:"'):-len('" size:<=10')]
+    assert '"' not in inner
+    for text in ['say "hi"', 'a"b', 'a\\"b', 'x\\"y', 'plain', '""']:
+        assert bool(re.search(pattern, text)) == bool(re.search(inner, text)), text
+
+def test_invalid_ranges_rejected():
+    with pytest.raises(ValueError):
+        MetadataFilters(min_size=10, max_size=1)
+    with pytest.raises(ValueError):
+        MetadataFilters(modified_after="2024-02-01", modified_before="2024-01-01")
+    with pytest.raises(ValueError):
+        MetadataFilters(extensions=["", "."])
+
+def test_filters_are_part_of_the_query_key():
+    plain = normalize_arguments({"base": {"query": "a"}}).key
+    empty = normalize_arguments({"base": {"query": "a", "filters": {}}}).key
+    sized = normalize_arguments({"base": {"query": "a", "filters": {"min_size": 5}}}).key
+    same = normalize_arguments({"base": {"query": "a", "filters": {"min_size": 5}}}).key
+    assert plain == empty
+    assert sized != plain
+    assert hash(sized) == hash(same) and sized == same
+    assert sized.to_json()["filters"] == {"min_size": 5}
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    specs = [("a.log", 10, 1_000_000), ("b.log", 5000, 2_000_000),
+             ("c.txt", 6000, 3_000_000), ("d.log", 7000, 4_000_000)]
+    paths = []
+    for name, size, mtime in specs:
+        path = tmp_path / "tree" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"x" * size)
+        os.utime(path, (mtime, mtime))
+        paths.append(str(path))
+    paths.append(str(tmp_path / "tree"))
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, paths)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return paths
+
+def names(results):
+    return sorted(r.filename for r in results)
+
+def test_posix_filters_apply_before_the_limit(corpus):
+    """The first locate hit is filtered out, yet max_results matches come back."""
+    filters = MetadataFilters(min_size=1000, extensions=["log"])
+    results = SearchProvider()._search_linux(".", max_results=2, filters=filters)
+    assert names(results) == ["b.log", "d.log"]
+
+def test_posix_date_and_type_filters(corpus):
+    filters = MetadataFilters(modified_after=datetime.fromtimestamp(2_500_000), file_type="file")
+    results = SearchProvider()._search_linux("path:tree", max_results=10, filters=filters)
+    assert names(results) == ["c.txt", "d.log"]
+    folders = SearchProvider()._search_linux("path:tree", max_results=10, filters=MetadataFilters(file_type="folder"))
+    assert names(folders) == ["tree"]
+
+def test_posix_filters_combine_with_sort(corpus):
+    filters = MetadataFilters(extensions=["log"])
+    results = SearchProvider()._search_linux("path:tree", max_results=2, sort_by=6, filters=filters)
+    assert [r.filename for r in results] == ["d.log", "b.log"]
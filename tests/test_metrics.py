@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for search stage metrics
+"""
+
+import asyncio
+import json
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcp_server_everything_search.metrics import MetricsRegistry
+from mcp_server_everything_search.server import METRICS_URI, handle_call_tool, handle_read_resource
+
+def test_spans_feed_histograms():
+    """Spans and counters show up in the snapshot and Prometheus text."""
+    registry = MetricsRegistry()
+    for _ in range(3):
+        with registry.span("format"):
+            pass
+    registry.observe("backend", 0.2)
+    registry.increment("requests", 4)
+
+    snapshot = registry.snapshot()
+    assert snapshot["stages"]["format"]["count"] == 3
+    assert snapshot["stages"]["backend"]["p50_ms"] == 200.0
+    assert snapshot["counters"]["requests"] == 4
+
+    text = registry.to_prometheus()
+    assert 'everything_search_stage_seconds_count{stage="format"} 3' in text
+    assert 'everything_search_stage_seconds_bucket{stage="backend",le="0.25"} 1' in text
+    assert "everything_search_requests_total 4" in text
+
+def test_export_writes_prometheus_file(tmp_path):
+    """The optional metrics file holds the Prometheus text."""
+    registry = MetricsRegistry()
+    registry.increment("errors")
+    target = tmp_path / "search.prom"
+    registry.export(str(target))
+    assert "everything_search_errors_total 1" in target.read_text()
+
+def test_metrics_resource_reports_requests():
+    """Tool calls are counted and readable through the metrics resource."""
+    asyncio.run(handle_call_tool("search", {"base": {"query": ""}}))
+    contents = asyncio.run(handle_read_resource(METRICS_URI))
+    data = json.loads(list(contents)[0].content)
+    assert data["counters"]["requests"] >= 1
+    assert data["counters"]["errors"] >= 1
+    assert "normalize" in data["stages"]
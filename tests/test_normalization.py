@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for search request normalization
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pytest
+
+from mcp_server_everything_search.normalization import DEFAULT_TIMEOUT, QueryKey, normalize_arguments
+
+def test_equivalent_requests_share_a_key():
+    """Whitespace and JSON-encoded params do not change the key."""
+    first = normalize_arguments({
+        "base": {"query": "*.py", "max_results": 10},
+        "windows_params": {"match_case": True, "sort_by": 14}
+    }).key
+    second = normalize_arguments({
+        "base": {"query": "  *.py ", "max_results": 10, "timeout": 5},
+        "windows_params": '{"sort_by": 14, "match_case": true}'
+    }).key
+    assert first == second
+    assert hash(first) == hash(second)
+    assert first.query == "*.py"
+    assert first.sort_by == 14
+
+def test_key_maps_to_search_kwargs():
+    """The key carries exactly the provider's keyword arguments."""
+    request = normalize_arguments({"base": {"query": "report"}})
+    key = request.key
+    assert isinstance(key, QueryKey)
+    assert request.timeout == DEFAULT_TIMEOUT
+    kwargs = key.search_kwargs()
+    assert kwargs["query"] == "report"
+    assert kwargs["max_results"] == 100
+
+def test_policy_checks_run_before_validation():
+    """Restricted queries are rejected even when other fields are invalid."""
+    with pytest.raises(ValueError, match="restricted keywords"):
+        normalize_arguments({"base": {"query": "password", "max_results": 0}})
+    with pytest.raises(ValueError, match="Empty query"):
+        normalize_arguments({"base": {"query": "   "}})
+
+def test_invalid_arguments():
+    """Malformed arguments raise a concise ValueError."""
+    with pytest.raises(ValueError, match="Invalid 'base'"):
+        normalize_arguments({})
+    with pytest.raises(ValueError, match="Invalid JSON"):
+        normalize_arguments({"base": {"query": "x"}, "windows_params": "{bad"})
+
+def test_windows_params_without_sort_keep_the_default_sort(monkeypatch):
+    """Only an explicit sort_by overrides the platform's default order."""
+    monkeypatch.setattr("platform.system", lambda: "Linux")
+    plain = normalize_arguments({"base": {"query": "x"}}).key
+    params = normalize_arguments({"base": {"query": "x"}, "windows_params": {"match_path": False}}).key
+    assert params == plain
+    assert params.sort_by is None
+    sorted_key = normalize_arguments({"base": {"query": "x"}, "windows_params": '{"sort_by": 1}'}).key
+    assert sorted_key.sort_by == 1
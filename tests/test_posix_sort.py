@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for server-side sorting and top-K selection on the POSIX backends
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.search_interface import CommandStream, Deadline, SearchProvider
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """Files with distinct sizes and mtimes behind a fake locate."""
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    specs = [
+        ("b_report.log", 300, 1_000_000),
+        ("A_report.log", 100, 3_000_000),
+        ("c_report.txt", 500, 2_000_000),
+        ("d_report.log", 200, 5_000_000),
+        ("e_report.csv", 400, 4_000_000),
+    ]
+    paths = []
+    for name, size, mtime in specs:
+        path = tmp_path / "tree" / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b"x" * size)
+        os.utime(path, (mtime, mtime))
+        paths.append(str(path))
+    # A stale database entry that no longer exists on disk
+    paths.append(str(tmp_path / "tree" / "f_report.log"))
+
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, paths)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return paths
+
+def names(results):
+    return [r.filename for r in results]
+
+def test_top_k_by_modified_desc(corpus):
+    """The K newest files come back newest first, stat'ed once."""
+    results = SearchProvider()._search_linux("report", max_results=2, sort_by=14)
+    assert names(results) == ["d_report.log", "e_report.csv"]
+    assert results[0].size == 200
+
+def test_top_k_by_size(corpus):
+    results = SearchProvider()._search_linux("report", max_results=3, sort_by=5)
+    assert names(results) == ["A_report.log", "d_report.log", "b_report.log"]
+    results = SearchProvider()._search_linux("report", max_results=1, sort_by=6)
+    assert names(results) == ["c_report.txt"]
+
+def test_name_and_extension_orders(corpus):
+    """Name order ignores case and keeps entries stat() can't see."""
+    results = SearchProvider()._search_linux("report", max_results=10, sort_by=1)
+    assert names(results) == [
+        "A_report.log", "b_report.log", "c_report.txt", "d_report.log", "e_report.csv", "f_report.log"
+    ]
+    assert results[-1].size is None
+    results = SearchProvider()._search_linux("report", max_results=2, sort_by=8)
+    assert names(results) == ["c_report.txt", "f_report.log"]
+
+def test_unsorted_stops_at_max_results(corpus):
+    results = SearchProvider()._search_linux("report", max_results=2)
+    assert len(results) == 2
+    assert not results.truncated
+
+def test_stream_kills_command_when_consumer_stops(tmp_path):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    stream = CommandStream(["sh", "-c", "echo one; echo two; sleep 30"], Deadline(10))
+    lines = iter(stream)
+    assert next(lines) == "one"
+    lines.close()
+    assert not stream.exhausted
+    assert not stream.timed_out
+    assert stream.returncode != 0
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for sampled query profiling
+"""
+
+import asyncio
+import json
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcp_server_everything_search.profiling import PROFILER, QueryProfiler
+from mcp_server_everything_search.server import PROFILES_URI, handle_call_tool, handle_read_resource
+
+def test_disabled_profiler_samples_nothing():
+    """With a zero sample rate no trace is recorded."""
+    profiler = QueryProfiler(sample_rate=0, keep=5)
+    with profiler.profile() as session:
+        assert session is None
+    assert profiler.traces() == []
+
+def test_keeps_only_slowest_traces():
+    """The buffer keeps the N slowest traces, slowest first."""
+    profiler = QueryProfiler(sample_rate=1.0, keep=2, trace_memory=False)
+    for label in range(4):
+        with profiler.profile() as session:
+            session.query = {"query": str(label)}
+            sum(range(20000 * (label + 1)))
+    traces = profiler.traces()
+    assert [t["query"]["query"] for t in traces] == ["3", "2"]
+    assert "function calls" in traces[0]["cpu_profile"]
+
+def test_worker_thread_work_joins_the_trace():
+    """Work wrapped for a worker thread is merged into the request's profile."""
+    profiler = QueryProfiler(sample_rate=1.0, keep=1, trace_memory=True)
+
+    def busy_backend():
+        return sorted(str(i) for i in range(5000))
+
+    async def request():
+        with profiler.profile() as session:
+            session.query = {"query": "*.csproj"}
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, profiler.wrap(busy_backend))
+
+    asyncio.run(request())
+    trace = profiler.traces()[0]
+    assert trace["memory"]["peak_kb"] >= 0
+    if sys.version_info < (3, 12):
+        assert "busy_backend" in trace["cpu_profile"]
+
+def test_admin_tool_toggles_profiling():
+    """configure_profiling switches sampling and traces reach the resource."""
+    try:
+        status = json.loads(asyncio.run(handle_call_tool(
+            "configure_profiling", {"enabled": True, "sample_rate": 1.0, "keep": 3, "clear": True}
+        ))[0].text)
+        assert status["enabled"] and status["sample_rate"] == 1.0
+
+        asyncio.run(handle_call_tool("search", {"base": {"query": ""}}))
+        contents = asyncio.run(handle_read_resource(PROFILES_URI))
+        data = json.loads(list(contents)[0].content)
+        assert len(data["traces"]) == 1
+    finally:
+        PROFILER.configure(enabled=False, clear=True)
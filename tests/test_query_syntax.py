@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the Everything query syntax parser and its backend lowerings
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.normalization import normalize_arguments
+from mcp_server_everything_search.query_syntax import (
+    And, Extension, Function, Not, Or, Term, canonical_query, compile_matcher,
+    locate_plan, mdfind_plan, parse_query
+)
+from mcp_server_everything_search.search_interface import SearchProvider
+
+def test_or_binds_tighter_than_and():
+    assert parse_query("a b|c") == And((Term("a"), Or((Term("b"), Term("c")))))
+    assert parse_query("<a b>|c") == Or((And((Term("a"), Term("b"))), Term("c")))
+
+def test_quotes_functions_and_negation():
+    assert parse_query('"test file" !tmp') == And((Term("test file", quoted=True), Not(Term("tmp"))))
+    assert parse_query("ext:PY;.txt") == Extension(("py", "txt"))
+    assert parse_query('path:"my docs"') == Term("my docs", match_path=True, quoted=True)
+    assert parse_query("size:>1mb") == Function("size", ">1mb")
+    # A drive letter is not a function
+    assert parse_query("C:\\src") == Term("C:\\src")
+
+@pytest.mark.parametrize("query,message", [
+    ('"open', "Unterminated quote"),
+    ("<a b", "Unbalanced '<'"),
+    ("a>", "Unbalanced '>'"),
+    ("a |", "ends with an operator"),
+    ("<>", "Empty query"),
+])
+def test_malformed_queries(query, message):
+    with pytest.raises(ValueError, match=message):
+        parse_query(query)
+
+def test_canonical_form_round_trips():
+    for query in ['"test file" !<a|b> ext:py;txt', "size:>1mb dm:today", "*.py|*.txt foo"]:
+        assert canonical_query(canonical_query(query)) == canonical_query(query)
+    assert canonical_query("  a   b ") == "a b"
+    assert canonical_query('"plain"') == '"plain"'
+
+def test_quoted_queries_are_accepted():
+    key = normalize_arguments({"base": {"query": '"test file"'}}).key
+    assert key.query == '"test file"'
+    regex = normalize_arguments({"base": {"query": "a\"b"}, "windows_params": {"match_regex": True}}).key
+    assert regex.query == 'a"b'
+
+@pytest.mark.parametrize("query", ['"pass"word', 'se"cret"', '"pass""word"', 'x "to"ken'])
+def test_keywords_split_by_quotes_are_restricted(query):
+    with pytest.raises(ValueError, match="restricted keywords"):
+        normalize_arguments({"base": {"query": query}})
+
+def test_matcher_follows_everything_semantics():
+    match = compile_matcher(parse_query("*.py !test"))
+    assert match("/src/app.py")
+    assert not match("/src/test_app.py")
+    assert not match("/src/app.py.bak")
+    # Plain terms match the filename, terms with a separator the path
+    assert not compile_matcher(parse_query("src"))("/src/app.py")
+    assert compile_matcher(parse_query("src/app"))("/src/app.py")
+    assert compile_matcher(parse_query("src"), match_path=True)("/src/app.py")
+    assert not compile_matcher(parse_query("App"), match_case=True)("/src/app.py")
+    with pytest.raises(ValueError, match="only supported by Everything"):
+        compile_matcher(parse_query("size:>1mb"))
+
+def test_locate_plan_pushes_down_the_most_selective_condition():
+    plan = locate_plan(parse_query("ab handler_v2 !tmp"))
+    assert plan.patterns == ("handler_v2",) and plan.basename and plan.post_filter is not None
+    exact = locate_plan(parse_query("*.log|*.txt"))
+    assert exact.patterns == ("*.log", "*.txt") and exact.post_filter is None
+    assert locate_plan(parse_query("ext:py;txt")).patterns == ("*.py", "*.txt")
+    assert not locate_plan(parse_query("/srv/build")).basename
+    assert locate_plan(parse_query("!tmp")).patterns == ("/",)
+
+def test_mdfind_plan_uses_the_longest_filename_literal():
+    assert mdfind_plan(parse_query("rep*ort_2024 ext:py")).patterns == ("ort_2024",)
+    assert mdfind_plan(parse_query("path:src")).patterns == ()
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    paths = ["/w/test file.txt", "/w/test.txt", "/w/file.py", "/w/tmp/file.txt", "/w/notes/a.md"]
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, paths)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+@pytest.mark.parametrize("query,expected", [
+    ('"test file"', ["/w/test file.txt"]),
+    ("file !path:tmp", ["/w/file.py", "/w/test file.txt"]),
+    ("ext:txt|ext:md", ["/w/notes/a.md", "/w/test file.txt", "/w/test.txt", "/w/tmp/file.txt"]),
+    ("*.txt file", ["/w/test file.txt", "/w/tmp/file.txt"]),
+    ("notes", ["/w/notes"]),
+])
+def test_locate_and_mdfind_answer_like_everything(corpus, query, expected):
+    provider = SearchProvider()
+    assert sorted(r.path for r in provider._search_linux(query, max_results=50)) == expected
+    assert sorted(r.path for r in provider._search_macos(query, max_results=50)) == expected
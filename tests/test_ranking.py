@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for relevance ranking
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import FakeEverythingDLL, install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.everything_sdk import RANKING_REQUEST_FLAGS, EverythingSDK
+from mcp_server_everything_search.normalization import normalize_arguments
+from mcp_server_everything_search.ranking import RelevanceScorer, highlighted_coverage, pool_size, query_terms
+from mcp_server_everything_search.search_interface import SearchProvider
+
+def test_query_terms_skip_syntax():
+    assert query_terms("*Handler*.py ext:py") == ["handler", ".py"]
+    assert query_terms("^recv_(a|b)$") == ["recv_", "a", "b"]
+
+def test_name_match_quality_order():
+    scorer = RelevanceScorer("handler")
+    exact = scorer.name_score("handler.py")
+    prefix = scorer.name_score("handler_utils.py")
+    word = scorer.name_score("receive_handler.py")
+    inner = scorer.name_score("rehandlers.py")
+    assert exact > prefix > word > inner > scorer.name_score("other.py")
+
+def test_depth_recency_and_run_count_signals():
+    now = time.time()
+    scorer = RelevanceScorer("report", now=now)
+    assert scorer.depth_score("/a/report.txt") > scorer.depth_score("/a/b/c/d/e/report.txt")
+    assert scorer.recency_score(now) == pytest.approx(1.0)
+    assert scorer.recency_score(now - 30 * 86400) == pytest.approx(0.5)
+    assert scorer.run_count_score(0) == 0.0
+    assert scorer.run_count_score(10 ** 6) == 1.0
+    # Missing signals are left out rather than counted as zero
+    assert scorer.score("/a/report.txt") == scorer.score("/a/report.txt", modified=None)
+
+def test_highlighted_coverage():
+    assert highlighted_coverage("*hand*ler.py") == pytest.approx(4 / 10)
+    assert highlighted_coverage("a**b") == 0.0
+
+def test_pool_size_bounds():
+    assert pool_size(1) == 200
+    assert pool_size(100) == 1000
+    assert pool_size(1000) == 5000
+
+def test_rank_flag_is_part_of_the_query_key():
+    plain = normalize_arguments({"base": {"query": "a"}}).key
+    ranked = normalize_arguments({"base": {"query": "a", "rank_by_relevance": True}}).key
+    assert ranked.rank_by_relevance and ranked != plain
+
+def test_sdk_reads_only_requested_fields():
+    sdk = EverythingSDK("", dll=FakeEverythingDLL(["/src/handler.py", "/src/other.py"]))
+    results = sdk.search_files("handler", request_flags=RANKING_REQUEST_FLAGS)
+    assert [r.filename for r in results] == ["handler.py"]
+    assert results[0].size is None and results[0].created is None
+    assert results[0].modified is not None
+    assert results[0].run_count is not None
+    assert results[0].highlighted_filename == "handler.py"
+
+def test_posix_ranking_puts_best_match_first(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    relative = [
+        "a/old/zz/receive_handler_backup.py",
+        "b/deep/er/still/receive_handler.py",
+        "c/handler.py",
+        "d/handler_utils.py",
+    ]
+    paths = []
+    for name in relative:
+        path = tmp_path / "tree" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+        paths.append(str(path))
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, paths)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    results = SearchProvider()._search_linux("handler", max_results=2, rank_by_relevance=True)
+    assert [r.filename for r in results] == ["handler.py", "handler_utils.py"]
+    assert results[0].score >= results[1].score
+    assert results[0].size == 1
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the literal prefilter of regex searches
+"""
+
+import re
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import generate_paths, install_fake_backends, read_mlocate_db, write_mlocate_db
+from mcp_server_everything_search.metrics import METRICS
+from mcp_server_everything_search.regex_literals import locate_prefilter, required_literals
+from mcp_server_everything_search.search_interface import SearchProvider
+
+def test_required_literals():
+    assert required_literals(r"src/.*_test\.py$") == ["src/", "_test.py"]
+    assert required_literals(r"ab(cd)ef") == ["abcdef"]
+    assert required_literals(r"x(report)+y?z") == ["x", "report", "z"]
+    assert required_literals(r"^(foo|bar)baz") == ["baz"]
+    assert required_literals(r"[a-c]+\.log") == [".log"]
+
+def test_syntax_outside_the_common_subset_is_not_prefiltered():
+    assert required_literals(r"handler\d+") is None
+    assert required_literals(r"(?i)handler") is None
+    assert required_literals(r"[[:digit:]]handler") is None
+    assert required_literals(r"handler.*?\.py") is None
+    assert required_literals(r"\bhandler") is None
+    assert required_literals(r"(unclosed") is None
+
+def test_prefilter_needs_a_long_enough_plain_literal():
+    assert locate_prefilter(r"a.b", ignore_case=True) is None
+    assert locate_prefilter(r"[xy]z*", ignore_case=True) is None
+    prefilter = locate_prefilter(r"Hand.er_\[v", ignore_case=True)
+    assert prefilter.literal == "Hand"
+    assert prefilter.matches("/x/handler_[v2")
+
+PATTERNS = [
+    r"report_.*_1[0-9]\.json$",
+    r"/src/(parser|loader)/",
+    r"^/bench/proj0[1-3]/.*task",
+    r"GRAPH_.*\.py",
+    r"e(ng)+ine",
+]
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_prefiltered_search_matches_full_regex_search(pattern, tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, generate_paths(3000))
+    # Every database entry, directories included
+    paths = list(read_mlocate_db(db_path))
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    before = METRICS.snapshot()["counters"].get("regex_prefiltered", 0)
+    results = SearchProvider()._search_linux(pattern, max_results=1000, match_regex=True, sort_by=3)
+    assert METRICS.snapshot()["counters"]["regex_prefiltered"] == before + 1
+    expected = sorted(
+        (p for p in paths if re.search(pattern, p, re.IGNORECASE)),
+        key=lambda p: (os.path.dirname(p).lower(), os.path.basename(p).lower(), p)
+    )[:1000]
+    assert [r.path for r in results] == expected
+
+OPERATOR_PATTERNS = [
+    r"data_+data",
+    r"index_?graph",
+    r"(yaml|json)_parser",
+    r"/(job|task)/",
+]
+
+@pytest.mark.parametrize("pattern", OPERATOR_PATTERNS)
+def test_plocate_prefiltered_and_unfiltered_searches_agree(pattern, tmp_path, monkeypatch):
+    """``+``, ``?`` and ``|`` are operators whether or not the prefilter applies."""
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, generate_paths(3000))
+    paths = list(read_mlocate_db(db_path))
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    # The fake treats -r as a POSIX basic regex, like plocate
+    os.symlink(tmp_path / "bin" / "locate", tmp_path / "bin" / "plocate")
+    env["PATH"] = str(tmp_path / "bin")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    expected = sorted(
+        (p for p in paths if re.search(pattern, p, re.IGNORECASE)),
+        key=lambda p: (os.path.dirname(p).lower(), os.path.basename(p).lower(), p)
+    )[:1000]
+    assert expected
+    prefiltered = SearchProvider()._search_linux(pattern, max_results=1000, match_regex=True, sort_by=3)
+    monkeypatch.setattr("mcp_server_everything_search.search_interface.locate_prefilter", lambda *args, **kwargs: None)
+    unfiltered = SearchProvider()._search_linux(pattern, max_results=1000, match_regex=True, sort_by=3)
+    assert [r.path for r in prefiltered] == [r.path for r in unfiltered] == expected
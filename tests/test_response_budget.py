@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for byte-budgeted search responses
+"""
+
+import asyncio
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.normalization import normalize_arguments
+from mcp_server_everything_search.search_interface import SearchResult
+from mcp_server_everything_search.server import _format_results, handle_call_tool
+
+def _results(paths):
+    return [
+        SearchResult(path=p, filename=os.path.basename(p), extension=os.path.splitext(p)[1][1:] or None, size=10)
+        for p in paths
+    ]
+
+def test_budget_is_per_call_and_not_part_of_the_key():
+    plain = normalize_arguments({"base": {"query": "*.py"}})
+    budgeted = normalize_arguments({"base": {"query": "*.py", "max_response_bytes": 2048}})
+    assert plain.key == budgeted.key
+    assert plain.max_response_bytes is None
+    assert budgeted.max_response_bytes == 2048
+    with pytest.raises(ValueError):
+        normalize_arguments({"base": {"query": "*.py", "max_response_bytes": 10}})
+
+def test_unbudgeted_response_lists_every_row():
+    results = _results([f"/srv/app/f{i}.py" for i in range(50)])
+    text = _format_results(results, truncated=True)
+    assert text.count("Path: ") == 50
+    assert text.endswith("Results truncated: search deadline exceeded")
+    assert "omitted" not in text
+
+def test_rows_past_the_budget_are_summarized():
+    paths = (
+        [f"/srv/app/src/m{i}.py" for i in range(150)]
+        + [f"/srv/app/docs/d{i}.md" for i in range(30)]
+        + [f"/srv/app/LICENSE{i}" for i in range(10)]
+    )
+    results = _results(paths)
+    full = _format_results(results)
+    text = _format_results(results, max_bytes=4096)
+    assert len(text.encode()) <= 4096 < len(full.encode())
+
+    shown = text.count("Path: ")
+    assert 0 < shown < 100
+    # Listed rows are the leading ones, unchanged
+    assert full.startswith(text[:text.index("Results omitted")].rstrip("\n"))
+    summary = text[text.index("Results omitted"):]
+    assert f"Results omitted: {190 - shown} more beyond the 4,096-byte response budget" in summary
+    assert f"By directory under /srv/app: src ({150 - shown}), docs (30), . (10)" in summary
+    assert f"By extension: py ({150 - shown}), md (30), (none) (10)" in summary
+
+def test_summary_folds_small_groups():
+    results = _results([f"/data/dir{i:02d}/file.ext{i:02d}" for i in range(20)])
+    text = _format_results(results, max_bytes=1024)
+    omitted = 20 - text.count("Path: ")
+    assert omitted > 8
+    directories = text.split("By directory")[1].split("\n")[0]
+    assert directories.endswith(f", {omitted - 8} other ({omitted - 8})")
+    assert len(text.encode()) <= 1024
+
+def test_search_tool_applies_the_budget(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    paths = [f"/srv/app/pkg{i % 3}/module{i}.py" for i in range(200)]
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, paths)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    env["EVERYTHING_SEARCH_CACHE_DIR"] = str(tmp_path / "cache")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    arguments = {"base": {"query": "*.py", "max_results": 200, "max_response_bytes": 8192}}
+    text = asyncio.run(handle_call_tool("search", arguments))[0].text
+    assert len(text.encode()) <= 8192
+    assert "Results omitted:" in text
+    assert "By directory under /srv/app: pkg" in text
+    assert "By extension: py (" in text
+
+@pytest.mark.parametrize("max_bytes", [1024, 300, 40])
+def test_long_names_never_exceed_the_budget(max_bytes):
+    root = "/" + "/".join(["very_long_directory_name_é" * 4] * 6)
+    results = _results([
+        f"{root}/{'sub_' * 40}{i}/{'name' * 30}.{'ext' * 30}{i}" for i in range(30)
+    ])
+    text = _format_results(results, truncated=True, max_bytes=max_bytes)
+    assert len(text.encode()) <= max_bytes
+    if max_bytes >= 1024:
+        assert text.startswith("Results omitted: 30 more")
+        assert "By directory under ..." in text
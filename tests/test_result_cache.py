@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent result cache
+"""
+
+import asyncio
+import sys
+import os
+import time
+from datetime import datetime
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.metrics import METRICS
+from mcp_server_everything_search.normalization import QueryKey
+from mcp_server_everything_search.platform_search import MetadataFilters
+from mcp_server_everything_search.result_cache import ResultCache, decode_results, encode_results
+from mcp_server_everything_search.search_interface import SearchResult, SearchResults
+from mcp_server_everything_search.server import handle_call_tool
+
+FINGERPRINT = (("/var/lib/mlocate/mlocate.db", 1, 2),)
+
+def _results(*paths):
+    results = SearchResults()
+    for path in paths:
+        results.append(SearchResult(path=path, filename=os.path.basename(path), size=3,
+                                    modified=datetime(2025, 1, 2, 3, 4, 5)))
+    return results
+
+def test_encoding_round_trip():
+    original = _results("/a/b.txt")
+    original[0].matches = [(3, "hit")]
+    decoded = decode_results(encode_results(original))
+    assert decoded == original
+    assert not decoded.truncated
+
+def test_fingerprint_change_invalidates(tmp_path):
+    cache = ResultCache(path=str(tmp_path / "c.sqlite"))
+    key = QueryKey("b", 10)
+    cache.put(key, FINGERPRINT, _results("/a/b.txt"))
+    assert [r.path for r in cache.get(key, FINGERPRINT)] == ["/a/b.txt"]
+    assert cache.get(key, (("/var/lib/mlocate/mlocate.db", 9, 2),)) is None
+    # The stale entry is gone
+    assert cache.get(key, FINGERPRINT) is None
+
+def test_live_index_and_metadata_queries_expire_after_ttl(tmp_path):
+    cache = ResultCache(ttl=60, path=str(tmp_path / "c.sqlite"))
+    live = QueryKey("b", 10)
+    by_size = QueryKey("b", 10, filters=MetadataFilters(min_size=1))
+    assert cache.lifetime(live, None) == 60
+    assert cache.lifetime(by_size, FINGERPRINT) == 60
+    assert cache.lifetime(live, FINGERPRINT) == cache.max_age
+    cache.put(live, None, _results("/a"))
+    cache.ttl = 0
+    assert cache.get(live, None) is None
+
+def test_locate_hits_report_current_file_information(tmp_path):
+    cache = ResultCache(path=str(tmp_path / "c.sqlite"))
+    target = tmp_path / "grows.log"
+    target.write_bytes(b"x" * 12)
+    key = QueryKey("grows", 10)
+    cache.put(key, FINGERPRINT, _results(str(target)))
+    with open(target, "ab") as f:
+        f.write(b"x" * 5000)
+    hit = cache.get(key, FINGERPRINT)
+    assert [r.path for r in hit] == [str(target)]
+    assert hit[0].size == 5012
+    assert hit[0].modified == datetime.fromtimestamp(target.stat().st_mtime)
+
+    # A path that can no longer be stat'ed is served without file information
+    target.unlink()
+    hit = cache.get(key, FINGERPRINT)
+    assert [r.path for r in hit] == [str(target)]
+    assert hit[0].size is None and hit[0].modified is None
+
+def test_truncated_results_are_not_stored(tmp_path):
+    cache = ResultCache(path=str(tmp_path / "c.sqlite"))
+    results = _results("/a")
+    results.truncated = True
+    cache.put(QueryKey("a", 10), FINGERPRINT, results)
+    assert cache.get(QueryKey("a", 10), FINGERPRINT) is None
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = len(encode_results(_results("/p/0"), with_stat=False))
+    cache = ResultCache(max_bytes=entry_size * 3, path=str(tmp_path / "c.sqlite"))
+    for i in range(3):
+        cache.put(QueryKey(str(i), 10), FINGERPRINT, _results(f"/p/{i}"))
+        time.sleep(0.01)
+    assert cache.get(QueryKey("0", 10), FINGERPRINT) is not None
+    cache.put(QueryKey("3", 10), FINGERPRINT, _results("/p/3"))
+    assert cache.get(QueryKey("1", 10), FINGERPRINT) is None
+    assert cache.get(QueryKey("0", 10), FINGERPRINT) is not None
+
+def test_repeated_search_is_answered_without_the_backend(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    target = tmp_path / "tree" / "notes.txt"
+    target.parent.mkdir()
+    target.write_text("x")
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, [str(target)])
+    bin_dir = tmp_path / "bin"
+    env = install_fake_backends(str(bin_dir), db_path)
+    env["PATH"] = str(bin_dir)
+    env["LOCATE_PATH"] = db_path
+    env["EVERYTHING_SEARCH_CACHE_DIR"] = str(tmp_path / "cache")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    arguments = {"base": {"query": "notes"}}
+
+    first = asyncio.run(handle_call_tool("search", arguments))[0].text
+    hits = METRICS.snapshot()["counters"].get("cache_hits", 0)
+    # A new "session": the backend is gone, but the cache still answers
+    for script in bin_dir.iterdir():
+        script.unlink()
+    second = asyncio.run(handle_call_tool("search", arguments))[0].text
+    assert str(target) in first
+    assert second == first
+    assert METRICS.snapshot()["counters"]["cache_hits"] == hits + 1
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for the model-generated search tool schema and argument parsing
+"""
+
+import asyncio
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from mcp_server_everything_search.platform_search import (
+    SearchToolArguments,
+    UnifiedSearchQuery,
+    WindowsSortOption,
+    get_search_tool_schema,
+)
+from mcp_server_everything_search.server import handle_call_tool, handle_list_tools
+
+def test_schema_is_generated_once():
+    """The schema is memoized and shared by list_tools."""
+    assert get_search_tool_schema() is get_search_tool_schema()
+    assert UnifiedSearchQuery.get_schema_for_platform() is UnifiedSearchQuery.get_schema_for_platform()
+
+    tools = asyncio.run(handle_list_tools())
+    assert tools[0].inputSchema == get_search_tool_schema()
+
+def test_sort_enum_matches_model():
+    """The advertised sort values are exactly the ones the model accepts."""
+    sort_schema = get_search_tool_schema()["$defs"]["WindowsSortOption"]
+    assert sort_schema["enum"] == [option.value for option in WindowsSortOption]
+
+def test_windows_params_json_string():
+    """windows_params may arrive as a JSON string."""
+    args = SearchToolArguments.model_validate({
+        "base": {"query": "*.py"},
+        "windows_params": '{"match_case": true, "sort_by": 14}'
+    })
+    assert args.windows_params.match_case is True
+    assert args.windows_params.sort_by == WindowsSortOption.MODIFIED_DESC
+
+def test_concise_validation_errors():
+    """Validation failures come back as one short line."""
+    result = asyncio.run(handle_call_tool("search", {"base": {"query": "x", "max_results": 0}}))
+    assert result[0].text.startswith("Search failed: Invalid 'base.max_results'")
+
+    result = asyncio.run(handle_call_tool("search", {"base": {"query": "x"}, "windows_params": "{bad"}))
+    assert result[0].text == "Search failed: Invalid 'windows_params': Invalid JSON"
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Tests for watched searches and their change reports
+"""
+
+import asyncio
+import json
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pytest
+
+from fakes import install_fake_backends, write_mlocate_db
+from mcp_server_everything_search.normalization import QueryKey
+from mcp_server_everything_search.server import handle_call_tool, handle_list_resources, handle_read_resource
+from mcp_server_everything_search.watch import WatchRegistry, depends_on_metadata
+
+class FakeSearch:
+    """Search callable returning scripted paths and recording the keys it got."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.keys = []
+
+    async def __call__(self, key):
+        self.keys.append(key)
+        response = self.responses.pop(0)
+        # (paths, truncated) when nothing was filtered out
+        return response if len(response) == 3 else (*response, len(response[0]))
+
+def test_full_poll_reports_added_and_removed():
+    async def scenario():
+        search = FakeSearch((["/a", "/b"], False), (["/b", "/c"], False))
+        registry = WatchRegistry()
+        watch = await registry.add(QueryKey("x", 100), 5.0, search)
+        return await registry.poll(watch, search)
+
+    change = asyncio.run(scenario())
+    assert change["added"] == ["/c"]
+    assert change["removed"] == ["/a"]
+    assert change["mode"] == "full"
+
+def test_unchanged_index_skips_the_search():
+    async def scenario():
+        search = FakeSearch((["/a"], False))
+        registry = WatchRegistry()
+        watch = await registry.add(QueryKey("x", 100), 5.0, search, fingerprint=("db", 1, 1))
+        change = await registry.poll(watch, search, fingerprint=("db", 1, 1))
+        return change, search.keys
+
+    change, keys = asyncio.run(scenario())
+    assert change["mode"] == "index_unchanged"
+    assert change["added"] == change["removed"] == []
+    assert len(keys) == 1
+
+def test_metadata_dependent_watches_always_search():
+    assert depends_on_metadata(QueryKey("x", 10, sort_by=14))
+    assert not depends_on_metadata(QueryKey("x", 10, sort_by=2))
+
+def test_incremental_poll_fetches_recent_changes(tmp_path):
+    kept = tmp_path / "kept.log"
+    kept.write_text("x")
+    new = str(tmp_path / "new.log")
+
+    async def scenario():
+        search = FakeSearch(([str(kept), "/gone.log"], False), ([new], False))
+        registry = WatchRegistry()
+        watch = await registry.add(QueryKey("log", 100), 5.0, search)
+        change = await registry.poll(watch, search, incremental=True)
+        return change, search.keys
+
+    change, keys = asyncio.run(scenario())
+    assert change["mode"] == "incremental"
+    assert change["added"] == [new]
+    assert change["removed"] == ["/gone.log"]
+    assert keys[1].filters.changed_after is not None
+
+def test_incremental_poll_checks_paths_off_the_event_loop(monkeypatch):
+    checked_on = set()
+    real_exists = os.path.exists
+
+    def exists(path):
+        checked_on.add(threading.current_thread())
+        return real_exists(path)
+
+    async def scenario():
+        search = FakeSearch((["/gone/a.log", "/gone/b.log"], False), ([], False))
+        registry = WatchRegistry()
+        watch = await registry.add(QueryKey("log", 100), 5.0, search)
+        monkeypatch.setattr(os.path, "exists", exists)
+        return await registry.poll(watch, search, incremental=True)
+
+    change = asyncio.run(scenario())
+    assert change["removed"] == ["/gone/a.log", "/gone/b.log"]
+    assert checked_on and threading.main_thread() not in checked_on
+
+def test_truncated_poll_does_not_report_removals():
+    async def scenario():
+        search = FakeSearch((["/a", "/b"], False), (["/c"], True))
+        registry = WatchRegistry()
+        watch = await registry.add(QueryKey("x", 100), 5.0, search)
+        return await registry.poll(watch, search)
+
+    change = asyncio.run(scenario())
+    assert change["added"] == ["/c"]
+    assert change["removed"] == []
+    assert change["truncated"]
+
+def test_truncated_or_filtered_snapshot_is_not_complete():
+    async def scenario():
+        search = FakeSearch(
+            (["/a"], True), (["/a", "/b"], False),
+            # Three backend results, one of them withheld as sensitive
+            (["/a", "/b"], False, 3)
+        )
+        registry = WatchRegistry()
+        truncated = await registry.add(QueryKey("x", 100), 5.0, search)
+        incomplete = truncated.complete
+        change = await registry.poll(truncated, search, incremental=True)
+        filtered = await registry.add(QueryKey("y", 3), 5.0, search)
+        return incomplete, change, truncated.complete, filtered, search.keys
+
+    incomplete, change, recovered, filtered, keys = asyncio.run(scenario())
+    assert not incomplete
+    # A truncated snapshot is searched in full rather than patched incrementally
+    assert change["mode"] == "full"
+    assert keys[1].filters is None
+    assert recovered
+    assert not filtered.complete
+
+def test_watch_withholds_every_sensitive_path(tmp_path, monkeypatch):
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    paths = [f"/home/dev/.ssh/build{i:02d}.log" for i in range(12)] + ["/srv/build/app.log"]
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, paths)
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    env["LOCATE_PATH"] = db_path
+    env["EVERYTHING_SEARCH_CACHE_DIR"] = str(tmp_path / "cache")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    async def scenario():
+        registered = await handle_call_tool(
+            "watch_search", {"base": {"query": "build", "max_results": 100}, "linux_params": {"existing_files": False}}
+        )
+        watch = json.loads(registered[0].text)
+        contents = await handle_read_resource(watch["uri"])
+        await handle_call_tool("unwatch_search", {"watch_id": watch["watch_id"]})
+        return watch, contents
+
+    watch, contents = asyncio.run(scenario())
+    assert watch["total"] == 1
+    assert ".ssh" not in str(contents)
+
+def test_watch_tools_and_resource(tmp_path, monkeypatch):
+    """End to end over a fake locate: register, poll, update the db, poll, remove."""
+    if os.name != 'posix':
+        pytest.skip("POSIX only")
+    db_path = str(tmp_path / "mlocate.db")
+    write_mlocate_db(db_path, ["/srv/build/app.log"])
+    env = install_fake_backends(str(tmp_path / "bin"), db_path)
+    env["PATH"] = str(tmp_path / "bin")
+    env["LOCATE_PATH"] = db_path
+    env["EVERYTHING_SEARCH_CACHE_DIR"] = str(tmp_path / "cache")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+
+    async def scenario():
+        registered = await handle_call_tool("watch_search", {"base": {"query": "/srv/build"}})
+        watch = json.loads(registered[0].text)
+        uris = [str(r.uri) for r in await handle_list_resources()]
+        first = json.loads(list(await handle_read_resource(watch["uri"]))[0].content)
+        write_mlocate_db(db_path, ["/srv/build/app.log", "/srv/build/new.log"])
+        os.utime(db_path, ns=(1, 10**18))
+        second = json.loads(list(await handle_read_resource(watch["uri"]))[0].content)
+        removed = await handle_call_tool("unwatch_search", {"watch_id": watch["watch_id"]})
+        return watch, uris, first, second, removed
+
+    watch, uris, first, second, removed = asyncio.run(scenario())
+    assert watch["total"] == 2  # /srv/build and app.log
+    assert watch["uri"] in uris
+    assert first["mode"] == "index_unchanged"
+    assert second["added"] == ["/srv/build/new.log"]
+    assert json.loads(removed[0].text) == {"removed": watch["watch_id"]}